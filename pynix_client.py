@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# file: pynix_client.py
+# Thin client for `python pyterm.py --daemon`: sends one command line to the
+# warm daemon over its Unix socket, streams the output and exits with the
+# command's status. Standard library only, so it starts in a few milliseconds.
+#
+#   python pynix_client.py ls -l
+#   python pynix_client.py --socket /tmp/other.sock du -s .
+#   python pynix_client.py --ping | --stop
+import json
+import os
+import socket
+import sys
+import tempfile
+
+
+def default_socket_path():
+    """Must match default_socket_path() in pyterm.py."""
+    uid = os.getuid() if hasattr(os, "getuid") else 0
+    return os.environ.get("PYNIX_SOCKET") or os.path.join(tempfile.gettempdir(), f"pynix-{uid}.sock")
+
+
+def main(argv):
+    path = default_socket_path()
+    if argv[:1] == ["--socket"] and len(argv) > 1:
+        path, argv = argv[1], argv[2:]
+    if not argv:
+        print("usage: pynix_client.py [--socket PATH] <command> [args...] | --ping | --stop", file=sys.stderr)
+        return 2
+
+    if argv[0] == "--ping":
+        request = {"op": "ping"}
+    elif argv[0] == "--stop":
+        request = {"op": "shutdown"}
+    else:
+        request = {"op": "run", "cmd": " ".join(argv), "cwd": os.getcwd()}
+
+    try:
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.connect(path)
+    except (OSError, AttributeError) as e:
+        print(f"pynix_client: no daemon at {path} ({e}); start one with: python pyterm.py --daemon",
+              file=sys.stderr)
+        return 2
+
+    with conn:
+        conn.sendall((json.dumps(request) + "\n").encode("utf-8"))
+        for line in conn.makefile("rb"):
+            message = json.loads(line)
+            if "out" in message:
+                sys.stdout.write(message["out"])
+                sys.stdout.flush()
+            elif "error" in message:
+                print(f"pynix_client: {message['error']}", file=sys.stderr)
+                return 2
+            elif "status" in message:
+                if request["op"] == "ping":
+                    print(f"pong (pid {message.get('pid')})")
+                return message["status"]
+    print("pynix_client: daemon closed the connection", file=sys.stderr)
+    return 1
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main(sys.argv[1:]))
+    except KeyboardInterrupt:
+        sys.exit(130)
@@ -1,34 +1,107 @@
 import os
+import re
+import sys
+import time
+
+_STARTUP_T0 = time.perf_counter()
+
 import subprocess
 import platform
-import webbrowser
-import curses
-import sys
-import runpy
 import shutil
-import platform
-import ctypes
-import tkinter as tk
-from tkinter import messagebox
 import json
+import importlib
 import importlib.util
-import glob
-import platform
-import socket
-import psutil
+import heapq
 import math
-import time
+import queue
 import threading
-import zipfile
-import tarfile
 import datetime
-import importlib.util
-import hashlib
-import inspect
-import uuid
 
-_active_loops = {}
 
+# =======================================
+# Lazy imports
+# =======================================
+# Heavy modules are bound to proxies and only imported the first time a
+# command touches them, so opening a shell does not pay for tkinter,
+# psutil, curses, archives, etc. up front.
+
+_lazy_import_times = {}
+
+
+class _LazyModule:
+    """Stand-in for a module that is imported on first attribute access."""
+
+    def __init__(self, name):
+        object.__setattr__(self, "_lazy_name", name)
+        object.__setattr__(self, "_lazy_module", None)
+
+    def _load(self):
+        module = self._lazy_module
+        if module is None:
+            start = time.perf_counter()
+            module = importlib.import_module(self._lazy_name)
+            _lazy_import_times[self._lazy_name] = time.perf_counter() - start
+            object.__setattr__(self, "_lazy_module", module)
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self._lazy_module is not None else "not loaded"
+        return f"<lazy module '{self._lazy_name}' ({state})>"
+
+
+def lazy_import(name):
+    """Return module `name`, deferring the real import until first use."""
+    if name in sys.modules:
+        return sys.modules[name]
+    return _LazyModule(name)
+
+
+webbrowser = lazy_import("webbrowser")
+curses = lazy_import("curses")
+runpy = lazy_import("runpy")
+ctypes = lazy_import("ctypes")
+tk = lazy_import("tkinter")
+messagebox = lazy_import("tkinter.messagebox")
+glob = lazy_import("glob")
+socket = lazy_import("socket")
+psutil = lazy_import("psutil")
+zipfile = lazy_import("zipfile")
+tarfile = lazy_import("tarfile")
+hashlib = lazy_import("hashlib")
+inspect = lazy_import("inspect")
+uuid = lazy_import("uuid")
+
+
+# =======================================
+# Startup timing
+# =======================================
+# Each startup phase records how long it took; `pyterm --startup-report`
+# prints the breakdown instead of entering the prompt loop.
+
+STARTUP_BUDGET_MS = 250
+
+_startup_phases = []
+_startup_last = _STARTUP_T0
+
+
+def _mark_startup(phase):
+    """Record the time spent since the previous startup mark under `phase`."""
+    global _startup_last
+    now = time.perf_counter()
+    _startup_phases.append((phase, now - _startup_last))
+    _startup_last = now
+
+
+_mark_startup("imports")
 
 # at module top
 dock_window = None
@@ -43,6 +116,80 @@ _aliases = {}
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 ALIAS_FILE = os.path.join(BASE_DIR, "pynix_aliases.json")
 
+_ALIAS_ARG_RE = re.compile(r"\$(@|\*|[1-9])")
+_alias_cache = {}   # alias name -> _CompiledAlias, rebuilt whenever the alias table changes
+
+
+class _CompiledAlias:
+    """An alias with nested aliases already resolved and its $1..$9 / $@ slots pre-split."""
+    __slots__ = ("pieces", "uses_args", "error", "inner")
+
+    def __init__(self, template, error=None, inner=None):
+        # re.split with one group alternates literal text and slot names
+        self.pieces = _ALIAS_ARG_RE.split(template)
+        self.uses_args = len(self.pieces) > 1
+        self.error = error
+        self.inner = inner      # the alias this one's first word names (template is then the rest)
+
+    def expand(self, args):
+        if not self.uses_args:
+            # No slots: arguments are appended, like a shell alias
+            line = " ".join([self.pieces[0], *args]).strip()
+        else:
+            out = []
+            for i, piece in enumerate(self.pieces):
+                if i % 2 == 0:
+                    out.append(piece)
+                elif piece in ("@", "*"):
+                    out.append(" ".join(args))
+                else:
+                    n = int(piece)
+                    out.append(args[n - 1] if n <= len(args) else "")
+            line = " ".join("".join(out).split())
+        # Nested alias: its $N are the words this alias's own arguments became
+        return self.inner.expand(line.split()) if self.inner else line
+
+
+def _compile_alias(name, seen=()):
+    """Resolve an alias whose first word is another alias; raises ValueError on a cycle."""
+    seen = seen + (name,)
+    template = _aliases[name].strip()
+    parts = template.split(None, 1)
+    word = parts[0] if parts else ""
+    # alias ls='ls -a' refers to the real ls, not to itself
+    if word in _aliases and word != name:
+        if word in seen:
+            raise ValueError(" → ".join(seen + (word,)))
+        return _CompiledAlias(parts[1] if len(parts) > 1 else "", inner=_compile_alias(word, seen))
+    return _CompiledAlias(template)
+
+
+def compile_aliases():
+    """Rebuild the alias expansion cache from _aliases."""
+    global _alias_cache
+    cache = {}
+    for name in _aliases:
+        try:
+            cache[name] = _compile_alias(name)
+        except ValueError as e:
+            cache[name] = _CompiledAlias("", error=f"alias cycle: {e}")
+            print(f"⚠️ Alias '{name}' is disabled ({cache[name].error})")
+    _alias_cache = cache
+    sync_command_trie()
+
+
+def expand_alias(cmd_line):
+    """Expand a leading alias in cmd_line (one dict lookup when it is not an alias)."""
+    parts = cmd_line.split(None, 1)
+    compiled = _alias_cache.get(parts[0]) if parts else None
+    if compiled is None:
+        return cmd_line
+    if compiled.error:
+        print(f"⚠️ {parts[0]}: {compiled.error}")
+        return ""
+    return compiled.expand(parts[1].split() if len(parts) > 1 else [])
+
+
 def save_aliases():
     """Save aliases to a JSON file (same directory as terminal)."""
     try:
@@ -51,17 +198,16 @@ def save_aliases():
     except Exception as e:
         print(f"⚠️ Failed to save aliases: {e}")
 
-def load_aliases():
-    """Load aliases from disk and register them as commands."""
+def load_aliases(verbose=True):
+    """Load aliases from disk and compile them for expansion."""
     global _aliases
     if not os.path.exists(ALIAS_FILE):
         return
     try:
         with open(ALIAS_FILE, "r") as f:
             _aliases.update(json.load(f))
-        for name, cmd in _aliases.items():
-            registered_commands[name] = lambda a, c=cmd: handle_command(c)
-        if _aliases:
+        compile_aliases()
+        if _aliases and verbose:
             print(f"📦 Loaded {len(_aliases)} aliases from {ALIAS_FILE}")
     except Exception as e:
         print(f"⚠️ Failed to load aliases: {e}")
@@ -76,7 +222,240 @@ DonutRunning = False
 # ==========================
 # GLOBALS
 # ==========================
-command_history = []
+HISTORY_FILE = os.path.join(BASE_DIR, "pynix_history")
+HISTORY_MAX_ENTRIES = 10000       # ring buffer cap (entries)
+HISTORY_MAX_BYTES = 1 << 20       # ring buffer cap (bytes); also how much of the log is read at startup
+
+
+def _trigrams(text):
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class _HistoryIndex:
+    """Prefix (sorted list + bisect) and substring (trigram postings) lookup over unique commands."""
+
+    def __init__(self):
+        self.latest = {}     # command -> newest history number
+        self.counts = {}     # command -> occurrences still in the ring buffer
+        self.sorted = []
+        self.grams = {}
+
+    def add(self, cmd, number):
+        if cmd not in self.counts:
+            import bisect
+            self.counts[cmd] = 0
+            bisect.insort(self.sorted, cmd)
+            for g in _trigrams(cmd):
+                self.grams.setdefault(g, set()).add(cmd)
+        self.counts[cmd] += 1
+        self.latest[cmd] = number
+
+    def remove(self, cmd):
+        """Forget one (evicted) occurrence of cmd."""
+        left = self.counts.get(cmd, 0) - 1
+        if left > 0:
+            self.counts[cmd] = left
+            return
+        import bisect
+        self.counts.pop(cmd, None)
+        self.latest.pop(cmd, None)
+        i = bisect.bisect_left(self.sorted, cmd)
+        if i < len(self.sorted) and self.sorted[i] == cmd:
+            del self.sorted[i]
+        for g in _trigrams(cmd):
+            posting = self.grams.get(g)
+            if posting is not None:
+                posting.discard(cmd)
+                if not posting:
+                    del self.grams[g]
+
+    def prefix(self, text):
+        import bisect
+        i = bisect.bisect_left(self.sorted, text)
+        out = []
+        while i < len(self.sorted) and self.sorted[i].startswith(text):
+            out.append(self.sorted[i])
+            i += 1
+        return out
+
+    def substring(self, term):
+        term = term.lower()
+        grams = _trigrams(term)
+        if not grams:
+            candidates = self.latest
+        else:
+            postings = sorted((self.grams.get(g, ()) for g in grams), key=len)
+            if not postings[0]:
+                return []
+            candidates = set(postings[0]).intersection(*postings[1:])
+        return [c for c in candidates if term in c.lower()]
+
+
+class CommandHistory:
+    """Command history backed by an append-only log shared by every PyTerm instance.
+
+    Only the newest HISTORY_MAX_ENTRIES / HISTORY_MAX_BYTES are kept in memory;
+    the search index is built on first use and then kept in step with the buffer.
+    """
+
+    def __init__(self, path, max_entries=HISTORY_MAX_ENTRIES, max_bytes=HISTORY_MAX_BYTES):
+        from collections import deque
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = deque()
+        self.bytes = 0
+        self.first_number = 1
+        self._offset = 0          # bytes of the log already consumed
+        self._index = None
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __bool__(self):
+        return bool(self.entries)
+
+    def __iter__(self):
+        return iter(list(self.entries))
+
+    @property
+    def last_number(self):
+        return self.first_number + len(self.entries) - 1
+
+    def numbered(self, last=None):
+        """Return [(number, command)] for the whole buffer or its newest `last` entries."""
+        with self._lock:
+            entries = list(self.entries)
+            start = self.first_number
+        if last is not None:
+            skip = max(0, len(entries) - last)
+            entries, start = entries[skip:], start + skip
+        return list(enumerate(entries, start=start))
+
+    def get(self, number):
+        with self._lock:
+            i = number - self.first_number
+            if 0 <= i < len(self.entries):
+                return self.entries[i]
+        return None
+
+    def _push(self, cmd):
+        self.entries.append(cmd)
+        self.bytes += len(cmd) + 1
+        if self._index is not None:
+            self._index.add(cmd, self.last_number)
+        while self.entries and (len(self.entries) > self.max_entries or self.bytes > self.max_bytes):
+            old = self.entries.popleft()
+            self.bytes -= len(old) + 1
+            self.first_number += 1
+            if self._index is not None:
+                self._index.remove(old)
+
+    def _ingest(self, data):
+        """Push complete lines from raw log bytes; return how many bytes were consumed."""
+        end = data.rfind(b"\n") + 1     # a trailing partial line is another instance mid-write
+        if not end:
+            return 0
+        lines = data[:end].decode("utf-8", "replace").splitlines()
+        for cmd in lines[-self.max_entries:]:   # older lines would be evicted straight away
+            if cmd:
+                self._push(cmd)
+        return end
+
+    def load(self):
+        """Read the tail of the log into the ring buffer (bounded by max_bytes, not by log size)."""
+        with self._lock:
+            try:
+                with open(self.path, "rb") as f:
+                    size = f.seek(0, os.SEEK_END)
+                    start = max(0, size - self.max_bytes)
+                    f.seek(start)
+                    data = f.read()
+            except FileNotFoundError:
+                return 0
+            except OSError as e:
+                print(f"⚠️ Failed to load history: {e}")
+                return 0
+            skip = 0
+            if start:
+                skip = data.find(b"\n") + 1   # drop the line cut in half by the seek
+            self._offset = start + skip + self._ingest(data[skip:])
+            return len(self.entries)
+
+    def refresh(self):
+        """Pick up commands appended to the log since the last read (by any instance)."""
+        with self._lock:
+            try:
+                with open(self.path, "rb") as f:
+                    truncated = False
+                    if self._offset:
+                        # Another instance ran 'history -c': the log is shorter than what we
+                        # consumed, or has grown back so that our offset is mid-line
+                        f.seek(self._offset - 1)
+                        truncated = f.read(1) != b"\n"
+                    if not truncated:
+                        data = f.read()
+            except OSError:
+                return
+            if truncated:
+                self._forget()
+                self.load()
+                return
+            self._offset += self._ingest(data)
+
+    def append(self, cmd):
+        """Append cmd to the shared log, then pull it (and anything newer) into memory."""
+        cmd = " ".join(cmd.splitlines()).strip()
+        if not cmd:
+            return
+        with self._lock:
+            try:
+                # O_APPEND: single small writes from several instances don't interleave
+                with open(self.path, "ab") as f:
+                    f.write(cmd.encode("utf-8") + b"\n")
+            except OSError:
+                self._push(cmd)    # unwritable log: keep a session-only history
+                return
+            self.refresh()
+
+    def _forget(self):
+        """Empty the ring buffer (numbers keep counting up)."""
+        self.first_number += len(self.entries)
+        self.entries.clear()
+        self.bytes = 0
+        self._index = None
+        self._offset = 0
+
+    def clear(self):
+        with self._lock:
+            self._forget()
+            try:
+                with open(self.path, "wb"):
+                    pass
+            except OSError:
+                pass
+
+    def _ensure_index(self):
+        if self._index is None:
+            index = _HistoryIndex()
+            for number, cmd in enumerate(self.entries, start=self.first_number):
+                index.add(cmd, number)
+            self._index = index
+        return self._index
+
+    def search(self, term, prefix=False):
+        """Return [(number, command)] of unique matches, most recent first."""
+        with self._lock:
+            index = self._ensure_index()
+            found = index.prefix(term) if prefix else index.substring(term)
+            hits = [(index.latest[c], c) for c in found]
+        hits.sort(reverse=True)
+        return hits
+
+
+command_history = CommandHistory(HISTORY_FILE)
 
 
 # Global clipboard variable
@@ -95,79 +474,381 @@ def confirm_action(title, message):
 # extneral command loader    
 import traceback
 
-def load_external_commands():
-    """Load all Python command files from /commands and /commands/added."""
-    base_dir = os.path.join(os.getcwd(), "commands")
-    added_dir = os.path.join(base_dir, "added")
+# =======================================
+# Plugin manifest
+# =======================================
+# csync keeps a manifest of every plugin file it has loaded (size, mtime,
+# content hash, module name and the commands it registered). Files whose
+# stat still matches are skipped, changed files are reloaded, and commands
+# coming from deleted files are unregistered.
 
-    os.makedirs(base_dir, exist_ok=True)
-    os.makedirs(added_dir, exist_ok=True)
+PLUGIN_MANIFEST_NAME = ".pynix_manifest.json"
+PLUGIN_MANIFEST_VERSION = 2
 
-    loaded_count = 0
-    failed_files = []
 
-    # Scan both main /commands and /commands/added
-    command_dirs = [base_dir, added_dir]
+def _plugin_base_dir():
+    return os.path.join(os.getcwd(), "commands")
 
-    for cmd_dir in command_dirs:
-        if not os.path.exists(cmd_dir):
-            continue
 
-        for file in os.listdir(cmd_dir):
-            if not file.endswith(".py"):
-                continue
+def _plugin_module_name(file_path, base_dir):
+    """Synthetic module name for a plugin file: cmd_<stem>_<hash of relpath>."""
+    rel_path = os.path.relpath(file_path, base_dir)
+    hash_suffix = hashlib.md5(rel_path.encode()).hexdigest()[:6]
+    return f"cmd_{os.path.splitext(os.path.basename(file_path))[0]}_{hash_suffix}"
+
+
+def _file_digest(file_path):
+    h = hashlib.md5()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _scan_plugin_files(base_dir):
+    """Return every .py file under base_dir (recursively), skipping caches."""
+    files = []
+    for root, dirs, names in os.walk(base_dir):
+        dirs[:] = [d for d in dirs if d != "__pycache__"]
+        for name in names:
+            if name.endswith(".py"):
+                files.append(os.path.join(root, name))
+    return files
+
+
+def load_plugin_manifest(base_dir):
+    path = os.path.join(base_dir, PLUGIN_MANIFEST_NAME)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") == PLUGIN_MANIFEST_VERSION:
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return {"version": PLUGIN_MANIFEST_VERSION, "files": {}}
+
+
+def save_plugin_manifest(base_dir, manifest):
+    path = os.path.join(base_dir, PLUGIN_MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"⚠️ Failed to save plugin manifest: {e}")
+
+
+def _unregister_plugin(entry):
+    """Remove the commands and module recorded for a manifest entry."""
+    module_name = entry.get("module")
+    for name in entry.get("commands", []):
+        func = registered_commands.get(name)
+        if func is not None and getattr(func, "__module__", None) == module_name:
+            if name in _builtin_commands:
+                registered_commands[name] = _builtin_commands[name]
+            else:
+                del registered_commands[name]
+    sys.modules.pop(module_name, None)
+
+
+def _plugin_is_live(entry):
+    """True if every command of the entry is registered from its module (or a stub of it)."""
+    module_name = entry.get("module")
+    commands = entry.get("commands", [])
+    if not commands:
+        return module_name in sys.modules
+    for name in commands:
+        func = registered_commands.get(name)
+        if func is None or getattr(func, "__module__", None) != module_name:
+            return False
+    return True
+
+
+# Matches @register_command("name") without importing the file
+_REGISTER_COMMAND_RE = re.compile(r'@register_command\(\s*(["\'])(.*?)\1\s*[,)]')
+
+
+def scan_plugin_commands(source):
+    """Return the command names a plugin source declares with @register_command."""
+    return list(dict.fromkeys(m[1] for m in _REGISTER_COMMAND_RE.findall(source)))
+
+
+# Registration the scan cannot read: register_command(<not a string literal>)
+# or writing registered_commands[...] directly (a loop, a variable, a shim)
+_DYNAMIC_REGISTRATION_RE = re.compile(
+    r'register_command\((?!\s*(["\'])[^"\'\n]*\1\s*[,)])|registered_commands\s*\[[^\]]*\]\s*=(?!=)')
+
+
+# The register_command() shim plugins define for themselves (see readme.txt)
+_REGISTER_SHIM_RE = re.compile(r'^def register_command\(.*?(?=^\S)', re.M | re.S)
+
+
+def plugin_needs_import(source, commands):
+    """True when lazy stubs cannot stand in for a plugin: it has to be imported to learn its commands."""
+    if not commands:
+        return True
+    return _DYNAMIC_REGISTRATION_RE.search(_REGISTER_SHIM_RE.sub("", source)) is not None
+
+
+_plugin_load_lock = threading.Lock()
+
+
+class _PluginStub:
+    """
+    Placeholder registered for a plugin command that has not been imported yet.
+    The first call executes the plugin file (which replaces every stub of that
+    file with the real functions) and then forwards the call.
+    """
+
+    def __init__(self, name, base_dir, rel_path, module_name):
+        self.name = name
+        self.base_dir = base_dir
+        self.rel_path = rel_path
+        self.file_path = os.path.join(base_dir, rel_path)
+        self.__module__ = module_name
+        self.__doc__ = f"Plugin command from {self.file_path} (not loaded yet)."
+
+    def load(self):
+        """Import the plugin file if needed and return the real command function."""
+        with _plugin_load_lock:
+            func = registered_commands.get(self.name)
+            if func is self:
+                commands, _ = _exec_plugin(self.file_path, self.__module__, self.base_dir)
+                # Keep the manifest in line with what the file really registered
+                manifest = load_plugin_manifest(self.base_dir)
+                entry = manifest["files"].get(self.rel_path)
+                if entry is not None and entry.get("module") == self.__module__:
+                    entry["commands"] = commands
+                    entry["imported"] = True
+                    save_plugin_manifest(self.base_dir, manifest)
+                func = registered_commands.get(self.name)
+        if func is None or func is self:
+            raise LookupError(f"{self.rel_path} no longer registers '{self.name}'")
+        return func
+
+    def __call__(self, args):
+        return self.load()(args)
+
+    def __repr__(self):
+        return f"<plugin stub '{self.name}' from {self.rel_path}>"
+
+
+# Compiled plugin code lives in commands/__pycache__/pynix/<source md5>.<tag>.pyc.
+# Keying on the source hash (not the path or mtime) means a renamed, touched
+# or restored file never has to be recompiled, and synthetic cmd_* module
+# names never collide with the regular __pycache__ entries.
+PLUGIN_BYTECODE_DIR = os.path.join("__pycache__", "pynix")
+
+_bytecode_stats = {"hits": 0, "misses": 0}
+
+
+def _bytecode_path(base_dir, digest):
+    tag = sys.implementation.cache_tag or "py"
+    return os.path.join(base_dir, PLUGIN_BYTECODE_DIR, f"{digest}.{tag}.pyc")
+
+
+def _relocate_code(code, file_path):
+    """Point a cached code object (and its nested functions) at file_path."""
+    consts = tuple(_relocate_code(c, file_path) if isinstance(c, type(code)) else c
+                   for c in code.co_consts)
+    return code.replace(co_filename=file_path, co_consts=consts)
+
+
+def _load_plugin_code(file_path, base_dir):
+    """Return (code, digest) for a plugin, using the bytecode cache when valid."""
+    import marshal
+
+    with open(file_path, "rb") as f:
+        source = f.read()
+    digest = hashlib.md5(source).hexdigest()
+    cache_path = _bytecode_path(base_dir, digest)
+    header = importlib.util.MAGIC_NUMBER + bytes.fromhex(digest)
+
+    try:
+        with open(cache_path, "rb") as f:
+            data = f.read()
+        if data[:len(header)] == header:
+            code = marshal.loads(data[len(header):])
+            if code.co_filename != file_path:
+                code = _relocate_code(code, file_path)   # same source, new place: keep tracebacks right
+            _bytecode_stats["hits"] += 1
+            return code, digest
+    except (OSError, ValueError, EOFError, TypeError):
+        pass
+
+    code = compile(source, file_path, "exec", dont_inherit=True)
+    _bytecode_stats["misses"] += 1
+
+    if not sys.dont_write_bytecode:
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(header + marshal.dumps(code))
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            pass
+    return code, digest
 
-            file_path = os.path.join(cmd_dir, file)
-            module_name = f"cmd_{os.path.basename(cmd_dir)}_{file[:-3]}"
 
+def _prune_bytecode_cache(base_dir, keep_digests):
+    """Delete cached code objects whose source hash is no longer in use."""
+    cache_dir = os.path.join(base_dir, PLUGIN_BYTECODE_DIR)
+    try:
+        names = os.listdir(cache_dir)
+    except OSError:
+        return
+    for name in names:
+        if name.split(".", 1)[0] not in keep_digests:
             try:
-                # Unload if already imported
-                if module_name in sys.modules:
-                    del sys.modules[module_name]
+                os.remove(os.path.join(cache_dir, name))
+            except OSError:
+                pass
 
-                spec = importlib.util.spec_from_file_location(module_name, file_path)
-                if not spec or not spec.loader:
-                    print(f"⚠️ Skipping invalid module: {file}")
-                    continue
 
-                # Create the module
-                module = importlib.util.module_from_spec(spec)
+def _exec_plugin(file_path, module_name, base_dir):
+    """Execute a plugin file; return (command names it registered, source digest)."""
+    spec = importlib.util.spec_from_file_location(module_name, file_path)
+    if not spec or not spec.loader:
+        raise ImportError(f"invalid module: {file_path}")
 
-                # Inject shared globals so register_command() works
-                import __main__
-                module.__dict__["registered_commands"] = __main__.registered_commands
-                module.__dict__["handle_command"] = __main__.handle_command
+    code, digest = _load_plugin_code(file_path, base_dir)
+    module = importlib.util.module_from_spec(spec)
+    module.__cached__ = _bytecode_path(base_dir, digest)
+    # Inject shared globals so register_command() works
+    module.__dict__["registered_commands"] = registered_commands
+    module.__dict__["handle_command"] = handle_command
 
-                # Execute the file in that context
-                spec.loader.exec_module(module)
-                sys.modules[module_name] = module
-                loaded_count += 1
+    before = dict(registered_commands)
+    sys.modules[module_name] = module
+    try:
+        exec(code, module.__dict__)
+    except BaseException:
+        sys.modules.pop(module_name, None)
+        raise
+    return [name for name, func in registered_commands.items() if before.get(name) is not func], digest
 
-            except Exception as e:
-                failed_files.append((file, str(e)))
+
+def sync_plugins(base_dir=None, force=False, lazy=False, verbose=True):
+    """
+    Bring loaded plugins in line with the files under base_dir.
+
+    With lazy=True, new or changed files are not imported: their commands are
+    registered as stubs from the manifest (or a regex scan of the source) and
+    the file is executed the first time one of them is called. Files whose
+    commands neither can name (none found, or registered through a variable,
+    a loop or registered_commands[...]) are imported right away instead.
+
+    Returns a dict with the lists of loaded, deferred, unchanged, removed and
+    failed files.
+    """
+    base_dir = base_dir or _plugin_base_dir()
+    os.makedirs(base_dir, exist_ok=True)
+
+    manifest = load_plugin_manifest(base_dir)
+    old_entries = manifest["files"]
+    new_entries = {}
+    result = {"loaded": [], "deferred": [], "unchanged": [], "removed": [], "failed": []}
+
+    for file_path in _scan_plugin_files(base_dir):
+        rel_path = os.path.relpath(file_path, base_dir)
+        try:
+            st = os.stat(file_path)
+        except OSError as e:
+            result["failed"].append((file_path, str(e)))
+            continue
+
+        entry = old_entries.get(rel_path)
+        same_stat = bool(entry) and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns
+
+        if entry and not force and _plugin_is_live(entry):
+            if same_stat:
+                new_entries[rel_path] = entry
+                result["unchanged"].append(file_path)
+                continue
+            # Touched but identical content: refresh the stat, skip the import
+            digest = _file_digest(file_path)
+            if digest == entry["hash"]:
+                new_entries[rel_path] = dict(entry, size=st.st_size, mtime_ns=st.st_mtime_ns)
+                result["unchanged"].append(file_path)
+                continue
+
+        if entry:
+            _unregister_plugin(entry)
+
+        module_name = _plugin_module_name(file_path, base_dir)
+        deferred = lazy
+        # A cached empty command list is trusted only if an import produced it (a helper module)
+        cached_ok = bool(entry) and (bool(entry["commands"]) or entry.get("imported", False))
+        try:
+            if lazy and same_stat and cached_ok:
+                # Cached scan: costs one stat call, no read and no import
+                digest, commands = entry["hash"], entry["commands"]
+            elif lazy:
+                with open(file_path, "rb") as f:
+                    data = f.read()
+                digest = hashlib.md5(data).hexdigest()
+                if cached_ok and entry["hash"] == digest:
+                    commands = entry["commands"]
+                else:
+                    source = data.decode("utf-8", errors="ignore")
+                    commands = scan_plugin_commands(source)
+                    deferred = not plugin_needs_import(source, commands)
+            if not deferred:
+                commands, digest = _exec_plugin(file_path, module_name, base_dir)
+        except Exception as e:
+            result["failed"].append((file_path, str(e)))
+            if verbose:
                 traceback.print_exc()
+            continue
 
-    print(f"🔄 Loaded {loaded_count} external command(s) from /commands.")
-    if failed_files:
-        print("⚠️ Failed to load:")
-        for name, err in failed_files:
-            print(f"  - {name}: {err}")
+        if deferred:
+            for name in commands:
+                registered_commands[name] = _PluginStub(name, base_dir, rel_path, module_name)
+
+        new_entries[rel_path] = {
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "hash": digest,
+            "module": module_name,
+            "commands": commands,
+            # the command list came from running the file, not from a source scan
+            "imported": not deferred or bool(entry and entry["hash"] == digest and entry.get("imported")),
+        }
+        result["deferred" if deferred else "loaded"].append(file_path)
+        if verbose and not (lazy and same_stat):
+            state = "Registered" if deferred else "Loaded"
+            print(f"✅ {state}: {rel_path} ({', '.join(commands) or 'no commands'})")
+
+    # Files that disappeared since the last sync
+    for rel_path, entry in old_entries.items():
+        if rel_path not in new_entries and not os.path.exists(os.path.join(base_dir, rel_path)):
+            _unregister_plugin(entry)
+            result["removed"].append(rel_path)
+            if verbose:
+                print(f"🗑️  Removed stale plugin: {rel_path} ({', '.join(entry.get('commands', []))})")
+
+    manifest["files"] = new_entries
+    save_plugin_manifest(base_dir, manifest)
+    _prune_bytecode_cache(base_dir, {entry["hash"] for entry in new_entries.values()})
+    sync_command_trie()
+    return result
 
-    import glob
 
-    def load_from_folder(folder):
-        for file_path in glob.glob(os.path.join(folder, "*.py")):
-            try:
-                module_name = os.path.splitext(os.path.basename(file_path))[0]
-                spec = importlib.util.spec_from_file_location(module_name, file_path)
-                module = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(module)
-                print(f"✅ Loaded command: {module_name}")
-            except Exception as e:
-                print(f"⚠️ Failed to load {file_path}: {e}")
+def load_external_commands():
+    """Load all Python command files from /commands and /commands/added."""
+    base_dir = _plugin_base_dir()
+    os.makedirs(os.path.join(base_dir, "added"), exist_ok=True)
 
-    load_from_folder(base_dir)
-    load_from_folder(added_dir)
+    result = sync_plugins(base_dir, lazy=True)
+    print(f"🔄 Registered {len(result['deferred'])} external command file(s) from /commands "
+          f"({len(result['unchanged'])} unchanged).")
+    if result["failed"]:
+        print("⚠️ Failed to load:")
+        for name, err in result["failed"]:
+            print(f"  - {name}: {err}")
+    return result
 
 # Store last program list for launch by number
 last_program_list = []
@@ -177,13 +858,88 @@ last_program_list = []
 # =======================================
 registered_commands = {}
 
-def register_command(name):
+# Built-in commands as they were before any plugin was loaded, so a plugin
+# that shadows one can be unloaded without losing the original.
+_builtin_commands = {}
+
+def register_command(name, stream=False):
+    """
+    Register `func` as command `name`.
+    stream=True marks a generator command that also reads piped input from
+    its `stdin` keyword argument (an iterator of lines) in `a | b` pipelines.
+    """
     def wrapper(func):
+        if stream:
+            func.accepts_stdin = True
         registered_commands[name] = func
         return func
     return wrapper
 
 
+# =======================================
+# Structured output
+# =======================================
+# Commands that list things (ls, ps, du, df, view, find) build dict records
+# and hand them to render_records(), which turns them into lines lazily:
+# the usual fixed-width table, NDJSON (--json) or CSV (--csv).
+
+OUTPUT_FORMATS = {"--json": "json", "--csv": "csv"}
+
+
+def pop_output_format(args):
+    """Remove --json/--csv from args (in place) and return "json", "csv" or "table"."""
+    fmt = "table"
+    for flag, name in OUTPUT_FORMATS.items():
+        while flag in args:
+            args.remove(flag)
+            fmt = name
+    return fmt
+
+
+def render_records(records, fmt="table", header=(), row=None):
+    """
+    Yield one output line per record without building the whole result.
+      table → the `header` lines, then row(record) for each record
+      json  → one JSON object per line (NDJSON)
+      csv   → a header row from the first record's keys, then one row per record
+    """
+    if fmt == "json":
+        for record in records:
+            yield json.dumps(record, default=str)
+        return
+
+    if fmt == "csv":
+        import csv
+        import io
+
+        buf = io.StringIO()
+        writer = None
+        for record in records:
+            if writer is None:
+                writer = csv.DictWriter(buf, fieldnames=list(record), extrasaction="ignore")
+                writer.writeheader()
+            writer.writerow(record)
+            yield buf.getvalue().rstrip("\r\n")
+            buf.seek(0)
+            buf.truncate()
+        return
+
+    yield from header
+    for record in records:
+        yield row(record) if row else "  ".join(str(v) for v in record.values())
+
+
+def human_readable(size_bytes):
+    """Convert bytes to human-readable format."""
+    if not size_bytes:
+        return "0 B"
+    size_name = ("B", "KB", "MB", "GB", "TB", "PB")
+    i = min(int(math.floor(math.log(size_bytes, 1024))), len(size_name) - 1)
+    p = math.pow(1024, i)
+    s = round(size_bytes / p, 2)
+    return f"{s} {size_name[i]}"
+
+
 # =======================================
 # Custom Commands
 # =======================================
@@ -209,11 +965,32 @@ def whoami(args):
 def hello(args):
     print("Hello, world!")
 
-@register_command("ls")
-def list_files(args):
+@register_command("ls", stream=True)
+def list_files(args, stdin=None):
+    """List files in a directory. --json/--csv emit name, type, size and mtime records."""
+    fmt = pop_output_format(args)
     path = args[0] if args else "."
-    for f in os.listdir(path):
-        print(f)
+    if fmt == "table":
+        for f in os.listdir(path):
+            yield f
+        return
+
+    def records():
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                if entry.is_symlink():
+                    kind = "link"
+                elif entry.is_dir(follow_symlinks=False):
+                    kind = "dir"
+                else:
+                    kind = "file"
+                yield {"name": entry.name, "type": kind, "size": st.st_size, "mtime": st.st_mtime}
+
+    yield from render_records(records(), fmt)
 
 @register_command("clear")
 def clear(args):
@@ -281,6 +1058,7 @@ def cd_cmd(args):
     path = os.path.abspath(path)
 
     if not os.path.exists(path):
+        set_exit_status(1)
         print(f"❌ Path not found: {path}")
         return
 
@@ -290,8 +1068,10 @@ def cd_cmd(args):
             os.chdir(path)
             print(f"📁 Changed directory to: {path}")
         except Exception as e:
+            set_exit_status(1)
             print(f"⚠️ Error: {e}")
     else:
+        set_exit_status(1)
         print(f"📄 Target is a file: {path}")
 
 @register_command("opendrop")
@@ -445,6 +1225,21 @@ def touch(args):
     except Exception as e:
         print(f"Error creating file: {e}")
         
+def remove_path(path):
+    """
+    Delete a file, or a folder with everything in it (the logic behind rm).
+    Returns "file" or "folder", or None for anything else (left alone).
+    """
+    if os.path.isfile(path):
+        os.remove(path)
+        return "file"
+    if os.path.isdir(path):
+        # Delete folders (including non-empty)
+        shutil.rmtree(path)
+        return "folder"
+    return None
+
+
 @register_command("rm")
 def remove_item(args):
     """Remove one or more files or folders."""
@@ -456,24 +1251,23 @@ def remove_item(args):
         path = os.path.join(os.getcwd(), name)
 
         if not os.path.exists(path):
+            set_exit_status(1)
             print(f"Not found: {name}")
             continue
 
         try:
-            if os.path.isfile(path):
-                os.remove(path)
+            kind = remove_path(path)
+            if kind == "file":
                 print(f"Removed file: {name}")
-            elif os.path.isdir(path):
-                # Delete folders (including non-empty)
-                shutil.rmtree(path)
+            elif kind == "folder":
                 print(f"Removed folder: {name}")
             else:
+                set_exit_status(1)
                 print(f"Unknown type (skipped): {name}")
         except Exception as e:
+            set_exit_status(1)
             print(f"Error removing {name}: {e}")
 
-import curses
-
 @register_command("nano")
 def nano(args):
     """Advanced Nano-like editor with multiple files, clipboard, and top/bottom navigation."""
@@ -1061,10 +1855,13 @@ def gitstatus(args):
         print(f"⚠️ Error running gitstatus: {e}")
         
         
-@register_command("cat")
-def cat(args):
-    """Display the contents of a text file."""
+@register_command("cat", stream=True)
+def cat(args, stdin=None):
+    """Display the contents of a text file (streams line by line)."""
     if not args:
+        if stdin is not None:
+            yield from stdin
+            return
         print("Usage: cat <filename>")
         return
 
@@ -1072,18 +1869,21 @@ def cat(args):
     path = os.path.join(os.getcwd(), filename)
 
     if not os.path.exists(path):
+        set_exit_status(1)
         print(f"File not found: {filename}")
         return
 
     if os.path.isdir(path):
+        set_exit_status(1)
         print(f"'{filename}' is a directory.")
         return
 
     try:
         with open(path, "r", encoding="utf-8") as f:
-            content = f.read()
-            print(content)
+            for line in f:
+                yield line.rstrip("\n")
     except Exception as e:
+        set_exit_status(1)
         print(f"Error reading file: {e}")
         
 @register_command("back")
@@ -1150,8 +1950,10 @@ def tree(args):
     term_width = shutil.get_terminal_size((80, 20)).columns
 
     print(path)
+    cancel = current_cancel_token()
 
     def walk(dir_path, prefix="", depth=0):
+        cancel.check()
         if max_depth is not None and depth >= max_depth:
             return
 
@@ -1176,52 +1978,285 @@ def tree(args):
                 walk(full_path, prefix + extension, depth + 1)
 
     walk(path)
-            
+
+
+DU_CACHE_FILE = os.path.join(BASE_DIR, "pynix_du_cache.sqlite")
+DU_CACHE_RACY_NS = 2_000_000_000   # directories changed this recently are not cached yet
+
+
+def _allocated(st):
+    return st.st_blocks * 512 if hasattr(st, "st_blocks") else st.st_size
+
+
+def _subtree_range(path):
+    """(first, end) keys bounding every path strictly below `path` in sorted order."""
+    prefix = path if path.endswith(os.sep) else path + os.sep
+    return prefix, prefix[:-1] + chr(ord(os.sep) + 1)
+
+
+class DiskUsageCache:
+    """
+    Per-directory sizes for du kept in SQLite between runs. A row holds a directory's
+    inode and mtime, the size of its own entries (blocks and apparent) and the names of
+    its subdirectories. Creating, deleting or renaming an entry changes the directory's
+    mtime, so while inode and mtime match the row stands in for listing the directory:
+    a repeat du costs one lstat per directory instead of one stat per file.
+    Directories holding hard-linked files are never cached: which link counts depends
+    on what the run saw first, so their totals are only valid for that run.
+    Files rewritten in place leave their directory's mtime alone; du --refresh rescans.
+    """
+
+    def __init__(self, path=DU_CACHE_FILE):
+        import sqlite3
+
+        self.db = sqlite3.connect(path, timeout=5)
+        self.db.execute("""CREATE TABLE IF NOT EXISTS dir_sizes (
+            path TEXT PRIMARY KEY, ino INTEGER, mtime_ns INTEGER,
+            blocks INTEGER, apparent INTEGER, subdirs TEXT)""")
+
+    def load(self, top):
+        """Rows for `top` and everything below it: path -> (ino, mtime_ns, blocks, apparent, subdirs)."""
+        first, end = _subtree_range(top)
+        rows = self.db.execute(
+            "SELECT path, ino, mtime_ns, blocks, apparent, subdirs FROM dir_sizes"
+            " WHERE path = ? OR (path >= ? AND path < ?)", (top, first, end))
+        return {row[0]: row[1:] for row in rows}
+
+    def save(self, scanner):
+        """Store the directories `scanner` had to list, and drop subtrees that are gone."""
+        with self.db:
+            self.db.executemany("INSERT OR REPLACE INTO dir_sizes VALUES (?, ?, ?, ?, ?, ?)", scanner.fresh)
+            for path in scanner.vanished:
+                self.db.execute("DELETE FROM dir_sizes WHERE path = ? OR (path >= ? AND path < ?)",
+                                (path, *_subtree_range(path)))
+
+    def close(self):
+        self.db.close()
+
+
+def attach_du_cache(scanner, top, refresh=False):
+    """Give `scanner` the cached rows under `top`; returns the open DiskUsageCache, or None if unusable."""
+    cache = None
+    try:
+        cache = DiskUsageCache()
+        scanner.cached = {} if refresh else cache.load(top)
+        return cache
+    except Exception as e:
+        if cache is not None:
+            cache.close()
+        print(f"⚠️ du cache unavailable ({e}); scanning without it.")
+        return None
+
+
+def save_du_cache(cache, scanner):
+    """Store what `scanner` listed; a cache that cannot be written only costs a warning."""
+    if cache is None:
+        return
+    try:
+        cache.save(scanner)
+    except Exception as e:
+        print(f"⚠️ Could not update the du cache: {e}")
+
+
+class DiskUsageScanner:
+    """
+    Bottom-up directory totals for du from a single scandir pass: every directory
+    is listed once and every file stat'ed once, then its total is added to its
+    parent's. Sizes are allocated blocks (like Unix du) or, with apparent=True,
+    file lengths; a file with several hard links is only counted the first time.
+    `cached` (from DiskUsageCache.load) lets unchanged directories skip the listing;
+    the directories that were listed are collected in `fresh` for DiskUsageCache.save.
+    """
+
+    def __init__(self, apparent=False, cached=None):
+        self.apparent = apparent or os.name == "nt"   # no st_blocks on Windows
+        self.cancel = current_cancel_token()   # captured here: workers are other threads
+        self.cached = cached
+        self.fresh = []         # rows for the cache: directories that had to be listed
+        self.vanished = []      # cached subdirectories that no longer exist
+        self.reused = 0
+        self.errors = 0
+        self.stopped = False    # set when the reader went away (du ... | head): workers give up
+        self._seen_inodes = set()
+        self._lock = threading.Lock()
+        self._racy_after = time.time_ns() - DU_CACHE_RACY_NS
+
+    def size_of(self, st):
+        """Blocks allocated (or apparent length) for one os.stat_result."""
+        return st.st_size if self.apparent else _allocated(st)
+
+    def _counted_once(self, st):
+        """False for a hard link to a file that was already counted."""
+        if st.st_nlink < 2:
+            return True
+        key = (st.st_dev, st.st_ino)
+        with self._lock:
+            if key in self._seen_inodes:
+                return False
+            self._seen_inodes.add(key)
+            return True
+
+    def scan_dir(self, path):
+        """(size of the directory itself plus its non-directory entries, sorted subdirectory paths)."""
+        self.cancel.check()
+        if self.stopped:
+            raise CommandCancelled()
+        try:
+            st = os.lstat(path)
+        except OSError:
+            with self._lock:
+                self.errors += 1
+            return 0, []
+
+        row = self.cached.get(path) if self.cached else None
+        if row is not None and row[0] == st.st_ino and row[1] == st.st_mtime_ns:
+            self.reused += 1
+            names = row[4].split("\0") if row[4] else []
+            return row[3] if self.apparent else row[2], [os.path.join(path, name) for name in names]
+
+        blocks, apparent, names = _allocated(st), st.st_size, []
+        linked = False      # holds a hard-linked file: this total depends on the run, do not cache it
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            names.append(entry.name)
+                            continue
+                        st_entry = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    linked = linked or st_entry.st_nlink > 1
+                    if self._counted_once(st_entry):
+                        blocks += _allocated(st_entry)
+                        apparent += st_entry.st_size
+        except OSError:
+            with self._lock:
+                self.errors += 1
+            return (apparent if self.apparent else blocks), []
+
+        names.sort()
+        if self.cached is not None and not linked and st.st_mtime_ns < self._racy_after:
+            with self._lock:
+                self.fresh.append((path, st.st_ino, st.st_mtime_ns, blocks, apparent, "\0".join(names)))
+                if row is not None and row[4]:
+                    self.vanished.extend(os.path.join(path, name)
+                                         for name in set(row[4].split("\0")).difference(names))
+        return (apparent if self.apparent else blocks), [os.path.join(path, name) for name in names]
+
+    def _frame(self, path, depth):
+        own, subdirs = self.scan_dir(path)
+        return [path, depth, own, subdirs[::-1]]   # path, depth, running total, subdirs left (popped from the end)
+
+    def walk(self, top, depth=0):
+        """Yield (path, total, depth) for `top` and every directory below it, children first (`top` last)."""
+        stack = [self._frame(top, depth)]
+        while stack:
+            frame = stack[-1]
+            if frame[3]:
+                stack.append(self._frame(frame[3].pop(), frame[1] + 1))
+                continue
+            stack.pop()
+            if stack:
+                stack[-1][2] += frame[2]
+            yield frame[0], frame[2], frame[1]
+
+    def total(self, top, max_depth=None, jobs=1):
+        """
+        Walk `top` and yield (path, total, depth) for directories no deeper than max_depth,
+        children first, `top` last. With jobs > 1 the subtrees directly under `top` are
+        walked on a thread pool; output order stays the same.
+        """
+        def shown(row):
+            return max_depth is None or row[2] <= max_depth
+
+        if jobs <= 1:
+            yield from filter(shown, self.walk(top))
+            return
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        def subtree(path):
+            rows, subtotal = [], 0
+            for row in self.walk(path, 1):
+                if shown(row):
+                    rows.append(row)
+                subtotal = row[1]   # the last row is `path` itself
+            return subtotal, rows
+
+        total, subdirs = self.scan_dir(top)
+        with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="pynix-du") as pool:
+            futures = [pool.submit(subtree, path) for path in subdirs]
+            try:
+                for future in futures:
+                    subtotal, rows = future.result()
+                    total += subtotal
+                    yield from rows
+            finally:
+                self.stopped = True   # no-op after a full walk; stops the workers on an early exit
+                for future in futures:
+                    future.cancel()
+        yield top, total, 0
+
+
 @register_command("du")
 def du(args):
-    """Show disk usage (like Unix 'du'). Supports -s for summary and -f for file."""
-    import math
-
+    """
+    Show disk usage (like Unix 'du'), totalled bottom-up in one pass over the tree.
+    Usage:
+      du [path]                  → every directory under path, subdirectories first
+      du -s [path]               → only the total for path
+      du -d <n> [path]           → directories at most n levels down (--max-depth <n>)
+      du --apparent-size [path]  → file lengths instead of allocated disk blocks
+      du -j <n> [path]           → walk the top-level subdirectories on n threads
+      du --refresh [path]        → ignore the size cache and list every directory again
+      du -f <file>               → size of a single file
+    Hard-linked files are counted once. --json/--csv output records.
+    Directories whose mtime has not changed since the last du are taken from
+    pynix_du_cache.sqlite instead of being listed again.
+    """
+    fmt = pop_output_format(args)
     path = os.getcwd()
-    show_total_only = False
-    show_file_only = False
+    max_depth = None
+    apparent = False
+    refresh = False
+    jobs = 1
     file_target = None
 
     # Parse arguments
-    if args:
-        if args[0] == "-s":
-            show_total_only = True
-            if len(args) > 1:
-                path = args[1]
-        elif args[0] == "-f" and len(args) > 1:
-            show_file_only = True
-            file_target = args[1]
-        else:
-            path = args[0]
+    args = list(args)
+    try:
+        while args:
+            arg = args.pop(0)
+            if arg == "-s":
+                max_depth = 0
+            elif arg in ("-d", "--max-depth"):
+                max_depth = int(args.pop(0))
+            elif arg.startswith("--max-depth="):
+                max_depth = int(arg.split("=", 1)[1])
+            elif arg == "--apparent-size":
+                apparent = True
+            elif arg == "--refresh":
+                refresh = True
+            elif arg in ("-j", "--jobs"):
+                jobs = max(1, int(args.pop(0)))
+            elif arg == "-f":
+                file_target = args.pop(0)
+            elif arg.startswith("-"):
+                raise ValueError(arg)
+            else:
+                path = arg
+    except (IndexError, ValueError):
+        print("Usage: du [-s | -d <depth>] [--apparent-size] [--refresh] [-j <threads>] [path] | du -f <file>")
+        return
 
-    def human_readable(size_bytes):
-        if size_bytes == 0:
-            return "0 B"
-        size_name = ("B", "KB", "MB", "GB", "TB")
-        i = int(math.floor(math.log(size_bytes, 1024)))
-        p = math.pow(1024, i)
-        s = round(size_bytes / p, 2)
-        return f"{s} {size_name[i]}"
-
-    def get_size(start_path):
-        total_size = 0
-        for dirpath, dirnames, filenames in os.walk(start_path):
-            for f in filenames:
-                fp = os.path.join(dirpath, f)
-                if not os.path.islink(fp):
-                    try:
-                        total_size += os.path.getsize(fp)
-                    except FileNotFoundError:
-                        pass
-        return total_size
+    scanner = DiskUsageScanner(apparent)
+
+    def render(records):
+        return render_records(records, fmt, row=lambda r: f"{human_readable(r['size'])}\t{r['path']}")
 
     # --- Handle file mode ---
-    if show_file_only:
+    if file_target is not None:
         file_path = os.path.join(os.getcwd(), file_target)
         if not os.path.exists(file_path):
             print(f"File not found: {file_target}")
@@ -1229,81 +2264,297 @@ def du(args):
         if os.path.isdir(file_path):
             print(f"'{file_target}' is a directory. Use du -s instead.")
             return
-        size = os.path.getsize(file_path)
-        print(f"{human_readable(size)}\t{file_target}")
+        size = scanner.size_of(os.stat(file_path))
+        yield from render([{"size": size, "path": file_target}])
         return
 
-    # --- Handle folder modes ---
-    if not os.path.exists(path):
+    # --- Handle folder modes (a file just gets its own size, like Unix du) ---
+    if not os.path.isdir(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            set_exit_status(1)
+            print(f"Path not found: {path}")
+            return
+        yield from render([{"size": scanner.size_of(st), "path": path}])
+        return
+
+    # The cache is keyed by absolute path; rows are shown relative to what was typed
+    top = os.path.normpath(path)
+    abs_top = os.path.abspath(top)
+    cache = attach_du_cache(scanner, abs_top, refresh)
+
+    def records():
+        for dir_path, size, depth in scanner.total(abs_top, max_depth, jobs):
+            yield {"size": size, "path": top + dir_path[len(abs_top):]}
+
+    try:
+        yield from render(records())
+        save_du_cache(cache, scanner)
+    finally:
+        if cache is not None:
+            cache.close()
+    if scanner.errors:
+        print(f"⚠️ {scanner.errors} director{'y' if scanner.errors == 1 else 'ies'} could not be read.")
+
+
+# =======================================
+# duui: interactive disk usage browser
+# =======================================
+# One scan with DiskUsageScanner builds a tree of directory totals; a folder's
+# files are only listed the first time it is opened. The screen draws just the
+# rows that are visible, so a folder with 500k entries scrolls as fast as one
+# with ten. Deleting goes through remove_path() (rm) and subtracts the size from
+# every parent instead of scanning again.
+
+class _DuNode:
+    """A file or folder in the duui tree."""
+    __slots__ = ("name", "size", "parent", "dirs", "children")
+
+    def __init__(self, name, size, parent=None, dirs=None):
+        self.name = name
+        self.size = size
+        self.parent = parent
+        self.dirs = dirs            # subfolder nodes from the scan; None for a file
+        self.children = None        # subfolders + files, listed when first opened
+
+    @property
+    def is_dir(self):
+        return self.dirs is not None
+
+    def path(self):
+        parts = []
+        node = self
+        while node.parent is not None:
+            parts.append(node.name)
+            node = node.parent
+        return os.path.join(node.name, *reversed(parts))
+
+
+def build_du_tree(scanner, top, jobs=1):
+    """Scan `top` once and return its _DuNode, with every subfolder's total filled in."""
+    pending = {}    # folder path -> child nodes, which the walk reports before their parent
+    root = None
+    for path, size, depth in scanner.total(top, None, jobs):
+        root = _DuNode(os.path.basename(path) if depth else path, size, dirs=pending.pop(path, []))
+        for child in root.dirs:
+            child.parent = root
+        pending.setdefault(os.path.dirname(path), []).append(root)
+    return root
+
+
+def du_children(node, scanner):
+    """The folder's entries, largest first; files are listed from disk the first time."""
+    if node.children is None:
+        files = []
+        try:
+            with os.scandir(node.path()) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            continue
+                        files.append(_DuNode(entry.name, scanner.size_of(entry.stat(follow_symlinks=False)), node))
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        node.children = node.dirs + files
+    node.children.sort(key=lambda child: child.size, reverse=True)
+    return node.children
+
+
+def delete_du_node(node):
+    """
+    Remove the file/folder behind `node` from disk and from the tree, updating every parent's total.
+    Raises OSError (and leaves the tree alone) when nothing was deleted.
+    """
+    path = node.path()
+    if not node.is_dir:
+        os.unlink(path)     # also symlinks, sockets and FIFOs, which remove_path leaves alone
+    elif remove_path(path) != "folder":
+        raise OSError(f"no longer a folder: {path}")
+    parent = node.parent
+    parent.children.remove(node)
+    if node.is_dir:
+        parent.dirs.remove(node)
+    while parent is not None:
+        parent.size -= node.size
+        parent = parent.parent
+
+
+def _du_row(node, parent_size, width):
+    share = node.size / parent_size if parent_size else 0.0
+    bar = "#" * round(share * 10)
+    name = node.name + ("/" if node.is_dir else "")
+    return f"{human_readable(node.size):>10} [{bar:<10}] {share * 100:5.1f}% {name}"[:width]
+
+
+@register_command("duui")
+def duui(args):
+    """
+    Browse disk usage interactively (like ncdu).
+    Usage:
+      duui [path] [--apparent-size] [--refresh] [-j <threads>]
+    Keys: ↑/↓ (j/k), PgUp/PgDn, Home/End move · Enter/→ (l) opens a folder ·
+          ←/Backspace (h) goes back up · d deletes (asks first) · q/Esc quits
+    """
+    path = os.getcwd()
+    apparent = refresh = False
+    jobs = 1
+    args = list(args)
+    try:
+        while args:
+            arg = args.pop(0)
+            if arg == "--apparent-size":
+                apparent = True
+            elif arg == "--refresh":
+                refresh = True
+            elif arg in ("-j", "--jobs"):
+                jobs = max(1, int(args.pop(0)))
+            elif arg.startswith("-"):
+                raise ValueError(arg)
+            else:
+                path = arg
+    except (IndexError, ValueError):
+        print("Usage: duui [path] [--apparent-size] [--refresh] [-j <threads>]")
+        return
+
+    if not os.path.isdir(path):
         print(f"Path not found: {path}")
         return
+    if not sys.stdout.isatty():
+        print("⚠️ duui needs a terminal; use du for plain output.")
+        return
+
+    top = os.path.abspath(path)
+    print(f"🔍 Scanning {top} ...")
+    scanner = DiskUsageScanner(apparent)
+    cache = attach_du_cache(scanner, top, refresh)
+    try:
+        root = build_du_tree(scanner, top, jobs)
+        save_du_cache(cache, scanner)
+    finally:
+        if cache is not None:
+            cache.close()
+
+    def put(stdscr, y, text, attr=0):
+        try:
+            stdscr.addnstr(y, 0, text, max(1, stdscr.getmaxyx()[1] - 1), attr)
+        except curses.error:
+            pass    # bottom-right corner / tiny window
+
+    def browse(stdscr):
+        curses.curs_set(0)
+        stdscr.keypad(True)
+        node, cursor, scroll = root, 0, 0
+        back = []                           # (folder, cursor) to return to
+        entries = du_children(node, scanner)
+        message = f"{scanner.errors} folder(s) could not be read" if scanner.errors else ""
+
+        while True:
+            h, w = stdscr.getmaxyx()
+            rows = max(1, h - 2)
+            cursor = max(0, min(cursor, len(entries) - 1))
+            if cursor < scroll:
+                scroll = cursor
+            elif cursor >= scroll + rows:
+                scroll = cursor - rows + 1
+
+            # Only the visible slice is formatted and drawn
+            stdscr.erase()
+            put(stdscr, 0, f" duui  {node.path()}  {human_readable(node.size)}".ljust(w), curses.A_REVERSE)
+            for y, i in enumerate(range(scroll, min(len(entries), scroll + rows)), start=1):
+                put(stdscr, y, _du_row(entries[i], node.size, w - 1), curses.A_REVERSE if i == cursor else 0)
+            status = message or "arrows move  Enter open  Left back  d delete  q quit"
+            put(stdscr, h - 1, f" {len(entries):,} items  |  {status}", curses.A_DIM)
+            stdscr.refresh()
+            message = ""
+
+            key = stdscr.getch()
+            if key in (ord("q"), 27):
+                return
+            elif key in (curses.KEY_UP, ord("k")):
+                cursor -= 1
+            elif key in (curses.KEY_DOWN, ord("j")):
+                cursor += 1
+            elif key == curses.KEY_PPAGE:
+                cursor -= rows
+            elif key == curses.KEY_NPAGE:
+                cursor += rows
+            elif key in (curses.KEY_HOME, ord("g")):
+                cursor = 0
+            elif key in (curses.KEY_END, ord("G")):
+                cursor = len(entries) - 1
+            elif key in (curses.KEY_RIGHT, ord("l"), 10, 13, curses.KEY_ENTER):
+                if entries and entries[cursor].is_dir:
+                    back.append((node, cursor))
+                    node, cursor, scroll = entries[cursor], 0, 0
+                    entries = du_children(node, scanner)
+            elif key in (curses.KEY_LEFT, ord("h"), curses.KEY_BACKSPACE, 127, 8):
+                if back:
+                    child = node
+                    node, cursor = back.pop()
+                    entries = du_children(node, scanner)   # totals may have shrunk: re-sort
+                    cursor = entries.index(child) if child in entries else cursor
+            elif key == ord("d") and entries:
+                target = entries[cursor]
+                kind = "folder" if target.is_dir else "file"
+                put(stdscr, h - 1, f" Delete {kind} {target.path()}? (y/n)".ljust(w), curses.A_REVERSE | curses.A_BOLD)
+                stdscr.refresh()
+                if stdscr.getch() in (ord("y"), ord("Y")):
+                    try:
+                        delete_du_node(target)
+                        message = f"Removed {kind}: {target.name} ({human_readable(target.size)} freed)"
+                    except Exception as e:
+                        message = f"Error removing {target.name}: {e}"
+
+    curses.wrapper(browse)
+
 
-    if show_total_only:
-        total = get_size(path)
-        print(f"{human_readable(total)}\t{path}")
-    else:
-        for root, dirs, files in os.walk(path):
-            size = get_size(root)
-            print(f"{human_readable(size)}\t{root}")
-     
 @register_command("df")
 def disk_free(args):
-    """Show disk space usage (like Unix 'df')."""
+    """Show disk space usage (like Unix 'df'). -h for human sizes, --json/--csv for records."""
     import shutil
-    import math
-
-    def human_readable(size_bytes):
-        """Convert bytes to human-readable format."""
-        if size_bytes == 0:
-            return "0 B"
-        size_name = ("B", "KB", "MB", "GB", "TB")
-        i = int(math.floor(math.log(size_bytes, 1024)))
-        p = math.pow(1024, i)
-        s = round(size_bytes / p, 2)
-        return f"{s} {size_name[i]}"
 
+    fmt = pop_output_format(args)
     human = "-h" in args
 
-    print("Filesystem".ljust(20), "Size".rjust(10), "Used".rjust(10),
-          "Avail".rjust(10), "Use%".rjust(8), "Mounted on")
-
-    if os.name == "nt":
-        # Windows: list all available drives
-        import string
-        from ctypes import windll
+    def mounts():
+        if os.name == "nt":
+            # Windows: list all available drives
+            import string
+            from ctypes import windll
+
+            bitmask = windll.kernel32.GetLogicalDrives()
+            for letter in string.ascii_uppercase:
+                if bitmask & 1:
+                    yield f"{letter}:\\"
+                bitmask >>= 1
+        else:
+            # Unix/macOS
+            yield "/"
 
-        bitmask = windll.kernel32.GetLogicalDrives()
-        for letter in string.ascii_uppercase:
-            if bitmask & 1:
-                drive = f"{letter}:\\"
-                try:
-                    total, used, free = shutil.disk_usage(drive)
-                    use_percent = (used / total) * 100 if total > 0 else 0
-                    print(
-                        drive.ljust(20),
-                        (human_readable(total) if human else str(total)).rjust(10),
-                        (human_readable(used) if human else str(used)).rjust(10),
-                        (human_readable(free) if human else str(free)).rjust(10),
-                        f"{use_percent:.0f}%".rjust(8),
-                        drive
-                    )
-                except Exception:
-                    pass
-            bitmask >>= 1
-    else:
-        # Unix/macOS
-        mounts = ["/"]
-        for m in mounts:
-            total, used, free = shutil.disk_usage(m)
+    def records():
+        for m in mounts():
+            try:
+                total, used, free = shutil.disk_usage(m)
+            except Exception:
+                continue
             use_percent = (used / total) * 100 if total > 0 else 0
-            print(
-                m.ljust(20),
-                (human_readable(total) if human else str(total)).rjust(10),
-                (human_readable(used) if human else str(used)).rjust(10),
-                (human_readable(free) if human else str(free)).rjust(10),
-                f"{use_percent:.0f}%".rjust(8),
-                m
-            )
+            yield {"filesystem": m, "size": total, "used": used, "avail": free,
+                   "use_percent": round(use_percent, 1), "mounted_on": m}
+
+    def size(n):
+        return human_readable(n) if human else str(n)
+
+    yield from render_records(
+        records(), fmt,
+        header=[" ".join(("Filesystem".ljust(20), "Size".rjust(10), "Used".rjust(10),
+                          "Avail".rjust(10), "Use%".rjust(8), "Mounted on"))],
+        row=lambda r: " ".join((r["filesystem"].ljust(20), size(r["size"]).rjust(10),
+                                size(r["used"]).rjust(10), size(r["avail"]).rjust(10),
+                                f"{r['use_percent']:.0f}%".rjust(8), r["mounted_on"])),
+    )
  
 @register_command("cp")
 def copy_item(args):
@@ -1316,6 +2567,7 @@ def copy_item(args):
     path = os.path.join(os.getcwd(), target)
 
     if not os.path.exists(path):
+        set_exit_status(1)
         print(f"Not found: {target}")
         return
 
@@ -1349,12 +2601,13 @@ def paste_item(args):
             shutil.copy2(src, dst_path)
             print(f"Pasted file: {dst_name}")
     except Exception as e:
+        set_exit_status(1)
         print(f"Error pasting item: {e}") 
 
-@register_command("head")
-def head(args):
-    """Display the first few lines of a file (default 3, like Unix head)."""
-    if not args:
+@register_command("head", stream=True)
+def head(args, stdin=None):
+    """Display the first few lines of a file or piped input (default 3, like Unix head)."""
+    if not args and stdin is None:
         print("Usage: head [-n num] <filename>")
         return
 
@@ -1362,15 +2615,22 @@ def head(args):
     filename = None
 
     # Parse arguments
-    if args[0] == "-n":
-        if len(args) < 3 or not args[1].isdigit():
+    if args and args[0] == "-n":
+        if len(args) < 2 or not args[1].isdigit() or (len(args) < 3 and stdin is None):
             print("Usage: head -n <number> <filename>")
             return
         num_lines = int(args[1])
-        filename = args[2]
-    else:
+        filename = args[2] if len(args) > 2 else None
+    elif args:
         filename = args[0]
 
+    if filename is None:
+        for i, line in enumerate(stdin):
+            if i >= num_lines:
+                break
+            yield line
+        return
+
     path = os.path.join(os.getcwd(), filename)
 
     if not os.path.exists(path):
@@ -1386,14 +2646,16 @@ def head(args):
             for i, line in enumerate(f):
                 if i >= num_lines:
                     break
-                print(line.rstrip())
+                yield line.rstrip()
     except Exception as e:
         print(f"Error reading file: {e}")
         
-@register_command("tail")
-def tail(args):
-    """Display the last few lines of a file (default 3, like Unix tail)."""
-    if not args:
+@register_command("tail", stream=True)
+def tail(args, stdin=None):
+    """Display the last few lines of a file or piped input (default 3, like Unix tail)."""
+    from collections import deque
+
+    if not args and stdin is None:
         print("Usage: tail [-n num] <filename>")
         return
 
@@ -1401,15 +2663,19 @@ def tail(args):
     filename = None
 
     # Parse arguments
-    if args[0] == "-n":
-        if len(args) < 3 or not args[1].isdigit():
+    if args and args[0] == "-n":
+        if len(args) < 2 or not args[1].isdigit() or (len(args) < 3 and stdin is None):
             print("Usage: tail -n <number> <filename>")
             return
         num_lines = int(args[1])
-        filename = args[2]
-    else:
+        filename = args[2] if len(args) > 2 else None
+    elif args:
         filename = args[0]
 
+    if filename is None:
+        yield from deque(cancellable(stdin), maxlen=num_lines)
+        return
+
     path = os.path.join(os.getcwd(), filename)
 
     if not os.path.exists(path):
@@ -1422,19 +2688,21 @@ def tail(args):
 
     try:
         with open(path, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-            for line in lines[-num_lines:]:
-                print(line.rstrip())
+            # Only the last num_lines lines are ever held in memory
+            for line in deque(cancellable(f), maxlen=num_lines):
+                yield line.rstrip()
     except Exception as e:
         print(f"Error reading file: {e}")
         
 @register_command("kill")
 def kill_process(args):
-    """Terminate a process by its PID (like Unix 'kill')."""
-    import psutil
-
+    """Terminate a process by its PID (like Unix 'kill'), or a background job with kill %<id>."""
     if not args:
-        print("Usage: kill <pid>")
+        print("Usage: kill <pid> | kill %<job>")
+        return
+
+    if args[0].startswith("%"):
+        _kill_job(args[0])
         return
 
     try:
@@ -1470,9 +2738,9 @@ def ps(args):
     - ps            → show all processes
     - ps -p         → show only Python processes
     - ps -s <name>  → search for process name or command (case-insensitive)
+    - ps --json / --csv → one record per process
     """
-    import psutil
-
+    fmt = pop_output_format(args)
     show_python_only = "-p" in args
     search_mode = "-s" in args
     search_term = None
@@ -1486,46 +2754,675 @@ def ps(args):
             print("Usage: ps -s <name>")
             return
 
-    print(f"{'PID':<8} {'Name':<25} {'CPU%':<6} {'Memory%':<8} {'Command'}")
-    print("-" * 100)
-
-    for proc in psutil.process_iter(['pid', 'name', 'cmdline', 'cpu_percent', 'memory_percent']):
-        try:
-            name = proc.info['name'] or ''
-            cmd = " ".join(proc.info['cmdline']) if proc.info['cmdline'] else ''
-            cpu = proc.info['cpu_percent']
-            mem = proc.info['memory_percent']
-
-            # --- Filtering ---
-            if show_python_only and not ("python" in name.lower() or "python" in cmd.lower()):
-                continue
+    def records():
+        for proc in psutil.process_iter(['pid', 'name', 'cmdline', 'cpu_percent', 'memory_percent']):
+            try:
+                name = proc.info['name'] or ''
+                cmd = " ".join(proc.info['cmdline']) if proc.info['cmdline'] else ''
 
-            if search_mode:
-                if search_term not in name.lower() and search_term not in cmd.lower():
+                # --- Filtering ---
+                if show_python_only and not ("python" in name.lower() or "python" in cmd.lower()):
                     continue
 
-            # --- Display ---
-            print(f"{proc.info['pid']:<8} {name[:25]:<25} {cpu:<6.1f} {mem:<8.2f} {cmd}")
+                if search_mode:
+                    if search_term not in name.lower() and search_term not in cmd.lower():
+                        continue
+
+                yield {
+                    "pid": proc.info['pid'],
+                    "name": name,
+                    "cpu_percent": proc.info['cpu_percent'] or 0.0,
+                    "memory_percent": proc.info['memory_percent'] or 0.0,
+                    "cmdline": cmd,
+                }
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                continue
 
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-            continue
+    yield from render_records(
+        records(), fmt,
+        header=(f"{'PID':<8} {'Name':<25} {'CPU%':<6} {'Memory%':<8} {'Command'}", "-" * 100),
+        row=lambda r: f"{r['pid']:<8} {r['name'][:25]:<25} {r['cpu_percent']:<6.1f} {r['memory_percent']:<8.2f} {r['cmdline']}",
+    )
    
 @register_command("echo")
 def echo(args):
     """Print text to the terminal (like Unix echo)."""
     if not args:
-        print()
+        yield ""
         return
 
     # Join everything after echo into a single line
     message = " ".join(args)
-    print(message)
+    yield message
    
+# =======================================
+# Parallel directory walker
+# =======================================
+# The search commands (find, rsync's system-wide search, updatedb) share one
+# walker: worker threads take directories from a single queue, list them with
+# os.scandir, queue the subdirectories that pass the prune rules and hand each
+# directory's entries to the reader. Searching from "/" therefore uses every
+# worker, not one thread per drive.
+
+SEARCH_WORKERS = 8
+# Kernel pseudo-filesystems: huge, endless (/proc/<pid>/...) and never what a file search is after
+SEARCH_SKIP_PATHS = frozenset() if os.name == "nt" else frozenset({"/proc", "/sys"})
+_WALK_DONE = object()
+
+
+class ParallelWalker:
+    """
+    Walk `roots` on `workers` threads; iterating yields (dirpath, [os.DirEntry, ...]),
+    one item per directory, in no particular order.
+    prune(entry) → True skips a subdirectory (and everything below it).
+    The walk stops early when the command is cancelled or the reader stops iterating.
+    """
+
+    def __init__(self, roots, workers=SEARCH_WORKERS, prune=None, skip_paths=SEARCH_SKIP_PATHS):
+        self.roots = [roots] if isinstance(roots, str) else list(roots)
+        self.workers = max(1, workers)
+        self.prune = prune
+        self.skip_paths = skip_paths
+        self.cancel = current_cancel_token()   # captured here: the workers are other threads
+        self.dirs_scanned = 0
+        self.entries_scanned = 0
+        self.errors = 0
+        self.done = False
+        self._dirs = queue.LifoQueue()     # depth-first keeps the queue short
+        self._out = queue.Queue(maxsize=1024)
+        self._pending = 0                  # directories queued or being listed
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def _descend(self, entry):
+        try:
+            if not entry.is_dir(follow_symlinks=False):
+                return False
+        except OSError:
+            return False
+        return entry.path not in self.skip_paths and not (self.prune and self.prune(entry))
+
+    def _emit(self, item):
+        while not self._stop.is_set():
+            try:
+                self._out.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                path = self._dirs.get(timeout=0.05)
+            except queue.Empty:
+                continue
+            if self.cancel.cancelled:
+                self._stop.set()
+                break
+            entries, subdirs = [], []
+            try:
+                with os.scandir(path) as it:
+                    for entry in it:
+                        entries.append(entry)
+                        if self._descend(entry):
+                            subdirs.append(entry.path)
+            except OSError:
+                with self._lock:
+                    self.errors += 1
+
+            # Count the subdirectories before queueing them, so _pending cannot reach 0 early
+            with self._lock:
+                self._pending += len(subdirs)
+            for subdir in subdirs:
+                self._dirs.put(subdir)
+            if entries:
+                self._emit((path, entries))
+            with self._lock:
+                self.dirs_scanned += 1
+                self.entries_scanned += len(entries)
+                self._pending -= 1
+                finished = self._pending == 0
+            if finished:
+                self._emit(_WALK_DONE)
+
+    def __iter__(self):
+        roots = [root for root in self.roots if os.path.isdir(root)]
+        if not roots:
+            self.done = True
+            return
+        self._pending = len(roots)
+        for root in roots:
+            self._dirs.put(root)
+        threads = [threading.Thread(target=self._work, daemon=True, name=f"pynix-walk-{i}")
+                   for i in range(self.workers)]
+        for t in threads:
+            t.start()
+        try:
+            while True:
+                try:
+                    item = self._out.get(timeout=0.1)
+                except queue.Empty:
+                    self.cancel.check()
+                    continue
+                if item is _WALK_DONE:
+                    break
+                yield item
+            self.cancel.check()
+        finally:
+            self.done = True
+            self._stop.set()
+            for t in threads:
+                t.join()
+
+    def files(self):
+        """Just the entries, flattened: every file and folder below the roots."""
+        for dirpath, entries in self:
+            yield from entries
+
+
+def search_roots():
+    """Every drive root on Windows, "/" elsewhere."""
+    if os.name == "nt":
+        import string
+        return [f"{letter}:\\" for letter in string.ascii_uppercase if os.path.exists(f"{letter}:\\")]
+    return ["/"]
+
+
+_SYSTEM_DIR_NAMES = frozenset({"windows", "program files", "programdata", "appdata",
+                               "system volume information", "$recycle.bin"})
+
+
+def prune_system_dirs(entry):
+    """Prune rule for system-wide searches: skip big OS folders that never hold user files."""
+    return entry.name.lower() in _SYSTEM_DIR_NAMES
+
+
+# =======================================
+# locate index (updatedb / locate / find --index)
+# =======================================
+# updatedb walks the roots once with ParallelWalker and writes one file that is
+# memory-mapped for queries:
+#   names        every distinct file/folder name, sorted and front-coded in blocks
+#                (each name stores how many leading bytes it shares with the previous one)
+#   trigrams     for each 3-byte run of a lower-cased name, the sorted ids of the names holding it
+#   entries      (parent entry, name id, is-folder) per path, so a path is rebuilt from its names
+# A query only decodes the names whose trigrams match, so substring, glob and
+# extension searches take milliseconds instead of a walk over the whole disk.
+# While the walk runs, every finished folder is appended to a journal; an
+# interrupted updatedb picks up from the journal instead of starting again.
+
+LOCATE_INDEX_FILE = os.path.join(BASE_DIR, "pynix_locate.idx")
+_LOCATE_MAGIC = b"PYNXLOC1"
+_LOCATE_BLOCK = 32          # names per front-coded block
+_NO_PARENT = 0xFFFFFFFF
+
+
+def _put_varint(out, n):
+    while n >= 0x80:
+        out.append(n & 0x7F | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _get_varint(buf, pos):
+    n = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        n |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return n, pos
+        shift += 7
+
+
+def _name_trigrams(lower_bytes):
+    """3-byte runs of an already lower-cased, encoded name, as integer keys."""
+    return {int.from_bytes(lower_bytes[i:i + 3], "big") for i in range(len(lower_bytes) - 2)}
+
+
+def _updatedb_descends(path, name):
+    """The prune rule updatedb walks with; also used to work out what is left on resume."""
+    return path not in SEARCH_SKIP_PATHS and name.lower() not in _SYSTEM_DIR_NAMES
+
+
+def write_locate_index(journal_path, roots, index_path):
+    """Turn a finished updatedb journal into the index file (written aside, then swapped in)."""
+    from array import array
+
+    listings = {}
+    with open(journal_path, "r", encoding="utf-8") as f:
+        next(f)     # header
+        for line in f:
+            try:
+                dirpath, names, flags = json.loads(line)
+            except ValueError:
+                continue   # line torn by an interrupted run
+            listings[dirpath] = (names, flags)   # a folder listed twice (resumed run) counts once
+    batches = sorted(((dirpath, names, flags) for dirpath, (names, flags) in listings.items()),
+                     key=lambda batch: len(batch[0]))   # parents before children
+    del listings
+
+    # --- entries: roots first, then every listed name under its folder's entry ---
+    entry_parent, entry_names, is_dir = array("I"), [], bytearray()
+    dir_ids = {}
+    for root in roots:
+        dir_ids[root] = len(entry_names)
+        entry_parent.append(_NO_PARENT)
+        entry_names.append(root)
+        is_dir.append(1)
+    for dirpath, names, flags in batches:
+        parent = dir_ids.get(dirpath)
+        if parent is None:
+            continue
+        for name, flag in zip(names, flags):
+            if flag == "d":
+                dir_ids[os.path.join(dirpath, name)] = len(entry_names)
+            entry_parent.append(parent)
+            entry_names.append(name)
+            is_dir.append(flag == "d")
+    del batches, dir_ids
+
+    # --- names: distinct, sorted, front-coded ---
+    encoded = sorted({os.fsencode(name) for name in entry_names})
+    name_ids = {name: i for i, name in enumerate(encoded)}
+    entry_name = array("I", (name_ids[os.fsencode(name)] for name in entry_names))
+    del entry_names, name_ids
+
+    blob, block_offsets = bytearray(), array("I")
+    prev = b""
+    for i, name in enumerate(encoded):
+        if i % _LOCATE_BLOCK == 0:
+            block_offsets.append(len(blob))
+            prev = b""      # every block starts with a whole name: blocks decode on their own
+        keep = 0
+        limit = min(len(prev), len(name))
+        while keep < limit and prev[keep] == name[keep]:
+            keep += 1
+        _put_varint(blob, keep)
+        _put_varint(blob, len(name) - keep)
+        blob += name[keep:]
+        prev = name
+
+    # --- trigram postings over lower-cased names ---
+    postings_by_key = {}
+    for name_id, name in enumerate(encoded):
+        for key in _name_trigrams(os.fsencode(os.fsdecode(name).lower())):
+            ids = postings_by_key.get(key)
+            if ids is None:
+                ids = postings_by_key[key] = array("I")
+            ids.append(name_id)
+    tri_keys, tri_offsets, postings = array("I"), array("I", [0]), array("I")
+    for key in sorted(postings_by_key):
+        tri_keys.append(key)
+        postings += postings_by_key[key]
+        tri_offsets.append(len(postings))
+    del postings_by_key
+
+    # --- name id -> entries holding that name ---
+    by_name = array("I", sorted(range(len(entry_name)), key=entry_name.__getitem__))
+    name_first = array("I", [0]) * (len(encoded) + 1)
+    for name_id in entry_name:
+        name_first[name_id + 1] += 1
+    for i in range(len(encoded)):
+        name_first[i + 1] += name_first[i]
+
+    sections = {"names": bytes(blob), "name_blocks": block_offsets, "tri_keys": tri_keys,
+                "tri_offsets": tri_offsets, "postings": postings, "parent": entry_parent,
+                "entry_name": entry_name, "is_dir": bytes(is_dir), "by_name": by_name,
+                "name_first": name_first}
+    layout, offset = {}, 0
+    for key, data in sections.items():
+        size = len(data) * data.itemsize if isinstance(data, array) else len(data)
+        layout[key] = [offset, size]
+        offset += (size + 3) & ~3   # keep the uint32 sections aligned
+    header = json.dumps({"roots": roots, "built": time.time(), "entries": len(entry_name),
+                         "names": len(encoded), "byteorder": sys.byteorder,
+                         "sections": layout}).encode()
+    header += b" " * (-(len(_LOCATE_MAGIC) + 4 + len(header)) % 4)
+
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_LOCATE_MAGIC + len(header).to_bytes(4, "little") + header)
+        for key, data in sections.items():
+            raw = data.tobytes() if isinstance(data, array) else data
+            f.write(raw + b"\0" * (-len(raw) % 4))
+    close_locate_index()    # Windows cannot replace a file that is still mapped
+    os.replace(tmp_path, index_path)
+    return len(entry_name), len(encoded)
+
+
+class LocateIndex:
+    """A memory-mapped index written by updatedb; search() answers name queries from it."""
+
+    def __init__(self, path=LOCATE_INDEX_FILE):
+        import mmap
+
+        self.file = path
+        self.mtime = os.path.getmtime(path)
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+        if bytes(view[:len(_LOCATE_MAGIC)]) != _LOCATE_MAGIC:
+            raise ValueError("not a PyTerm locate index (run updatedb)")
+        start = len(_LOCATE_MAGIC) + 4
+        header_len = int.from_bytes(view[len(_LOCATE_MAGIC):start], "little")
+        self.header = json.loads(bytes(view[start:start + header_len]))
+        if self.header["byteorder"] != sys.byteorder:
+            raise ValueError("index was built on a machine with another byte order (run updatedb)")
+        base = start + header_len
+        self._views = [view]
+        for key, (offset, size) in self.header["sections"].items():
+            section = view[base + offset:base + offset + size]
+            self._views.append(section)
+            if key not in ("names", "is_dir"):
+                section = section.cast("I")
+                self._views.append(section)
+            setattr(self, key, section)
+        self._blocks = {}
+        self._all_names = None      # every name decoded, once a query had to look at all of them
+        self._all_lower = None
+
+    def close(self):
+        for view in reversed(self._views):
+            view.release()
+        self._map.close()
+
+    # --- names ---
+    def _block(self, block):
+        names = self._blocks.get(block)
+        if names is None:
+            if len(self._blocks) > 4096:
+                self._blocks.clear()
+            buf, pos = self.names, self.name_blocks[block]
+            end = self.name_blocks[block + 1] if block + 1 < len(self.name_blocks) else len(buf)
+            names, prev = [], b""
+            while pos < end:
+                keep, pos = _get_varint(buf, pos)
+                size, pos = _get_varint(buf, pos)
+                prev = prev[:keep] + bytes(buf[pos:pos + size])
+                pos += size
+                names.append(os.fsdecode(prev))
+            self._blocks[block] = names
+        return names
+
+    def name(self, name_id):
+        if self._all_names is not None:
+            return self._all_names[name_id]
+        return self._block(name_id // _LOCATE_BLOCK)[name_id % _LOCATE_BLOCK]
+
+    def all_lower_names(self):
+        """Every name lower-cased, in id order: decoded in one pass and then kept for later queries."""
+        if self._all_lower is None:
+            buf, pos, end = self.names, 0, len(self.names)
+            names, prev = [], b""
+            while pos < end:    # a block's first name shares nothing, so the blob decodes straight through
+                keep, pos = _get_varint(buf, pos)
+                size, pos = _get_varint(buf, pos)
+                prev = prev[:keep] + bytes(buf[pos:pos + size])
+                pos += size
+                names.append(prev)
+            self._all_names = [os.fsdecode(name) for name in names]
+            self._all_lower = [name.lower() for name in self._all_names]
+            self._blocks.clear()
+        return self._all_lower
+
+    def path(self, entry):
+        parts = []
+        while entry != _NO_PARENT:
+            parts.append(self.name(self.entry_name[entry]))
+            entry = self.parent[entry]
+        return os.path.join(*reversed(parts))
+
+    # --- queries ---
+    def _candidates(self, literals):
+        """Name ids holding every trigram of the literal parts, or None if there is nothing to narrow by."""
+        import bisect
+
+        keys = set()
+        for literal in literals:
+            keys |= _name_trigrams(os.fsencode(literal.lower()))
+        if not keys:
+            return None
+        lists = []
+        for key in keys:
+            i = bisect.bisect_left(self.tri_keys, key)
+            if i == len(self.tri_keys) or self.tri_keys[i] != key:
+                return []
+            lists.append(self.postings[self.tri_offsets[i]:self.tri_offsets[i + 1]])
+        lists.sort(key=len)
+        ids = set(lists[0])
+        for other in lists[1:]:
+            ids.intersection_update(other)
+            if not ids:
+                break
+        return sorted(ids)
+
+    def search(self, pattern, files_only=False):
+        """
+        Yield the paths whose name contains `pattern` (case-insensitive), or matches it
+        as a glob when it has * ? or [ ]. With a path separator in the pattern, the
+        full path is matched and the part after the last separator narrows the names;
+        a relative glob is anchored anywhere, like the substring case (tree/*/x.py).
+        """
+        import fnmatch
+
+        pattern = pattern.lower()
+        is_glob = any(c in pattern for c in "*?[")
+        by_path = os.sep in pattern
+        if is_glob:
+            full = "*" + pattern if by_path and not os.path.isabs(pattern) else pattern
+            matches = lambda text: fnmatch.fnmatchcase(text, full)
+        else:
+            matches = lambda text: pattern in text
+        last = pattern.rsplit(os.sep, 1)[-1]
+        literals = [part for part in re.split(r"[*?]|\[[^\]]*\]", last) if part] if is_glob else [last]
+
+        candidates = self._candidates(literals)
+        if candidates is None:
+            # Nothing 3 bytes long to narrow by: test every name
+            lower = self.all_lower_names()
+            candidates = range(len(lower)) if by_path else [i for i, name in enumerate(lower) if matches(name)]
+            by_name_done = True
+        else:
+            by_name_done = by_path
+        cancel = current_cancel_token()
+        for count, name_id in enumerate(candidates):
+            if not count % 4096:
+                cancel.check()
+            if not by_name_done and not matches(self.name(name_id).lower()):
+                continue
+            for i in range(self.name_first[name_id], self.name_first[name_id + 1]):
+                entry = self.by_name[i]
+                if files_only and self.is_dir[entry]:
+                    continue
+                path = self.path(entry)
+                if not by_path or matches(path.lower()):
+                    yield path
+
+
+_locate_index = None
+
+
+def load_locate_index():
+    """The index from the last updatedb (reopened if updatedb ran since), or None if there is none."""
+    global _locate_index
+    if not os.path.exists(LOCATE_INDEX_FILE):
+        close_locate_index()
+        return None
+    if _locate_index is None or _locate_index.mtime != os.path.getmtime(LOCATE_INDEX_FILE):
+        close_locate_index()
+        _locate_index = LocateIndex()
+    return _locate_index
+
+
+def close_locate_index():
+    global _locate_index
+    if _locate_index is not None:
+        _locate_index.close()
+        _locate_index = None
+
+
+@register_command("updatedb")
+def updatedb_cmd(args):
+    """
+    Build the filename index used by locate and find --index.
+    Usage:
+      updatedb [path ...]      → index these folders (default: every drive, or /)
+      updatedb -j <n>          → walk with n threads (default 8)
+      updatedb --restart       → throw away an interrupted run instead of resuming it
+    An interrupted updatedb (Ctrl+C, crash) continues where it stopped next time.
+    """
+    workers = SEARCH_WORKERS
+    restart = "--restart" in args
+    args = [arg for arg in args if arg != "--restart"]
+    if "-j" in args:
+        i = args.index("-j")
+        try:
+            workers = max(1, int(args[i + 1]))
+        except (IndexError, ValueError):
+            print("Usage: updatedb [path ...] [-j <threads>] [--restart]")
+            return
+        del args[i:i + 2]
+    roots = [os.path.abspath(arg) for arg in args] or search_roots()
+    for root in roots:
+        if not os.path.isdir(root):
+            print(f"Path not found: {root}")
+            return
+
+    journal_path = LOCATE_INDEX_FILE + ".partial"
+    pending = roots
+    done = set()
+    if os.path.exists(journal_path) and not restart:
+        # --- Resume: folders listed in the journal are done; their unlisted subfolders are not ---
+        try:
+            with open(journal_path, "r", encoding="utf-8") as f:
+                header = json.loads(next(f))
+                if header.get("roots") == roots:
+                    found = set(roots)
+                    for line in f:
+                        try:
+                            dirpath, names, flags = json.loads(line)
+                        except ValueError:
+                            continue    # torn by the interruption: that folder is listed again
+                        done.add(dirpath)
+                        for name, flag in zip(names, flags):
+                            child = os.path.join(dirpath, name)
+                            if flag == "d" and _updatedb_descends(child, name):
+                                found.add(child)
+                    pending = sorted(found - done)
+        except (OSError, ValueError, StopIteration):
+            pass
+    if pending is roots:
+        with open(journal_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"roots": roots, "started": time.time()}) + "\n")
+    else:
+        with open(journal_path, "rb+") as f:
+            if f.seek(0, os.SEEK_END):
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")     # keep a torn last line from swallowing the first new one
+        print(f"⏯️ Resuming updatedb: {len(done):,} folders already indexed, {len(pending):,} to go.")
+
+    print(f"📇 Indexing {', '.join(roots)} with {workers} threads...")
+    started = time.perf_counter()
+    # A subfolder can reach the journal before its parent: when the parent is listed again,
+    # stay out of folders already done (their unfinished subfolders are in pending already)
+    walker = ParallelWalker(pending, workers=workers,
+                            prune=lambda entry: entry.path in done
+                            or not _updatedb_descends(entry.path, entry.name))
+    last_report = started
+    with open(journal_path, "a", encoding="utf-8") as journal:
+        for dirpath, entries in walker:
+            names, flags = [], []
+            for entry in entries:
+                names.append(entry.name)
+                try:
+                    flags.append("d" if entry.is_dir(follow_symlinks=False) else "f")
+                except OSError:
+                    flags.append("f")
+            journal.write(json.dumps([dirpath, names, "".join(flags)]) + "\n")
+            now = time.perf_counter()
+            if now - last_report > 0.5:
+                last_report = now
+                sys.stdout.write(f"\r   {walker.dirs_scanned:,} folders, {walker.entries_scanned:,} entries")
+                sys.stdout.flush()
+    walk_secs = time.perf_counter() - started
+    sys.stdout.write("\r" + " " * 60 + "\r")
+
+    entries, names = write_locate_index(journal_path, roots, LOCATE_INDEX_FILE)
+    os.remove(journal_path)
+    size = os.path.getsize(LOCATE_INDEX_FILE)
+    print(f"✅ Indexed {entries:,} entries ({names:,} distinct names) into {human_readable(size)} "
+          f"in {time.perf_counter() - started:.1f}s (walk {walk_secs:.1f}s).")
+
+
+@register_command("locate")
+def locate_cmd(args):
+    """
+    Find files and folders by name in the updatedb index (no disk walk).
+    Usage:
+      locate <text>            → names containing text (case-insensitive)
+      locate *.py              → glob on the name (* ? [...]; no quotes, they would be matched too)
+      locate -e <ext>          → names ending in .ext
+      locate src/main          → with a /, match the end of the full path (tree/*/x.py works too)
+      locate -n <count> ...    → stop after count results
+      locate -c ...            → only print how many matched
+      locate -S                → index statistics
+    Results reflect the disk as of the last updatedb.
+    """
+    limit = None
+    count_only = False
+    args = list(args)
+    try:
+        index = load_locate_index()
+    except (OSError, ValueError) as e:
+        print(f"❌ Cannot read the locate index: {e}")
+        return
+    if index is None:
+        print("⚠️ No locate index yet. Run 'updatedb' first.")
+        return
+
+    pattern = None
+    try:
+        while args:
+            arg = args.pop(0)
+            if arg == "-n":
+                limit = int(args.pop(0))
+            elif arg == "-c":
+                count_only = True
+            elif arg == "-e":
+                pattern = "*." + args.pop(0).lstrip(".")
+            elif arg == "-S":
+                header = index.header
+                built = datetime.datetime.fromtimestamp(header["built"]).strftime("%Y-%m-%d %H:%M")
+                yield f"📇 {LOCATE_INDEX_FILE}"
+                yield f"   roots:    {', '.join(header['roots'])}"
+                yield f"   built:    {built}"
+                yield f"   entries:  {header['entries']:,} ({header['names']:,} distinct names)"
+                yield f"   size:     {human_readable(os.path.getsize(LOCATE_INDEX_FILE))}"
+                return
+            else:
+                pattern = arg
+    except (IndexError, ValueError):
+        pattern = None
+    if not pattern:
+        print("Usage: locate [-n <count>] [-c] <text | glob | -e ext>   (locate -S for stats)")
+        return
+
+    matches = 0
+    for path in index.search(pattern):
+        matches += 1
+        if not count_only:
+            yield path
+        if limit is not None and matches >= limit:
+            break
+    if count_only:
+        yield str(matches)
+
+
 @register_command("find")
 def find(args):
     """Search the entire system for a file or folder name (fast partial match)."""
-    import threading
-
     if not args:
         print("Usage: find <name>")
         return
@@ -1535,122 +3432,88 @@ def find(args):
 
     print(f"Searching system for '{search_term}'...\n")
 
-    # Choose starting points (root drives or /)
-    roots = []
-    if os.name == "nt":
-        import string
-        from ctypes import windll
-        bitmask = windll.kernel32.GetLogicalDrives()
-        for letter in string.ascii_uppercase:
-            if bitmask & 1:
-                roots.append(f"{letter}:\\")
-            bitmask >>= 1
-    else:
-        roots = ["/"]
-
-    # Threaded search for speed
-    def search_path(root):
-        for dirpath, dirnames, filenames in os.walk(root, topdown=True):
-            # Ignore very large system folders for speed
-            dirnames[:] = [d for d in dirnames if d.lower() not in ("windows", "program files", "programdata", "appdata", "system volume information", "$recycle.bin")]
-            for name in filenames + dirnames:
-                if search_term in name.lower():
-                    full_path = os.path.join(dirpath, name)
-                    found.append(full_path)
-                    print(full_path)
-
-    threads = []
-    for r in roots:
-        t = threading.Thread(target=search_path, args=(r,))
-        t.daemon = True
-        threads.append(t)
-        t.start()
-
-    for t in threads:
-        t.join()
+    # Parallel walk from every root drive (or /)
+    for entry in ParallelWalker(search_roots(), prune=prune_system_dirs).files():
+        if search_term in entry.name.lower():
+            found.append(entry.path)
+            print(entry.path)
 
     if not found:
         print("\nNo matching files or folders found.")
     else:
         print(f"\nFound {len(found)} match(es).")
-        
+
+
 @register_command("watch")
 def watch(args):
     """Run a command repeatedly (like Unix 'watch').
     Usage:
       watch -n <seconds> <command>
       watch -n <seconds> -t <count> <command>
+      watch -b -n <seconds> <command>     # keep watching in the background
+    Runs on the shared scheduler; press Ctrl+C (or 'cancel <id>') to stop.
     """
     if not args or "-n" not in args:
-        print("Usage: watch -n <seconds> [-t <count>] <command>")
+        print("Usage: watch [-b] -n <seconds> [-t <count>] <command>")
         return
 
     # Default values
     interval = 2
     count = None
+    background = False
 
-    try:
-        n_index = args.index("-n")
-        interval = float(args[n_index + 1])
-    except (ValueError, IndexError):
-        print("Error: missing or invalid value for -n <seconds>")
-        return
-
-    # Optional -t flag for total runs
-    if "-t" in args:
+    # Leading flags only, so the watched command keeps its own -n/-t
+    i = 0
+    while i < len(args) and args[i] in ("-n", "-t", "-b"):
+        flag = args[i]
+        if flag == "-b":
+            background = True
+            i += 1
+            continue
         try:
-            t_index = args.index("-t")
-            count = int(args[t_index + 1])
+            if flag == "-n":
+                interval = float(args[i + 1])
+            else:
+                count = int(args[i + 1])
         except (ValueError, IndexError):
-            print("Error: missing or invalid value for -t <count>")
+            print(f"Error: missing or invalid value for {flag}")
             return
+        i += 2
 
-    # Get command after flags
-    try:
-        # Strip flags and their arguments
-        stripped = []
-        skip_next = False
-        for i, a in enumerate(args):
-            if skip_next:
-                skip_next = False
-                continue
-            if a in ("-n", "-t"):
-                skip_next = True
-                continue
-            stripped.append(a)
+    if i >= len(args):
+        print("Error: no command provided to watch.")
+        return
+    command_line = " ".join(args[i:])
+    # Started by a loop/mod/autoexec job: waiting here would tie up a scheduler worker
+    background = background or in_scheduled_job()
 
-        if not stripped:
-            print("Error: no command provided to watch.")
-            return
+    def show_run(job):
+        if not background:
+            os.system("cls" if os.name == "nt" else "clear")
+        print(f"--- Run {job.runs} ---\n")
 
-        command_line = " ".join(stripped)
-    except Exception:
-        print("Error parsing command.")
+    job = scheduler.schedule(command_line, kind="watch", interval=interval, count=count, on_run=show_run)
+    print(f"Watching command: '{command_line}' every {interval}s" + (f" ({count} times)" if count else " (until stopped)"))
+
+    if background:
+        print(f"⏱️ Watch job {job.id} running in the background. Use 'cancel {job.id}' to stop.")
         return
 
-    print(f"Watching command: '{command_line}' every {interval}s" + (f" ({count} times)" if count else " (until stopped)"))
     print("Press Ctrl+C to stop.\n")
-
-    runs = 0
     try:
-        while True:
-            runs += 1
-            os.system("cls" if os.name == "nt" else "clear")
-            print(f"--- Run {runs} ---\n")
-            handle_command(command_line)
-
-            if count and runs >= count:
-                break
-            time.sleep(interval)
+        while not job.done.wait(0.2):
+            pass
     except KeyboardInterrupt:
-        print("\nStopped watching.")      
+        scheduler.cancel(job.id)
+        print("\nStopped watching.")
 
-@register_command("grep")
-def grep(args):
-    """Search for text in files (like Unix 'grep').
+@register_command("grep", stream=True)
+def grep(args, stdin=None):
+    """Search for text in files or piped input (like Unix 'grep').
     Usage:
       grep <pattern> <filename>
       grep -i <pattern> <filename>     # case-insensitive
+      <command> | grep [-i] <pattern>  # filter piped lines
     """
     if not args:
         print("Usage: grep [-i] <pattern> <filename>")
@@ -1663,48 +3526,58 @@ def grep(args):
     # Parse arguments
     if args[0] == "-i":
         ignore_case = True
-        if len(args) < 3:
+        if len(args) < 2 or (len(args) < 3 and stdin is None):
             print("Usage: grep -i <pattern> <filename>")
             return
         pattern = args[1]
-        filename = args[2]
+        filename = args[2] if len(args) > 2 else None
     else:
-        if len(args) < 2:
+        if len(args) < 2 and stdin is None:
             print("Usage: grep <pattern> <filename>")
             return
         pattern = args[0]
-        filename = args[1]
+        filename = args[1] if len(args) > 1 else None
+
+    needle = pattern.lower() if ignore_case else pattern
+
+    # --- Piped input: yield matching lines unchanged (status 1 when none match, like Unix grep) ---
+    if filename is None:
+        matches = 0
+        for line in cancellable(stdin):
+            if needle in (line.lower() if ignore_case else line):
+                yield line
+                matches += 1
+        if matches == 0:
+            set_exit_status(1)
+        return
 
     file_path = os.path.join(os.getcwd(), filename)
 
     if not os.path.exists(file_path):
+        set_exit_status(1)
         print(f"File not found: {filename}")
         return
 
     if os.path.isdir(file_path):
+        set_exit_status(1)
         print(f"'{filename}' is a directory.")
         return
 
-    # Perform the search
+    # Perform the search, one line at a time
     try:
-        with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-            lines = f.readlines()
-
         matches = 0
-        for i, line in enumerate(lines, start=1):
-            text = line.rstrip("\n")
-            if ignore_case:
-                if pattern.lower() in text.lower():
-                    print(f"{i:>4}: {text}")
-                    matches += 1
-            else:
-                if pattern in text:
-                    print(f"{i:>4}: {text}")
+        with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
+            for i, line in enumerate(cancellable(f), start=1):
+                text = line.rstrip("\n")
+                if needle in (text.lower() if ignore_case else text):
+                    yield f"{i:>4}: {text}"
                     matches += 1
 
         if matches == 0:
+            set_exit_status(1)
             print(f"No matches for '{pattern}' in {filename}.")
     except Exception as e:
+        set_exit_status(1)
         print(f"Error reading file: {e}")
 
 @register_command("sudo")
@@ -1920,17 +3793,13 @@ def view_folder(args):
       view <path>         → shows contents of specified folder
       view -z <file.zip>  → lists contents of a ZIP archive
       view -t <file.tar>  → lists contents of a TAR archive
+      --json / --csv      → one name/type/size record per entry
     """
+    fmt = pop_output_format(args)
 
-    def human_readable(size_bytes):
-        """Convert bytes to human-readable format."""
-        if size_bytes == 0:
-            return "0 B"
-        size_name = ("B", "KB", "MB", "GB", "TB")
-        i = int(math.floor(math.log(size_bytes, 1024)))
-        p = math.pow(1024, i)
-        s = round(size_bytes / p, 2)
-        return f"{s} {size_name[i]}"
+    def entry_row(r):
+        icon = "📁" if r["type"] == "dir" else "📄"
+        return f"  {icon} {r['name']:<50} {human_readable(r['size']):>10}"
 
     # --- Handle ZIP mode ---
     if args and args[0] == "-z":
@@ -1943,11 +3812,10 @@ def view_folder(args):
             return
         try:
             with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                info_list = zip_ref.infolist()
-                print(f"\n🗜️ Contents of {zip_path}:\n")
-                for info in info_list:
-                    size = human_readable(info.file_size)
-                    print(f"  📄 {info.filename:<50} {size:>10}")
+                records = ({"name": info.filename, "type": "dir" if info.is_dir() else "file",
+                            "size": info.file_size} for info in zip_ref.infolist())
+                yield from render_records(records, fmt, header=("", f"🗜️ Contents of {zip_path}:", ""),
+                                          row=entry_row)
         except zipfile.BadZipFile:
             print(f"❌ Error: '{zip_path}' is not a valid ZIP archive.")
         return
@@ -1963,11 +3831,11 @@ def view_folder(args):
             return
         try:
             with tarfile.open(tar_path, "r") as tar_ref:
-                print(f"\n📦 Contents of {tar_path}:\n")
-                for member in tar_ref.getmembers():
-                    size = human_readable(member.size)
-                    prefix = "📁" if member.isdir() else "📄"
-                    print(f"  {prefix} {member.name:<50} {size:>10}")
+                # Iterate members as they are read instead of getmembers()
+                records = ({"name": member.name, "type": "dir" if member.isdir() else "file",
+                            "size": member.size} for member in tar_ref)
+                yield from render_records(records, fmt, header=("", f"📦 Contents of {tar_path}:", ""),
+                                          row=entry_row)
         except tarfile.TarError:
             print(f"❌ Error: '{tar_path}' is not a valid TAR archive.")
         return
@@ -1985,17 +3853,28 @@ def view_folder(args):
 
     items = sorted(os.listdir(path))
     if not items:
-        print("(empty folder)")
+        if fmt == "table":
+            print("(empty folder)")
         return
 
-    print(f"\n📂 Contents of {path}:\n")
-    for item in items:
-        item_path = os.path.join(path, item)
-        if os.path.isdir(item_path):
-            print(f"  📁 {item}/")
-        else:
-            size = os.path.getsize(item_path)
-            print(f"  📄 {item:<30} {human_readable(size):>10}")
+    def records():
+        for item in items:
+            item_path = os.path.join(path, item)
+            if os.path.isdir(item_path):
+                yield {"name": item, "type": "dir", "size": None}
+            else:
+                try:
+                    size = os.path.getsize(item_path)
+                except OSError:
+                    size = None
+                yield {"name": item, "type": "file", "size": size}
+
+    def folder_row(r):
+        if r["type"] == "dir":
+            return f"  📁 {r['name']}/"
+        return f"  📄 {r['name']:<30} {human_readable(r['size']):>10}"
+
+    yield from render_records(records(), fmt, header=("", f"📂 Contents of {path}:", ""), row=folder_row)
             
 @register_command("registercommand")
 def registercommand(args):
@@ -2086,10 +3965,12 @@ def add_command(args):
         shutil.copy2(src, dest)
         print(f"✅ Copied '{os.path.basename(src)}' to /commands/")
 
-        # Load immediately
-        spec = importlib.util.spec_from_file_location(os.path.basename(dest), dest)
-        module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module)
+        # Load immediately (only the new/changed file is executed)
+        result = sync_plugins(commands_dir, verbose=False)
+        # (compare paths, not files: a failed file may already be gone)
+        if any(os.path.abspath(f) == os.path.abspath(dest) for f, _ in result["failed"]):
+            print(f"❌ Failed to load '{os.path.basename(dest)}'.")
+            return
 
         print("🔁 Command loaded and ready to use.")
     except Exception as e:
@@ -2119,7 +4000,6 @@ def rsync(args):
       rsync <path/to/source.ext> -t <target> → sync only to a specific file or folder
     """
     import hashlib
-    import threading
 
     # --- Argument validation ---
     if not args:
@@ -2140,12 +4020,15 @@ def rsync(args):
             print("⚠️ Missing argument for '-t'")
             return
 
+    cancel = current_cancel_token()
+
     # --- Hash helper ---
     def file_hash(path):
         h = hashlib.md5()
         try:
             with open(path, "rb") as f:
                 for chunk in iter(lambda: f.read(4096), b""):
+                    cancel.check()
                     h.update(chunk)
             return h.hexdigest()
         except Exception:
@@ -2176,42 +4059,13 @@ def rsync(args):
 
     matches = []
 
-    # Collect root directories
-    roots = []
-    if os.name == "nt":
-        import string
-        from ctypes import windll
-        bitmask = windll.kernel32.GetLogicalDrives()
-        for letter in string.ascii_uppercase:
-            if bitmask & 1:
-                roots.append(f"{letter}:\\")
-            bitmask >>= 1
-    else:
-        roots = ["/"]
-
-    # Search
-    def search_path(root):
-        for dirpath, dirnames, filenames in os.walk(root, topdown=True):
-            # Skip system folders for speed/safety
-            dirnames[:] = [d for d in dirnames if d.lower() not in (
-                "windows", "program files", "programdata", "appdata",
-                "system volume information", "$recycle.bin")]
-            for f in filenames:
-                if f.lower() == filename.lower():
-                    full = os.path.join(dirpath, f)
-                    if os.path.abspath(full) != source_path:
-                        matches.append(full)
-                        print(full)
-
-    # Threaded search
-    threads = []
-    for root in roots:
-        t = threading.Thread(target=search_path, args=(root,))
-        t.daemon = True
-        threads.append(t)
-        t.start()
-    for t in threads:
-        t.join()
+    # Parallel search from every root drive (or /), skipping system folders for speed/safety
+    wanted = filename.lower()
+    for entry in ParallelWalker(search_roots(), prune=prune_system_dirs).files():
+        if entry.name.lower() == wanted and not entry.is_dir(follow_symlinks=False):
+            if os.path.abspath(entry.path) != source_path:
+                matches.append(entry.path)
+                print(entry.path)
 
     print(f"\n📁 Found {len(matches)} matching file(s).")
 
@@ -2225,6 +4079,7 @@ def rsync(args):
 
     replaced = 0
     for target in matches:
+        cancel.check()
         try:
             if os.path.getsize(target) == size and file_hash(target) == source_hash:
                 continue
@@ -2357,24 +4212,313 @@ def contextmenu(args):
     except Exception as e:
         print(f"Error: {e}")    
 
-@register_command("history")
-def show_history(args):
-    """Display a list of previously run commands.
-    Options:
-      history           → show all commands
-      history -n <num>  → show last <num> commands
-      history -c        → clear history
-    """
-    global command_history
+_pending_input = None   # command chosen by reverse search, pre-filled at the next prompt
+_readline = None
 
-    if not command_history:
-        print("No commands in history.")
-        return
 
-    # Clear history
-    if args and args[0].lower() in ("-c", "--clear"):
-        command_history.clear()
-        print("🧹 Command history cleared.")
+def setup_readline_history():
+    """Seed readline with the persisted history and bind Ctrl+R to the indexed reverse search."""
+    global _readline
+    if not sys.stdin.isatty():
+        return
+    try:
+        import readline
+    except ImportError:
+        return      # Windows without pyreadline: `history -r` still works
+    _readline = readline
+    readline.set_history_length(HISTORY_MAX_ENTRIES)
+    for cmd in command_history:
+        readline.add_history(cmd)
+    if "libedit" not in (readline.__doc__ or ""):
+        # GNU readline: Ctrl+R submits "history -r"; the pick is pre-filled at the next prompt
+        readline.parse_and_bind(r'"\C-r": "\C-a\C-khistory -r\n"')
+
+
+def _readline_history_enabled():
+    return _readline is not None
+
+
+# =======================================
+# Tab completion
+# =======================================
+# The first word of a command (or of a pipeline stage) completes from a trie
+# of command and alias names. sync_command_trie() applies only the difference
+# and runs after csync, alias and unalias. Other words complete as paths from
+# a per-directory cache of sorted scandir listings. One stat() per Tab checks
+# the directory's mtime, so a warm 100k-entry directory answers with a bisect.
+
+PATH_CACHE_DIRS = 64
+PATH_COMPLETION_LIMIT = 2000   # candidates offered at once; type more to narrow
+
+
+class _CommandTrie:
+    """Prefix tree over command names; nodes are dicts, "" marks a complete name."""
+
+    def __init__(self):
+        self.root = {}
+        self.names = set()
+
+    def insert(self, name):
+        node = self.root
+        for ch in name:
+            node = node.setdefault(ch, {})
+        node[""] = True
+        self.names.add(name)
+
+    def remove(self, name):
+        path, node = [], self.root
+        for ch in name:
+            if ch not in node:
+                return
+            path.append((node, ch))
+            node = node[ch]
+        node.pop("", None)
+        self.names.discard(name)
+        # prune branches that no longer lead to a name
+        for parent, ch in reversed(path):
+            if parent[ch]:
+                break
+            del parent[ch]
+
+    def complete(self, prefix):
+        node = self.root
+        for ch in prefix:
+            node = node.get(ch)
+            if node is None:
+                return []
+        out, stack = [], [(node, prefix)]
+        while stack:
+            node, word = stack.pop()
+            for ch, child in node.items():
+                if ch == "":
+                    out.append(word)
+                else:
+                    stack.append((child, word + ch))
+        return sorted(out)
+
+
+command_trie = _CommandTrie()
+
+
+def sync_command_trie():
+    """Bring the trie in line with registered_commands and aliases (only the difference is applied)."""
+    current = set(registered_commands) | set(_aliases)
+    for name in command_trie.names - current:
+        command_trie.remove(name)
+    for name in current - command_trie.names:
+        command_trie.insert(name)
+
+
+class _PathCache:
+    """Sorted directory listings ("name" or "name/" for directories), reused while the mtime is unchanged."""
+
+    def __init__(self, max_dirs=PATH_CACHE_DIRS):
+        from collections import OrderedDict
+        self.max_dirs = max_dirs
+        self._dirs = OrderedDict()   # path -> (mtime_ns, sorted names)
+        self._lock = threading.Lock()
+
+    def listing(self, directory):
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            return []
+        with self._lock:
+            cached = self._dirs.get(directory)
+            if cached and cached[0] == mtime:
+                self._dirs.move_to_end(directory)
+                return cached[1]
+        names = []
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        names.append(entry.name + "/" if entry.is_dir() else entry.name)
+                    except OSError:
+                        names.append(entry.name)
+        except OSError:
+            return []
+        names.sort()
+        with self._lock:
+            self._dirs[directory] = (mtime, names)
+            self._dirs.move_to_end(directory)
+            while len(self._dirs) > self.max_dirs:
+                self._dirs.popitem(last=False)
+        return names
+
+    def complete(self, text):
+        """Completions for a typed path fragment, keeping what the user typed before the last /."""
+        import bisect
+        head, _, prefix = text.rpartition("/")
+        if text.startswith("/") and not head:
+            head = "/"
+        directory = os.path.expanduser(head) if head else "."
+        names = self.listing(directory)
+        i = bisect.bisect_left(names, prefix)
+        out = []
+        base = text[:len(text) - len(prefix)]
+        while i < len(names) and names[i].startswith(prefix) and len(out) < PATH_COMPLETION_LIMIT:
+            name = names[i]
+            if prefix or not name.startswith("."):   # dotfiles only when asked for
+                out.append(base + name)
+            i += 1
+        return out
+
+
+path_cache = _PathCache()
+_completion_matches = []
+
+
+def complete_input(text, state):
+    """readline completer: command names for the first word of a stage, paths otherwise."""
+    global _completion_matches
+    if state == 0:
+        try:
+            line = _readline.get_line_buffer()[:_readline.get_begidx()]
+            first_word = not line.rsplit("|", 1)[-1].strip()
+            if first_word:
+                # (compare names, not counts: an alias may share a command's name)
+                if command_trie.names != registered_commands.keys() | _aliases.keys():
+                    sync_command_trie()   # a plugin stub was replaced, a job added a command, ...
+                matches = command_trie.complete(text)
+            else:
+                matches = path_cache.complete(text)
+            if len(matches) == 1 and not matches[0].endswith("/"):
+                matches = [matches[0] + " "]
+            _completion_matches = matches
+        except Exception:
+            _completion_matches = []   # never let a completion error reach readline
+    return _completion_matches[state] if state < len(_completion_matches) else None
+
+
+def setup_completion():
+    """Install Tab completion when readline is available (after setup_readline_history)."""
+    if _readline is None:
+        return
+    sync_command_trie()
+    _readline.set_completer(complete_input)
+    _readline.set_completer_delims(" \t\n|;&<>")
+    if "libedit" in (_readline.__doc__ or ""):
+        _readline.parse_and_bind("bind ^I rl_complete")
+    else:
+        _readline.parse_and_bind("tab: complete")
+
+
+def _read_search_key():
+    """Read one keypress for reverse search; returns a character or a key name."""
+    if os.name == "nt":
+        ch = msvcrt.getwch()
+        if ch in ("\x00", "\xe0"):
+            msvcrt.getwch()
+            return None
+    else:
+        fd = sys.stdin.fileno()
+        old = termios.tcgetattr(fd)
+        try:
+            tty.setraw(fd, termios.TCSANOW)    # TCSAFLUSH would drop keys typed ahead
+            raw = os.read(fd, 1)
+            if raw and raw[0] >= 0xC0:            # multi-byte UTF-8 character
+                raw += os.read(fd, 3 if raw[0] >= 0xF0 else 2 if raw[0] >= 0xE0 else 1)
+            if raw == b"\x1b":
+                # swallow the rest of an arrow/escape sequence
+                while select.select([fd], [], [], 0.02)[0]:
+                    os.read(fd, 8)
+            ch = raw.decode("utf-8", "replace")
+        finally:
+            termios.tcsetattr(fd, termios.TCSADRAIN, old)
+    if ch in ("\r", "\n"):
+        return "ENTER"
+    if ch in ("\x1b", "\x03", "\x07"):       # Esc, Ctrl+C, Ctrl+G
+        return "ESC"
+    if ch in ("\x7f", "\x08"):
+        return "BACKSPACE"
+    if ch == "\x12":                         # Ctrl+R: next older match
+        return "NEXT"
+    return ch if ch.isprintable() else None
+
+
+def reverse_search():
+    """Incremental (Ctrl+R style) search over the history index. Returns the chosen command or None."""
+    command_history.refresh()
+    term, skip = "", 0
+    while True:
+        hits = command_history.search(term) if term else []
+        skip = min(skip, max(0, len(hits) - 1))
+        match = hits[skip][1] if hits else ""
+        label = "reverse-i-search" if hits or not term else "failing reverse-i-search"
+        sys.stdout.write(f"\r\x1b[K({label})'{term}': {match}")
+        sys.stdout.flush()
+        key = _read_search_key()
+        if key == "ENTER":
+            sys.stdout.write("\r\x1b[K")
+            return match or None
+        if key == "ESC":
+            sys.stdout.write("\r\x1b[K")
+            return None
+        if key == "BACKSPACE":
+            term, skip = term[:-1], 0
+        elif key == "NEXT":
+            skip += 1
+        elif key:
+            term, skip = term + key, 0
+
+
+@register_command("history")
+def show_history(args):
+    """Display a list of previously run commands.
+    Options:
+      history             → show all commands
+      history -n <num>    → show last <num> commands
+      history -s <term>   → search history (substring, most recent first)
+      history -p <prefix> → search history by prefix
+      history -r          → interactive reverse search (also bound to Ctrl+R)
+      history -c          → clear history
+    """
+    global _pending_input
+
+    # Interactive reverse search
+    if args and args[0] in ("-r", "--reverse"):
+        if not sys.stdin.isatty():
+            print("⚠️ Reverse search needs an interactive terminal.")
+            return
+        if _readline is not None and _readline.get_current_history_length():
+            # readline recorded the "history -r" line itself; drop it
+            _readline.remove_history_item(_readline.get_current_history_length() - 1)
+        chosen = reverse_search()
+        if not chosen:
+            return
+        if _readline_history_enabled():
+            _pending_input = chosen          # edit/confirm at the next prompt
+        else:
+            print(f"PynixShell {os.getcwd()}> {chosen}")
+            execute_command(chosen)
+        return
+
+    command_history.refresh()
+
+    # Search
+    if args and args[0] in ("-s", "--search", "-p", "--prefix"):
+        if len(args) < 2:
+            print(f"Usage: history {args[0]} <term>")
+            return
+        term = " ".join(args[1:])
+        hits = command_history.search(term, prefix=args[0] in ("-p", "--prefix"))
+        if not hits:
+            print(f"🔍 No history entries match '{term}'.")
+            return
+        print(f"\n🔍 {len(hits)} match(es) for '{term}':")
+        for i, cmd in hits:
+            print(f"{i:>3}. {cmd}")
+        return
+
+    if not command_history:
+        print("No commands in history.")
+        return
+
+    # Clear history
+    if args and args[0].lower() in ("-c", "--clear"):
+        command_history.clear()
+        print("🧹 Command history cleared.")
         return
 
     # Show last N commands
@@ -2383,13 +4527,13 @@ def show_history(args):
             print("Usage: history -n <number>")
             return
         n = int(args[1])
-        entries = command_history[-n:]
+        entries = command_history.numbered(last=n)
         print(f"\n📜 Last {n} Commands:")
     else:
-        entries = command_history
+        entries = command_history.numbered()
         print("\n📜 Command History:")
 
-    for i, cmd in enumerate(entries, start=len(command_history) - len(entries) + 1):
+    for i, cmd in entries:
         print(f"{i:>3}. {cmd}")
 
 @register_command("ip")
@@ -2526,7 +4670,7 @@ def donut(args):
         old_settings = termios.tcgetattr(fd)
         tty.setcbreak(fd)
 
-    threading.Thread(target=run_donut, daemon=True).start()
+    threading.Thread(target=_carry_output(run_donut), daemon=True).start()
 
     # Wait for donut to stop (so user can ESC anytime)
     while DonutRunning:
@@ -2629,8 +4773,10 @@ def alias_cmd(args):
     Usage:
       alias                       → list all aliases
       alias name='command'        → create alias
+    Arguments after the alias are appended, or substituted for $1..$9 / $@.
     Example:
       alias ll='ls -l'
+      alias gg='grep $1 -r $2'
     """
     global _aliases
 
@@ -2654,9 +4800,13 @@ def alias_cmd(args):
     name = name.strip()
     cmd = cmd.strip().strip("'\"")
 
+    if not name or " " in name:
+        print("Usage: alias name='command'")
+        return
+
     # --- Register alias ---
     _aliases[name] = cmd
-    registered_commands[name] = lambda a, c=cmd: handle_command(c)
+    compile_aliases()
 
     # --- Save it ---
     save_aliases()
@@ -2678,6 +4828,7 @@ def unalias_cmd(args):
     if args[0] == "-a":
         count = len(_aliases)
         _aliases.clear()
+        compile_aliases()
         save_aliases()
         print(f"🗑️  Removed all {count} aliases.")
         return
@@ -2689,8 +4840,7 @@ def unalias_cmd(args):
 
     # Remove from memory and disk
     del _aliases[name]
-    if name in registered_commands:
-        del registered_commands[name]
+    compile_aliases()
     save_aliases()
     print(f"🗑️  Alias removed: {name}")
     
@@ -2711,83 +4861,37 @@ def date_cmd(args):
 @register_command("csync")
 def csync_cmd(args):
     """
-    Synchronize and reload all command files in /commands (recursively).
-    Deletes stale modules, reloads updated ones, and imports new ones.
+    Synchronize command files in /commands (recursively) with memory.
+    Only files that changed since the last sync are re-executed; commands
+    from deleted files are unregistered.
+    Usage:
+      csync       → incremental sync using the plugin manifest
+      csync -f    → force a full reload of every command file
+      csync -l    → register changed files as lazy stubs (imported on first call)
     """
-    base_dir = os.path.join(os.getcwd(), "commands")
-    os.makedirs(base_dir, exist_ok=True)
+    base_dir = _plugin_base_dir()
+    force = "-f" in args or "--force" in args
+    lazy = "-l" in args or "--lazy" in args
 
     print("🔄 Starting command sync...\n")
-
-    # 1️⃣ Collect all .py files inside /commands recursively
-    all_command_files = []
-    for root, _, files in os.walk(base_dir):
-        for file in files:
-            if file.endswith(".py"):
-                file_path = os.path.join(root, file)
-                all_command_files.append(file_path)
-
-    if not all_command_files:
+    start = time.perf_counter()
+    hits, misses = _bytecode_stats["hits"], _bytecode_stats["misses"]
+    result = sync_plugins(base_dir, force=force, lazy=lazy)
+    elapsed = (time.perf_counter() - start) * 1000
+    hits = _bytecode_stats["hits"] - hits
+    misses = _bytecode_stats["misses"] - misses
+
+    if not any(result.values()):
         print("⚠️ No command files found in /commands.")
         return
 
-    # 2️⃣ Identify currently loaded external modules
-    loaded_modules = {
-        name: module for name, module in sys.modules.items()
-        if name.startswith("cmd_")
-    }
-
-    # 3️⃣ Remove orphaned (deleted) modules
-    to_remove = []
-    for mod_name, module in loaded_modules.items():
-        mod_file = getattr(module, "__file__", None)
-        if not mod_file or not os.path.exists(mod_file):
-            to_remove.append(mod_name)
-
-    for mod_name in to_remove:
-        del sys.modules[mod_name]
-        print(f"🗑️  Removed stale module: {mod_name}")
-
-    # 4️⃣ Reload all valid command files
-    import __main__
-    loaded_count = 0
-    failed = []
-
-    for file_path in all_command_files:
-        try:
-            rel_path = os.path.relpath(file_path, base_dir)
-            hash_suffix = hashlib.md5(rel_path.encode()).hexdigest()[:6]
-            mod_name = f"cmd_{os.path.splitext(os.path.basename(file_path))[0]}_{hash_suffix}"
-
-            # Remove old version if it exists
-            if mod_name in sys.modules:
-                del sys.modules[mod_name]
-
-            # Load new module
-            spec = importlib.util.spec_from_file_location(mod_name, file_path)
-            if not spec or not spec.loader:
-                print(f"⚠️ Skipping invalid module: {file_path}")
-                continue
-
-            module = importlib.util.module_from_spec(spec)
-            module.__dict__["registered_commands"] = __main__.registered_commands
-            module.__dict__["handle_command"] = __main__.handle_command
-            spec.loader.exec_module(module)
-            sys.modules[mod_name] = module
-
-            loaded_count += 1
-            print(f"✅ Loaded: {os.path.basename(file_path)}")
-
-        except Exception as e:
-            failed.append((file_path, str(e)))
-            traceback.print_exc()
-
-    # 5️⃣ Summary
-
-    print(f"\n✅ use command rfpt to refresh {loaded_count} command file(s).")
-    if failed:
+    print(f"\n📦 {len(result['loaded'])} loaded, {len(result['deferred'])} deferred, "
+          f"{len(result['unchanged'])} unchanged, {len(result['removed'])} removed ({elapsed:.1f} ms)")
+    if hits or misses:
+        print(f"🗃️  Bytecode cache: {hits} hit(s), {misses} miss(es)")
+    if result["failed"]:
         print("⚠️ Failed to load:")
-        for name, err in failed:
+        for name, err in result["failed"]:
             print(f"  - {name}: {err}")
 
     print("\n🔁 All commands are now synced and up to date.")
@@ -2813,6 +4917,10 @@ def lsc_cmd(args):
 
         for cmd_name, func in registered_commands.items():
             try:
+                if isinstance(func, _PluginStub):
+                    found_any = True
+                    print(f"💤 {cmd_name:<20} → {os.path.abspath(func.file_path)} (not loaded yet)")
+                    continue
                 file_path = inspect.getsourcefile(func)
                 if file_path and os.path.commonpath([file_path, base_dir]) == base_dir:
                     found_any = True
@@ -2828,7 +4936,6 @@ def lsc_cmd(args):
     # --- -c mode: scan files directly for register_command() calls ---
     print("🔍 Scanning /commands for external command definitions...\n")
     found_any = False
-    pattern = re.compile(r'@register_command\((["\'])(.*?)\1\)')
 
     for root, _, files in os.walk(base_dir):
         for file in files:
@@ -2840,7 +4947,7 @@ def lsc_cmd(args):
                 with open(file_path, "r", encoding="utf-8") as f:
                     content = f.read()
 
-                matches = [m[1] for m in pattern.findall(content)]
+                matches = scan_plugin_commands(content)
                 if matches:
                     found_any = True
                     abs_path = os.path.abspath(file_path)
@@ -2859,11 +4966,16 @@ def mod_cmd(args):
     Run a command after a time delay.
     Usage:
       mod -t <seconds> <command>
+      mod -p -t <seconds> <command>   → also re-schedule it on every startup
     Example:
       mod -t 5 echo Hello world
     """
+    persist = bool(args) and args[0] == "-p"
+    if persist:
+        args = args[1:]
+
     if not args or len(args) < 3 or args[0] != "-t":
-        print("Usage: mod -t <seconds> <command>")
+        print("Usage: mod [-p] -t <seconds> <command>")
         return
 
     try:
@@ -2873,15 +4985,14 @@ def mod_cmd(args):
         return
 
     command_line = " ".join(args[2:])
-    print(f"⏳ Waiting {delay} seconds before running: {command_line}")
 
-    def delayed_execute():
-        time.sleep(delay)
+    def announce(job):
         print(f"\n▶ Running delayed command: {command_line}")
-        handle_command(command_line)
 
-    # Run asynchronously so terminal isn’t blocked
-    threading.Thread(target=delayed_execute, daemon=True).start()        
+    # Runs on the shared scheduler thread so the terminal isn't blocked
+    entry = add_autoexec_entry({"kind": "mod", "command": command_line, "delay": delay, "count": 1}) if persist else None
+    job = scheduler.schedule(command_line, kind="mod", delay=delay, persist=entry, on_run=announce)
+    print(f"⏳ Job {job.id}: waiting {delay} seconds before running: {command_line}")
     
 @register_command("newline")
 def newline_cmd(args):
@@ -2894,24 +5005,37 @@ def newline_cmd(args):
     
 @register_command("queue")
 def queue_cmd(args):
-    """Add a command to autoexec.json to run automatically next startup."""
+    """Add a command to autoexec.json to run automatically at startup.
+    Usage:
+      queue <command>   → run <command> on every startup
+      queue -l          → list autoexec.json entries
+      queue -r <n>      → remove entry number <n>
+    """
     if not args:
-        print("Usage: queue <command>")
+        print("Usage: queue <command> | queue -l | queue -r <n>")
         return
 
-    cmd_line = " ".join(args)
-    queue = []
-    if os.path.exists(AUTOEXEC_FILE):
-        try:
-            with open(AUTOEXEC_FILE, "r", encoding="utf-8") as f:
-                queue = json.load(f)
-        except Exception:
-            queue = []
+    if args[0] == "-l":
+        entries = read_autoexec()
+        if not entries:
+            print("(autoexec.json is empty)")
+        for i, entry in enumerate(entries, start=1):
+            print(f"{i:>3}. {_describe_autoexec_entry(entry)}")
+        return
 
-    queue.append(cmd_line)
-    with open(AUTOEXEC_FILE, "w", encoding="utf-8") as f:
-        json.dump(queue, f, indent=2)
-    print(f"✅ Queued for next startup: {cmd_line}")    
+    if args[0] == "-r":
+        entries = read_autoexec()
+        if len(args) < 2 or not args[1].isdigit() or not 1 <= int(args[1]) <= len(entries):
+            print("Usage: queue -r <n>  (see 'queue -l')")
+            return
+        removed = entries.pop(int(args[1]) - 1)
+        write_autoexec(entries)
+        print(f"🗑️  Removed from autoexec: {_describe_autoexec_entry(removed)}")
+        return
+
+    cmd_line = " ".join(args)
+    add_autoexec_entry(cmd_line)
+    print(f"✅ Queued for startup: {cmd_line}")    
     
     
 @register_command("unzip")
@@ -3155,14 +5279,14 @@ def ssh_cmd(args):
         server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         server.bind((host_ip, PORT))
         server.listen()
-        threading.Thread(target=lambda: accept_clients(server), daemon=True).start()
-        threading.Thread(target=lambda: broadcast_host_info(host_ip), daemon=True).start()
+        threading.Thread(target=_carry_output(lambda: accept_clients(server)), daemon=True).start()
+        threading.Thread(target=_carry_output(lambda: broadcast_host_info(host_ip)), daemon=True).start()
         return host_ip
 
     def accept_clients(server):
         while True:
             conn, addr = server.accept()
-            threading.Thread(target=handle_client, args=(conn, addr), daemon=True).start()
+            threading.Thread(target=_carry_output(handle_client), args=(conn, addr), daemon=True).start()
 
     def discover_hosts(timeout=5):
         print("[Scanning for available hosts...]")
@@ -3222,7 +5346,7 @@ def ssh_cmd(args):
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         sock.connect((host_ip, PORT))
         send_packet(sock, name.encode())
-        threading.Thread(target=receive_messages, args=(sock,), daemon=True).start()
+        threading.Thread(target=_carry_output(receive_messages), args=(sock,), daemon=True).start()
 
         while True:
             msg = input("> ")
@@ -3318,7 +5442,7 @@ def nano(args):
             try:
                 conn, _ = srv.accept()
                 peers.append(conn)
-                threading.Thread(target=collab_recv, args=(conn,), daemon=True).start()
+                threading.Thread(target=_carry_output(collab_recv), args=(conn,), daemon=True).start()
             except:
                 break
 
@@ -3328,7 +5452,7 @@ def nano(args):
         try:
             collab_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             collab_sock.connect((ip, PORT))
-            threading.Thread(target=collab_recv, args=(collab_sock,), daemon=True).start()
+            threading.Thread(target=_carry_output(collab_recv), args=(collab_sock,), daemon=True).start()
         except Exception as e:
             print(f"⚠️ Could not connect to host: {e}")
 
@@ -3371,7 +5495,7 @@ def nano(args):
     if collab_mode:
         role = input("Host or Join collab? (h/j): ").strip().lower()
         if role.startswith("h"):
-            threading.Thread(target=collab_server, daemon=True).start()
+            threading.Thread(target=_carry_output(collab_server), daemon=True).start()
             print("🟢 Collaboration host started on port 5002.")
         else:
             ip = input("Enter host IP to join: ").strip()
@@ -3703,73 +5827,88 @@ def find_cmd(args):
     Usage:
       find <filename>         → search all drives for any file matching that name
       find <filename>.<ext>   → search all drives for that exact file type
+      find <filename> --json  → stream matches as NDJSON records (--csv for CSV)
+      find <filename> -j <n>  → walk with n threads (default 8)
+      find <filename> --index → answer from the updatedb index instead of walking (globs work too)
     Example:
       find main.py
       find notes.txt
     """
-    import fnmatch
-    import string
-    import threading
-    import queue
-    import time
     import sys
 
+    fmt = pop_output_format(args)
+    use_index = "--index" in args
+    args = [arg for arg in args if arg != "--index"]
+    workers = SEARCH_WORKERS
+    if "-j" in args:
+        i = args.index("-j")
+        try:
+            workers = max(1, int(args[i + 1]))
+        except (IndexError, ValueError):
+            print("Usage: find <filename> [-j <threads>]")
+            return
+        del args[i:i + 2]
     if not args:
         print("Usage: find <filename> or find <filename>.<ext>")
         return
 
     query = args[0].lower()
-    print(f"🔍 Searching for '{query}' across all drives...\n")
 
-    # Determine all root drives
-    if os.name == "nt":
-        roots = [f"{d}:\\" for d in string.ascii_uppercase if os.path.exists(f"{d}:\\")]
-    else:
-        roots = ["/"]
+    # --- Index lookup: no walk at all ---
+    if use_index:
+        try:
+            index = load_locate_index()
+        except (OSError, ValueError) as e:
+            set_exit_status(1)
+            print(f"❌ Cannot read the locate index: {e}")
+            return
+        if index is None:
+            set_exit_status(1)
+            print("⚠️ No index yet. Run 'updatedb' first, or drop --index to walk the disk.")
+            return
+        paths = index.search(query, files_only=True)
+        if fmt != "table":
+            yield from render_records(({"name": os.path.basename(path), "path": path} for path in paths), fmt)
+            return
+        found = 0
+        for path in paths:
+            found += 1
+            yield f"📄 {path}"
+        built = datetime.datetime.fromtimestamp(index.header["built"]).strftime("%Y-%m-%d %H:%M")
+        print(f"\n✅ Found {found} matching file(s) in the index (updatedb {built}).")
+        return
 
-    # Thread-safe structures
-    found = []
-    q = queue.Queue()
-    scanned = 0
+    if fmt == "table":
+        print(f"🔍 Searching for '{query}' across all drives...\n")
+
+    roots = search_roots()
     total_estimate = 1_000_000  # arbitrary for smooth animation
 
-    # --- Worker Thread Function ---
-    def worker():
-        nonlocal scanned
-        while True:
-            try:
-                root = q.get(timeout=1)
-            except queue.Empty:
-                break
-            for dirpath, dirnames, filenames in os.walk(root, topdown=True, followlinks=False):
-                # Filter system dirs for speed
-                dirnames[:] = [
-                    d for d in dirnames
-                    if not d.startswith("$") and "System Volume" not in d and "Windows" not in d
-                ]
-                for name in filenames:
-                    scanned += 1
-                    name_lower = name.lower()
-                    if query in name_lower:
-                        found.append(os.path.join(dirpath, name))
-            q.task_done()
-
-    # --- Fill queue with all root drives ---
-    for r in roots:
-        q.put(r)
-
-    # --- Start Worker Threads ---
-    threads = []
-    for _ in range(min(8, len(roots) * 2)):  # up to 8 threads
-        t = threading.Thread(target=worker, daemon=True)
-        t.start()
-        threads.append(t)
+    # Filter system dirs for speed
+    def prune(entry):
+        name = entry.name
+        return name.startswith("$") or "System Volume" in name or "Windows" in name
+
+    walker = ParallelWalker(roots, workers=workers, prune=prune)
+
+    def matches():
+        for entry in walker.files():
+            if query in entry.name.lower() and not entry.is_dir(follow_symlinks=False):
+                yield entry.path
+
+    # --- Record output: stream matches as the workers find them ---
+    if fmt != "table":
+        yield from render_records(({"name": os.path.basename(path), "path": path} for path in matches()), fmt)
+        return
 
     # --- Progress Animation Thread ---
+    scan_over = threading.Event()
+
     def progress_anim():
         spinner = "|/-\\"
         idx = 0
-        while any(t.is_alive() for t in threads):
+        while not scan_over.is_set():
+            scanned = walker.entries_scanned
             percent = min(100, int((scanned / total_estimate) * 100))
             bar = "█" * (percent // 2) + "-" * (50 - percent // 2)
             sys.stdout.write(
@@ -3777,28 +5916,32 @@ def find_cmd(args):
             )
             sys.stdout.flush()
             idx += 1
-            time.sleep(0.1)
+            scan_over.wait(0.1)
         sys.stdout.write("\r" + " " * 100 + "\r")  # clear line
 
-    anim_thread = threading.Thread(target=progress_anim, daemon=True)
-    anim_thread.start()
-
-    # Wait for queue + threads
-    q.join()
-    for t in threads:
-        t.join()
-
-    time.sleep(0.2)  # allow animation to settle
+    # (no animation when the output is not the terminal: a background job or a pipe)
+    anim_thread = None
+    if not _stdout_router().is_redirected():
+        anim_thread = threading.Thread(target=progress_anim, daemon=True)
+        anim_thread.start()
+    try:
+        found = list(matches())
+    finally:
+        scan_over.set()
+        if anim_thread is not None:
+            anim_thread.join()
     sys.stdout.write("\r✅ Scan complete!\n\n")
 
     # --- Results ---
     if found:
         for match in found:
-            print(f"📄 {match}")
+            yield f"📄 {match}"
         print(f"\n✅ Found {len(found)} matching file(s) across {len(roots)} drive(s).")
     else:
+        set_exit_status(1)
         print("❌ No matches found.")
-    print(f"\n🔎 Scanned approximately {scanned:,} files total.\n")
+    print(f"\n🔎 Scanned approximately {walker.entries_scanned:,} files total.\n")
+
 
 @register_command("wintask")
 def wintask_cmd(args):
@@ -3985,6 +6128,208 @@ def admin_cmd(args):
     else:
         print("✅ Already running as Administrator.")
 
+# =======================================
+# Scheduler
+# =======================================
+# loop, mod, watch and autoexec jobs share one scheduler thread. It sleeps
+# until the earliest due job (a heap ordered by next run time) and hands it
+# to a small worker pool, so thousands of scheduled commands cost heap
+# entries, not OS threads, and one slow job does not hold up the others.
+# A job goes back on the heap only once its run has finished.
+
+AUTOEXEC_FILE = os.path.join(BASE_DIR, "autoexec.json")
+SCHEDULER_WORKERS = 8
+
+
+class ScheduledJob:
+    """A command line scheduled to run once, a number of times, or forever."""
+
+    def __init__(self, job_id, command, kind, delay=0.0, interval=None, count=1,
+                 persist=None, on_run=None, on_done=None):
+        self.id = job_id
+        self.command = command
+        self.kind = kind
+        self.interval = interval
+        self.remaining = count          # None → repeat until cancelled
+        self.next_run = time.monotonic() + delay
+        self.runs = 0
+        self.persist = persist          # autoexec.json entry this job came from
+        self.on_run = on_run            # called before each run
+        self.on_done = on_done          # called once the job has finished
+        self.done = threading.Event()
+        self.cancel = None              # CancelToken of the run in progress
+
+
+class Scheduler:
+    """Runs ScheduledJobs from a single background thread."""
+
+    def __init__(self, workers=SCHEDULER_WORKERS):
+        self._heap = []
+        self._jobs = {}
+        self._cond = threading.Condition()
+        self._next_id = 1
+        self._thread = None
+        self._pool = None
+        self.workers = workers
+
+    def schedule(self, command, kind="job", delay=0.0, interval=None, count=1,
+                 persist=None, on_run=None, on_done=None):
+        with self._cond:
+            job = ScheduledJob(self._next_id, command, kind, delay, interval, count,
+                               persist, on_run, on_done)
+            self._next_id += 1
+            self._jobs[job.id] = job
+            heapq.heappush(self._heap, (job.next_run, job.id))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="pynix-scheduler", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return job
+
+    def cancel(self, job_id):
+        """Cancel a job; returns it, or None if no such job is scheduled."""
+        with self._cond:
+            job = self._jobs.pop(job_id, None)
+            self._cond.notify()
+        if job is not None:
+            if job.cancel is not None:
+                job.cancel.cancel()     # stop a run that is in progress, too
+            self._finish(job)
+        return job
+
+    def cancel_kind(self, kind):
+        """Cancel every job of one kind (e.g. all loops); returns how many."""
+        with self._cond:
+            ids = [job.id for job in self._jobs.values() if job.kind == kind]
+        return sum(1 for job_id in ids if self.cancel(job_id))
+
+    def jobs(self):
+        with self._cond:
+            return sorted(self._jobs.values(), key=lambda job: job.next_run)
+
+    def _finish(self, job):
+        job.done.set()
+        if job.on_done:
+            try:
+                job.on_done(job)
+            except Exception:
+                pass
+
+    def _next_due(self):
+        with self._cond:
+            while True:
+                # Cancelled jobs leave stale heap entries behind; skip them here
+                while self._heap and self._heap[0][1] not in self._jobs:
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                due, job_id = self._heap[0]
+                wait = due - time.monotonic()
+                if wait <= 0:
+                    heapq.heappop(self._heap)
+                    return self._jobs[job_id]
+                self._cond.wait(wait)
+
+    def _run(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        self._pool = self._pool or ThreadPoolExecutor(max_workers=self.workers,
+                                                      thread_name_prefix="pynix-scheduled")
+        while True:
+            job = self._next_due()
+            job.runs += 1
+            if job.remaining is not None:
+                job.remaining -= 1
+            self._pool.submit(self._run_job, job)
+
+    def _run_job(self, job):
+        _exec_state.scheduled = True
+        try:
+            if job.on_run:
+                job.on_run(job)
+            job.cancel = CancelToken()
+            run_command_line(job.command, cancel=job.cancel)  # the loop/watch line itself is already in history
+        except (Exception, SystemExit) as e:
+            print(f"⚠️ Job {job.id} ({job.command}) failed: {e}")
+
+        with self._cond:
+            if job.id not in self._jobs:
+                return  # cancelled while running
+            if job.remaining is not None and job.remaining <= 0:
+                del self._jobs[job.id]
+                finished = True
+            else:
+                job.next_run = time.monotonic() + (job.interval or 0)
+                heapq.heappush(self._heap, (job.next_run, job.id))
+                self._cond.notify()
+                finished = False
+        if finished:
+            self._finish(job)
+
+
+def in_scheduled_job():
+    """True on a scheduler worker: the command runs as (part of) a loop, mod, watch or autoexec job."""
+    return getattr(_exec_state, "scheduled", False)
+
+
+scheduler = Scheduler()
+
+
+def read_autoexec():
+    """Return the autoexec.json entries (command strings or job dicts)."""
+    if not os.path.exists(AUTOEXEC_FILE):
+        return []
+    try:
+        with open(AUTOEXEC_FILE, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+        return entries if isinstance(entries, list) else []
+    except Exception:
+        return []
+
+
+def write_autoexec(entries):
+    with open(AUTOEXEC_FILE, "w", encoding="utf-8") as f:
+        json.dump(entries, f, indent=2)
+
+
+def add_autoexec_entry(entry):
+    entries = read_autoexec()
+    entries.append(entry)
+    write_autoexec(entries)
+    return entry
+
+
+def remove_autoexec_entry(entry):
+    entries = read_autoexec()
+    if entry in entries:
+        entries.remove(entry)
+        write_autoexec(entries)
+
+
+def _describe_autoexec_entry(entry):
+    if isinstance(entry, str):
+        return entry
+    parts = [entry.get("kind", "job")]
+    if entry.get("delay"):
+        parts.append(f"after {entry['delay']}s")
+    if entry.get("interval"):
+        parts.append(f"every {entry['interval']}s")
+    parts.append("forever" if entry.get("count") is None else f"x{entry['count']}")
+    return f"[{' '.join(parts)}] {entry.get('command', '')}"
+
+
+def load_autoexec():
+    """Schedule everything in autoexec.json; plain strings run once at startup."""
+    for entry in read_autoexec():
+        if isinstance(entry, str):
+            scheduler.schedule(entry, kind="autoexec")
+        elif isinstance(entry, dict) and entry.get("command"):
+            scheduler.schedule(entry["command"], kind=entry.get("kind", "job"),
+                               delay=entry.get("delay", 0), interval=entry.get("interval"),
+                               count=entry.get("count"), persist=entry)
+
+
 @register_command("loop")
 def loop_cmd(args):
     """
@@ -3996,21 +6341,19 @@ def loop_cmd(args):
       loop -d <command> [args...]             → run once (structured form)
       loop -t 5 -s 2 <command>                → run 5 times, 2s delay
       loop -i -s 3 <command>                  → run forever, 3s delay
+      loop -p -i -s 60 <command>              → also re-schedule on every startup
 
-    Use 'break' or 'endloop' to stop all loops.
+    Use 'break' or 'endloop' to stop all loops, 'jobs' / 'cancel <id>' for one.
     """
-
-    import subprocess
-    import shlex
-
     if not args:
-        print("Usage: loop [-t count | -i | -d] [-s seconds] <command>")
+        print("Usage: loop [-t count | -i | -d] [-s seconds] [-p] <command>")
         return
 
     # --- Defaults ---
     loop_type = None
     loop_count = 1
     delay = 0
+    persist = False
     command_parts = []
 
     # --- Parse Flags ---
@@ -4029,6 +6372,8 @@ def loop_cmd(args):
             loop_type = "indefinite"
         elif arg == "-d":
             loop_type = "once"
+        elif arg == "-p":
+            persist = True
         elif arg == "-s":
             if i + 1 < len(args):
                 delay = float(args[i + 1])
@@ -4046,47 +6391,99 @@ def loop_cmd(args):
         return
 
     command_str = " ".join(command_parts)
+    if loop_type == "indefinite":
+        count = None
+    elif loop_type == "times":
+        count = loop_count
+    else:
+        count = 1
 
-    # --- Loop ID ---
-    loop_id = str(uuid.uuid4())[:8]
-
-    def run_loop():
-        print(f"🔁 Starting loop {loop_id} → {command_str}")
-        count = 0
-        while loop_id in _active_loops:
-            if loop_type == "times" and count >= loop_count:
-                break
-
-            # Run command
-            execute_command(command_str)
-
-            count += 1
-            if loop_type == "once":
-                break
-            if delay > 0:
-                time.sleep(delay)
-
-            if loop_type == "times" and count >= loop_count:
-                break
-
-        print(f"✅ Loop {loop_id} finished or stopped.")
-        _active_loops.pop(loop_id, None)
+    entry = None
+    if persist:
+        entry = add_autoexec_entry({"kind": "loop", "command": command_str, "interval": delay, "count": count})
 
-    # Register and start
-    _active_loops[loop_id] = True
-    t = threading.Thread(target=run_loop, daemon=True)
-    t.start()
+    job = scheduler.schedule(
+        command_str, kind="loop", interval=delay, count=count, persist=entry,
+        on_done=lambda job: print(f"✅ Loop {job.id} finished or stopped."),
+    )
+    print(f"🔁 Starting loop {job.id} → {command_str}")
 
 @register_command("break")
 @register_command("endloop")
 def break_loops(args):
     """Stops all currently running loops."""
-    if not _active_loops:
+    if not scheduler.cancel_kind("loop"):
         print("⚠️ No active loops.")
         return
-    for k in list(_active_loops.keys()):
-        _active_loops.pop(k, None)
     print("🛑 All loops stopped.")
+
+
+@register_command("jobs")
+def jobs_cmd(args):
+    """
+    List background jobs (started with '&') and scheduled jobs (loops,
+    delayed 'mod' commands, background watches, autoexec).
+    Usage:
+      jobs
+      jobs -c    → also forget finished background jobs
+    """
+    if "-c" in args:
+        for job in list(job_manager.jobs.values()):
+            if not job.active:
+                job_manager.forget(job)
+
+    background = list(job_manager.jobs.values())
+    if background:
+        print("Background jobs:")
+        for job in background:
+            elapsed = (job.finished or time.time()) - job.started if job.started else 0.0
+            print(f"  [%{job.id}] {_job_state(job):<8} {elapsed:6.1f}s  {job.output.total:>6} line(s)  {job.command}")
+        print()
+
+    jobs = scheduler.jobs()
+    if not jobs:
+        if not background:
+            print("(no jobs)")
+        return
+
+    print("Scheduled jobs:")
+    now = time.monotonic()
+    print(f"{'ID':>4}  {'KIND':<9} {'NEXT':>8}  {'EVERY':>7}  {'LEFT':>6}  COMMAND")
+    for job in jobs:
+        left = "∞" if job.remaining is None else str(job.remaining)
+        every = f"{job.interval:g}s" if job.interval else "-"
+        pin = " 📌" if job.persist is not None else ""
+        print(f"{job.id:>4}  {job.kind:<9} {max(0.0, job.next_run - now):>7.1f}s  {every:>7}  {left:>6}  {job.command}{pin}")
+
+
+@register_command("cancel")
+def cancel_cmd(args):
+    """
+    Cancel a scheduled job. Persistent (📌) jobs are also removed from autoexec.json.
+    Usage:
+      cancel <id>
+      cancel -a      → cancel every scheduled job
+    """
+    if not args:
+        print("Usage: cancel <id> | cancel -a")
+        return
+
+    if args[0] == "-a":
+        ids = [job.id for job in scheduler.jobs()]
+    elif args[0].isdigit():
+        ids = [int(args[0])]
+    else:
+        print("Usage: cancel <id> | cancel -a")
+        return
+
+    for job_id in ids:
+        job = scheduler.cancel(job_id)
+        if job is None:
+            print(f"❌ No scheduled job {job_id}.")
+            continue
+        if job.persist is not None:
+            remove_autoexec_entry(job.persist)
+        print(f"🛑 Cancelled job {job.id}: {job.command}")
     
 @register_command("caldr")
 def caldr_cmd(args):
@@ -4651,8 +7048,8 @@ def ct_cmd(args):
                     }).encode()
                     s.sendto(DISCOVER_REPLY + b" " + reply, a)
 
-        threading.Thread(target=serve_http, daemon=True).start()
-        threading.Thread(target=responder, daemon=True).start()
+        threading.Thread(target=_carry_output(serve_http), daemon=True).start()
+        threading.Thread(target=_carry_output(responder), daemon=True).start()
 
         try:
             while True:
@@ -5093,7 +7490,7 @@ def ctrun_cmd(args):
         def serve():
             with socketserver.TCPServer(('', 8765), RunHandler) as httpd:
                 httpd.serve_forever()
-        threading.Thread(target=serve, daemon=True).start()
+        threading.Thread(target=_carry_output(serve), daemon=True).start()
         print('CT run helper active on port 8765')
     """).strip().encode()
 
@@ -6093,84 +8490,1619 @@ def band_cmd(args):
 
 
 # =======================================
-# Command Execution
+# Pipelines
 # =======================================
+# `cmd1 | cmd2 | cmd3` runs in-process. Generator commands stream their
+# lines straight into the next stage; commands registered with stream=True
+# also read the previous stage through their `stdin` argument. Commands
+# that only print run in a worker thread whose stdout is captured line by
+# line into a bounded queue, so memory stays bounded and the producer is
+# stopped (BrokenPipeError on its next write) once the consumer is done.
 
-def execute_command(cmd_line):
-    """Execute a command string and record it in command history."""
-    global command_history
+# Commands whose arguments are a whole command line of their own; a `|`
+# after them belongs to that command line, not to a PyTerm pipeline.
+_RAW_LINE_COMMANDS = {"unix", "win", "mac", "alias", "loop", "mod", "watch", "queue", "time", "profile", "memprof"}
 
-    if not cmd_line.strip():
-        return
+PIPE_BUFFER_LINES = 1024
 
-    # --- Handle !number history recall ---
-    if cmd_line.strip().startswith("!"):
-        try:
-            index = int(cmd_line.strip()[1:]) - 1
-            if 0 <= index < len(command_history):
-                recalled = command_history[index]
-                print(f"🔁 Re-running command #{index + 1}: {recalled}")
-                execute_command(recalled)
-            else:
-                print(f"⚠️ No command #{index + 1} in history.")
-        except ValueError:
-            print("Usage: !<number>  (example: !5)")
-        return
+_PIPE_EOF = object()
 
-    # --- Record command in history ---
-    command_history.append(cmd_line.strip())
 
-    parts = cmd_line.strip().split()
-    cmd, args = parts[0], parts[1:]
+class _StdoutRouter:
+    """sys.stdout replacement that lets a thread send its output elsewhere."""
 
-    # Custom commands
-    if cmd in registered_commands:
-        try:
-            registered_commands[cmd](args)
-        except Exception as e:
-            print(f"Error running {cmd}: {e}")
-        return
+    is_pynix_router = True
 
-    # ============================
-    # Platform-specific prefixes
-    # ============================
+    def __init__(self, default):
+        self._default = default
+        self._local = threading.local()
 
-    # --- Windows commands ---
-    if cmd == "win":
-        if os.name != "nt":
-            print("⚠️ Windows commands are not supported on this system.")
-            return
-        if not args:
-            print("Usage: win <command>")
-            return
+    def _target(self):
+        return getattr(self._local, "target", None) or self._default
 
-        # Handle 'win cd'
-        if args[0].lower() == "cd":
-            if len(args) > 1:
-                try:
-                    os.chdir(args[1])
-                except Exception as e:
-                    print(f"Error changing directory: {e}")
-            else:
-                print(os.getcwd())
-            return
+    def redirect(self, target):
+        """Send this thread's writes to `target` (None restores the terminal)."""
+        self._local.target = target
 
-        win_cmd_line = " ".join(args)
-        try:
-            subprocess.call(["cmd", "/c", win_cmd_line])
-        except Exception as e:
-            print(f"Windows command failed: {e}")
-        return
+    def is_redirected(self):
+        return getattr(self._local, "target", None) is not None
 
+    def carry(self, fn):
+        """Wrap a thread target so the new thread writes where the calling thread writes now."""
+        target = getattr(self._local, "target", None)
+        if target is None:
+            return fn
 
-    # --- macOS commands ---
-    if cmd == "mac":
-        if sys.platform != "darwin":
-            print("⚠️ macOS commands are only available on macOS.")
-            return
-        if not args:
-            print("Usage: mac <command>")
-            return
+        def run(*args, **kwargs):
+            self.redirect(target)
+            try:
+                return fn(*args, **kwargs)
+            except JobKilled:
+                pass
+            finally:
+                self.redirect(None)
+        return run
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def flush(self):
+        return self._target().flush()
+
+    def __getattr__(self, attr):
+        return getattr(self._default, attr)
+
+
+def _stdout_router():
+    """Install (once) and return the per-thread stdout router."""
+    if not getattr(sys.stdout, "is_pynix_router", False):
+        sys.stdout = _StdoutRouter(sys.stdout)
+    return sys.stdout
+
+
+def _carry_output(fn):
+    """Thread target for a command's helper thread: inherits a background job's (or pipe's) stdout."""
+    return _stdout_router().carry(fn)
+
+
+# =======================================
+# Output manager
+# =======================================
+# In the interactive shell the router's terminal target is an OutputManager:
+# every thread writes into its own line buffer and only complete lines leave
+# it, so lines never interleave mid-line. Background threads queue their lines
+# for a single "pynix-output" thread that writes whatever has accumulated in
+# one go. The main thread writes its lines straight through, under the same
+# lock, so they stay ordered with subprocesses and curses apps that use the
+# terminal directly. When
+# background output arrives while the user is typing at the prompt, the input
+# line is cleared, the lines are printed, and the prompt plus typed text are
+# redrawn underneath.
+
+OUTPUT_DRAIN_TIMEOUT = 2.0
+
+
+class OutputManager:
+    """Line-buffered, single-writer front end for the terminal stream."""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._chunks = []
+        self._queued = 0
+        self._written = 0
+        self._main_ident = threading.main_thread().ident
+        self.prompt = None           # set by main() while it waits in input()
+        self.line_buffer = lambda: ""
+        self._tty = bool(getattr(stream, "isatty", lambda: False)())
+        self._thread = threading.Thread(target=self._run, name="pynix-output", daemon=True)
+        self._thread.start()
+
+    def _push(self, text):
+        with self._cond:
+            self._chunks.append((threading.get_ident(), text))
+            self._queued += 1
+            self._cond.notify_all()
+
+    def write(self, text):
+        if not text:
+            return 0
+        pending = getattr(self._local, "partial", "") + text
+        cut = pending.rfind("\n") + 1
+        if cut:
+            if threading.get_ident() == self._main_ident:
+                self._write_now(pending[:cut])
+            else:
+                self._push(pending[:cut])
+            pending = pending[cut:]
+        self._local.partial = pending
+        return len(text)
+
+    def flush(self):
+        """Send this thread's partial line too (background threads wait until it is on screen)."""
+        pending = getattr(self._local, "partial", "")
+        self._local.partial = ""
+        if threading.get_ident() == self._main_ident:
+            if pending:
+                self._write_now(pending)
+            return
+        if pending:
+            self._push(pending)
+        self.drain()
+
+    def _write_now(self, data):
+        with self._io_lock:
+            try:
+                self._stream.write(data)
+                self._stream.flush()
+            except (OSError, ValueError):
+                pass
+
+    def drain(self, timeout=OUTPUT_DRAIN_TIMEOUT):
+        with self._cond:
+            target = self._queued
+            self._cond.wait_for(lambda: self._written >= target or not self._thread.is_alive(), timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._chunks)
+                chunks, self._chunks = self._chunks, []
+            data = "".join(text for _, text in chunks)
+            prompt = self.prompt
+            if prompt is not None and self._tty and any(ident != self._main_ident for ident, _ in chunks):
+                if not data.endswith("\n"):
+                    data += "\n"
+                data = f"\r\x1b[K{data}{prompt}{self.line_buffer()}"
+            self._write_now(data)   # errors are swallowed: keep draining so writers never block
+            with self._cond:
+                self._written += len(chunks)
+                self._cond.notify_all()
+
+    def __getattr__(self, attr):
+        return getattr(self._stream, attr)
+
+
+output_manager = None
+
+
+def install_output_manager():
+    """Put an OutputManager between the stdout router and the terminal (interactive shell only)."""
+    global output_manager
+    if output_manager is None:
+        import atexit
+        router = _stdout_router()
+        output_manager = OutputManager(router._default)
+        if _readline is not None:
+            output_manager.line_buffer = _readline.get_line_buffer
+        router._default = output_manager
+        atexit.register(output_manager.flush)
+    return output_manager
+
+
+class _LineQueueWriter:
+    """File-like object that turns writes into complete lines on a bounded queue."""
+
+    def __init__(self, maxsize=PIPE_BUFFER_LINES):
+        self.queue = queue.Queue(maxsize)
+        self.cancelled = False
+        self._partial = ""
+
+    def _put(self, item):
+        while True:
+            if self.cancelled:
+                raise BrokenPipeError("pipeline consumer has finished")
+            try:
+                self.queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def write(self, text):
+        data = self._partial + text
+        *lines, self._partial = data.split("\n")
+        for line in lines:
+            self._put(line)
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def finish(self):
+        try:
+            if self._partial:
+                self._put(self._partial)
+            self._put(_PIPE_EOF)
+        except BrokenPipeError:
+            pass
+
+
+def _captured_lines(func, args, name):
+    """Run a print-only command in a thread and yield what it prints, line by line."""
+    writer = _LineQueueWriter()
+    router = _stdout_router()
+    outcome = []
+
+    def run():
+        router.redirect(writer)
+        set_exit_status(0)
+        try:
+            emit_output(func(args))
+        except BrokenPipeError:
+            pass
+        except Exception as e:
+            set_exit_status(1)
+            try:
+                print(f"Error running {name}: {e}")
+            except BrokenPipeError:
+                pass
+        finally:
+            outcome.append(last_exit_status())
+            router.redirect(None)
+            writer.finish()
+
+    threading.Thread(target=run, daemon=True).start()
+    try:
+        while True:
+            item = writer.queue.get()
+            if item is _PIPE_EOF:
+                if outcome and outcome[0]:
+                    set_exit_status(outcome[0])   # the status was recorded on the helper thread
+                return
+            yield item
+    finally:
+        writer.cancelled = True
+
+
+def emit_output(result):
+    """Print the lines of a streaming command; plain commands return None."""
+    if hasattr(result, "__next__"):
+        for item in result:
+            print(item)
+
+
+def split_pipeline(cmd_line):
+    """Split a command line on `|` into stages; one stage means no pipeline."""
+    first = cmd_line.split(None, 1)[0] if cmd_line.strip() else ""
+    if "|" not in cmd_line or first in _RAW_LINE_COMMANDS:
+        return [cmd_line]
+    return [stage.strip() for stage in cmd_line.split("|")]
+
+
+def run_pipeline(stages):
+    """Run `stage1 | stage2 | ...` lazily and print the last stage's output."""
+    if any(not stage for stage in stages):
+        print("Usage: <command> | <command> [| <command> ...]")
+        return
+
+    streams = []
+    try:
+        stream = None
+        for stage in stages:
+            parts = stage.split()
+            cmd, args = parts[0], parts[1:]
+            func = registered_commands.get(cmd)
+            if func is None:
+                set_exit_status(127)
+                print(f"Unknown command in pipeline: {cmd}")
+                return
+            if isinstance(func, _PluginStub):
+                func = func.load()
+
+            if getattr(func, "accepts_stdin", False):
+                stream = func(args, stdin=iter(stream) if stream is not None else None)
+            else:
+                if stream is not None:
+                    print(f"⚠️ '{cmd}' does not read piped input; ignoring it.")
+                if inspect.isgeneratorfunction(func):
+                    stream = func(args)
+                else:
+                    stream = _captured_lines(func, args, cmd)
+            if stream is not None:
+                streams.append(stream)
+
+        emit_output(stream)
+    except Exception as e:
+        command_stats.note_error()
+        set_exit_status(1)
+        print(f"Error running pipeline: {e}")
+    finally:
+        # Stop upstream producers that were not read to the end (e.g. after head)
+        for stream in reversed(streams):
+            close = getattr(stream, "close", None)
+            if close:
+                close()
+
+
+# =======================================
+# Job control
+# =======================================
+# `cmd &` hands the command line to a bounded worker pool. Each job's
+# stdout is captured into its own buffer (never the terminal), finished
+# jobs are announced just before the next prompt, and 'fg' replays or
+# follows a job's output.
+
+BACKGROUND_WORKERS = 4
+JOB_OUTPUT_LINES = 10000
+
+
+class JobKilled(BaseException):
+    """Raised inside a background job's thread once 'kill %<id>' was used on it."""
+
+
+class _JobOutput:
+    """File-like buffer that keeps the last JOB_OUTPUT_LINES lines a job printed."""
+
+    def __init__(self, job):
+        from collections import deque
+
+        self.job = job
+        self.lines = deque(maxlen=JOB_OUTPUT_LINES)
+        self.total = 0
+        self.cond = threading.Condition()
+        self._partial = ""
+
+    def write(self, text):
+        if self.job.killed:
+            raise JobKilled()
+        with self.cond:
+            *lines, self._partial = (self._partial + text).split("\n")
+            self.lines.extend(lines)
+            self.total += len(lines)
+            self.cond.notify_all()
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        with self.cond:
+            if self._partial:
+                self.lines.append(self._partial)
+                self.total += 1
+                self._partial = ""
+            self.cond.notify_all()
+
+    def lines_since(self, seen):
+        """Return (lines printed after the first `seen` lines, lines dropped, new total)."""
+        with self.cond:
+            new = self.total - seen
+            dropped = max(0, new - len(self.lines))
+            fresh = list(self.lines)[len(self.lines) - (new - dropped):] if new else []
+            return fresh, dropped, self.total
+
+
+class BackgroundJob:
+    def __init__(self, job_id, command):
+        self.id = job_id
+        self.command = command
+        self.status = "queued"          # queued → running → done / failed / killed
+        self.killed = False
+        self.notified = False
+        self.future = None
+        self.cancel = CancelToken()
+        self.output = _JobOutput(self)
+        self.started = None
+        self.finished = None
+
+    @property
+    def active(self):
+        return self.status in ("queued", "running")
+
+
+class JobManager:
+    """Runs background command lines on a bounded thread pool."""
+
+    def __init__(self, workers=BACKGROUND_WORKERS):
+        self.workers = workers
+        self.jobs = {}
+        self._next_id = 1
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def submit(self, command):
+        from concurrent.futures import ThreadPoolExecutor
+
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pynix-job")
+            job = BackgroundJob(self._next_id, command)
+            self._next_id += 1
+            self.jobs[job.id] = job
+        job.future = self._pool.submit(self._run, job)
+        return job
+
+    def _run(self, job):
+        if job.killed:
+            return
+        job.status = "running"
+        job.started = time.time()
+        router = _stdout_router()
+        router.redirect(job.output)
+        try:
+            run_command_line(job.command, cancel=job.cancel)
+            job.status = "killed" if job.killed else "done"
+        except JobKilled:
+            job.status = "killed"
+        except (Exception, SystemExit) as e:
+            job.status = "failed"
+            try:
+                print(f"Error running {job.command}: {e}")
+            except JobKilled:
+                job.status = "killed"
+        finally:
+            router.redirect(None)
+            job.finished = time.time()
+            job.output.close()
+
+    def get(self, ref):
+        """Look up a job from '%3' or '3'."""
+        ref = ref.lstrip("%")
+        return self.jobs.get(int(ref)) if ref.isdigit() else None
+
+    def kill(self, job):
+        job.killed = True
+        job.cancel.cancel()   # walkers and loops in the job stop at their next check
+        if job.future is not None and job.future.cancel():
+            job.status = "killed"
+            job.finished = time.time()
+            job.output.close()
+
+    def forget(self, job):
+        with self._lock:
+            self.jobs.pop(job.id, None)
+
+    def take_finished(self):
+        """Finished jobs that have not been announced yet."""
+        with self._lock:
+            done = [job for job in self.jobs.values() if not job.active and not job.notified]
+        for job in done:
+            job.notified = True
+        return done
+
+
+job_manager = JobManager()
+
+
+def _job_state(job):
+    return {"queued": "Queued", "running": "Running", "done": "Done",
+            "failed": "Failed", "killed": "Killed"}[job.status]
+
+
+def report_finished_jobs():
+    """Announce background jobs that finished since the last prompt."""
+    for job in job_manager.take_finished():
+        print(f"[%{job.id}] {_job_state(job):<8} {job.command}  "
+              f"({job.output.total} line(s) of output — 'fg {job.id}' to show)")
+
+
+def run_passthrough(argv):
+    """
+    Run an OS command. On the terminal it inherits stdout; inside a background
+    job or a pipeline its output is piped through sys.stdout so it is captured.
+    """
+    router = sys.stdout if getattr(sys.stdout, "is_pynix_router", False) else None
+    if router is None or not router.is_redirected():
+        sys.stdout.flush()   # pending partial line first; the child writes to the terminal directly
+        return subprocess.call(argv)
+
+    proc = subprocess.Popen(argv, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT, text=True, errors="replace")
+    try:
+        for line in proc.stdout:
+            sys.stdout.write(line)
+    except BaseException:
+        proc.kill()
+        raise
+    finally:
+        proc.stdout.close()
+    return proc.wait()
+
+
+class ShellCoprocess:
+    """
+    One long-lived bash that runs `unix` commands instead of forking a new shell each time.
+    Every command is followed by a per-session sentinel carrying its exit status and the
+    shell's $PWD, so output can be framed on the shared pipe and cwd kept in sync both ways.
+    """
+
+    def __init__(self, shell="bash"):
+        self.shell = shell
+        self.proc = None
+        self.sentinel = b""
+        self.lock = threading.Lock()
+        self.commands = 0
+        self.last_status = None
+
+    @property
+    def alive(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def start(self):
+        self.sentinel = f"__PYNIX_{uuid.uuid4().hex}__".encode()
+        # Own session: Ctrl+C in PyTerm must not take the shell down with it
+        self.proc = subprocess.Popen([self.shell, "--noprofile", "--norc"],
+                                     stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                     stderr=subprocess.STDOUT, start_new_session=True)
+
+    def close(self):
+        import signal
+        proc, self.proc = self.proc, None
+        if proc is None:
+            return
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except OSError:
+            pass
+        proc.wait()
+        proc.stdin.close()
+        proc.stdout.close()
+
+    def run(self, cmd_line):
+        """Run cmd_line in the shell and stream its output; returns the exit status, or None if busy."""
+        if not self.lock.acquire(blocking=False):
+            return None   # another thread is using the shell; caller falls back to a fresh one
+        try:
+            return self._run(cmd_line)
+        finally:
+            self.lock.release()
+
+    def _run(self, cmd_line):
+        import codecs, shlex
+        if not self.alive:
+            self.start()
+        self.commands += 1
+        script = (f"builtin cd -- {shlex.quote(os.getcwd())} && eval {shlex.quote(cmd_line)} </dev/null\n"
+                  f"printf '%s %d %s\\n' {self.sentinel.decode()} \"$?\" \"$PWD\"\n")
+        decoder = codecs.getincrementaldecoder("utf-8")("replace")
+        fd = self.proc.stdout.fileno()
+        buf = b""
+        try:
+            self.proc.stdin.write(script.encode())
+            self.proc.stdin.flush()
+            while True:
+                chunk = os.read(fd, 65536)
+                if not chunk:
+                    # the command ended the shell itself (e.g. `exit 3`)
+                    sys.stdout.write(decoder.decode(buf, final=True))
+                    self.last_status = self.proc.wait()
+                    self.close()
+                    return self.last_status
+                buf += chunk
+                i = buf.find(self.sentinel)
+                if i < 0:
+                    # hold back enough bytes to recognise a sentinel split across reads
+                    cut = len(buf) - len(self.sentinel)
+                    if cut > 0:
+                        sys.stdout.write(decoder.decode(buf[:cut]))
+                        sys.stdout.flush()
+                        buf = buf[cut:]
+                    continue
+                sys.stdout.write(decoder.decode(buf[:i], final=True))
+                sys.stdout.flush()
+                tail = buf[i + len(self.sentinel):]
+                while b"\n" not in tail:
+                    more = os.read(fd, 4096)
+                    if not more:
+                        break
+                    tail += more
+                status, _, pwd = tail.split(b"\n", 1)[0].decode("utf-8", "replace").strip().partition(" ")
+                if pwd and pwd != os.getcwd() and os.path.isdir(pwd):
+                    os.chdir(pwd)   # `unix cd x && ...` moves PyTerm too
+                self.last_status = int(status) if status.lstrip("-").isdigit() else 1
+                return self.last_status
+        except BaseException:
+            self.close()   # output framing is lost; the next command starts a fresh shell
+            raise
+
+
+shell_coprocess = None   # ShellCoprocess while `coproc on` is active
+
+
+@register_command("coproc")
+def coproc_cmd(args):
+    """
+    Run `unix` commands in one persistent bash instead of a new bash per command.
+    Usage:
+      coproc on       → start using the persistent shell
+      coproc off      → go back to one bash per command
+      coproc          → show status
+    Shell state (exported variables, functions, cd) carries over between commands.
+    Interactive programs (vim, less, top) need a terminal: leave coproc off for those.
+    """
+    global shell_coprocess
+    action = args[0].lower() if args else "status"
+
+    if action == "on":
+        if os.name == "nt" or shutil.which("bash") is None:
+            print("⚠️ coproc needs bash on this system.")
+            return
+        if shell_coprocess is None:
+            shell_coprocess = ShellCoprocess()
+        print("🐚 unix commands now run in a persistent bash.")
+    elif action == "off":
+        if shell_coprocess is not None:
+            shell_coprocess.close()
+            shell_coprocess = None
+        print("🐚 unix commands now start a new bash each time.")
+    elif action == "status":
+        if shell_coprocess is None:
+            print("🐚 coproc is off (one bash per unix command).")
+        else:
+            state = f"pid {shell_coprocess.proc.pid}" if shell_coprocess.alive else "not started"
+            print(f"🐚 coproc is on ({state}, {shell_coprocess.commands} commands run, "
+                  f"last exit status {shell_coprocess.last_status}).")
+    else:
+        print("Usage: coproc [on|off|status]")
+
+
+@register_command("fg")
+def fg_cmd(args):
+    """
+    Show a background job's output, following it live until it finishes.
+    Usage:
+      fg [%]<id>     (Ctrl+C stops following; the job keeps running)
+      fg             → the most recent job
+    """
+    if not job_manager.jobs:
+        print("⚠️ No background jobs.")
+        return
+    job = job_manager.get(args[0]) if args else job_manager.jobs[max(job_manager.jobs)]
+    if job is None:
+        print(f"❌ No such job: {args[0]}")
+        return
+
+    print(f"[%{job.id}] {job.command}")
+    seen = 0
+    try:
+        while True:
+            with job.output.cond:
+                if job.active and job.output.total == seen:
+                    job.output.cond.wait(0.2)
+            lines, dropped, seen = job.output.lines_since(seen)
+            if dropped:
+                print(f"... ({dropped} earlier line(s) dropped)")
+            for line in lines:
+                print(line)
+            if not job.active and job.output.total == seen:
+                break
+    except KeyboardInterrupt:
+        print(f"\n↩️ Stopped following %{job.id}; it is still {_job_state(job).lower()}.")
+        return
+
+    job.notified = True
+    print(f"[%{job.id}] {_job_state(job)}")
+    job_manager.forget(job)
+
+
+@register_command("wait")
+def wait_cmd(args):
+    """
+    Wait for background jobs to finish.
+    Usage:
+      wait            → wait for every background job
+      wait [%]<id>    → wait for one job
+    """
+    if args:
+        job = job_manager.get(args[0])
+        if job is None:
+            print(f"❌ No such job: {args[0]}")
+            return
+        jobs = [job]
+    else:
+        jobs = [job for job in list(job_manager.jobs.values()) if job.active]
+
+    try:
+        for job in jobs:
+            while job.active:
+                time.sleep(0.05)
+    except KeyboardInterrupt:
+        print("\n↩️ Stopped waiting.")
+        return
+    report_finished_jobs()
+
+
+def _kill_job(ref):
+    job = job_manager.get(ref)
+    if job is None:
+        print(f"❌ No such job: {ref}")
+        return
+    if not job.active:
+        print(f"[%{job.id}] already {_job_state(job).lower()}.")
+        return
+    job_manager.kill(job)
+    if job.status == "killed":
+        print(f"[%{job.id}] Killed (never started): {job.command}")
+    else:
+        print(f"[%{job.id}] Kill requested: {job.command} (stops at its next cancel check or output)")
+
+
+# =======================================
+# Instrumentation
+# =======================================
+# With `stats on` (or PYNIX_STATS=1) every dispatched command line is timed:
+# wall time, CPU time (dispatching thread + child processes), growth of the
+# process's peak RSS, and whether it raised. Samples go into fixed-size
+# log-bucket histograms per command name, so memory stays constant however
+# long the session runs. When off, dispatch pays a single attribute check.
+
+STATS_MAX_COMMANDS = 256    # further names are lumped into "(other)"
+STATS_BUCKETS = 128         # 4 buckets per octave from 1 µs; the last one holds ≥ ~70 min
+
+
+class _Histogram:
+    """Log-scale latency histogram (~19% bucket width) with exact count/total/max."""
+    __slots__ = ("counts", "n", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * STATS_BUCKETS
+        self.n = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        us = seconds * 1e6
+        i = int(math.log2(us) * 4) if us > 1 else 0
+        self.counts[min(i, STATS_BUCKETS - 1)] += 1
+        self.n += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, p):
+        if not self.n:
+            return 0.0
+        rank = max(1, math.ceil(self.n * p / 100))
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                # geometric middle of the bucket, never above the largest sample
+                return min(2 ** ((i + 0.5) / 4) / 1e6, self.max)
+        return self.max
+
+
+class _CommandStats:
+    __slots__ = ("wall", "cpu", "errors", "rss_max_kb")
+
+    def __init__(self):
+        self.wall = _Histogram()
+        self.cpu = _Histogram()
+        self.errors = 0
+        self.rss_max_kb = 0
+
+
+class CommandStats:
+    """Per-command wall/CPU/RSS/error statistics, recorded by measure()."""
+
+    def __init__(self):
+        self.enabled = os.environ.get("PYNIX_STATS", "") not in ("", "0")
+        self.commands = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        try:
+            import resource
+            self._resource = resource
+        except ImportError:
+            self._resource = None   # Windows: no peak-RSS figure
+
+    def _peak_rss_kb(self):
+        if self._resource is None:
+            return 0
+        peak = self._resource.getrusage(self._resource.RUSAGE_SELF).ru_maxrss
+        return peak // 1024 if sys.platform == "darwin" else peak   # macOS reports bytes
+
+    def note_error(self):
+        """Mark the command being measured on this thread as failed (for errors caught in dispatch)."""
+        self._local.failed = True
+
+    def measure(self, name):
+        """Context manager timing one command; yields a dict filled in on exit."""
+        import contextlib
+
+        @contextlib.contextmanager
+        def _measure():
+            outer_failed = getattr(self._local, "failed", False)
+            self._local.failed = False
+            sample = {"command": name}
+            t0, c0, k0 = time.perf_counter(), time.thread_time(), os.times()
+            r0 = self._peak_rss_kb()
+            try:
+                yield sample
+            except BaseException:
+                self._local.failed = True
+                raise
+            finally:
+                k1 = os.times()
+                sample["wall"] = time.perf_counter() - t0
+                sample["cpu"] = (time.thread_time() - c0
+                                 + (k1.children_user - k0.children_user)
+                                 + (k1.children_system - k0.children_system))
+                sample["rss_kb"] = self._peak_rss_kb() - r0
+                sample["failed"] = failed = self._local.failed
+                self._local.failed = outer_failed or failed
+                if self.enabled:
+                    self.record(sample)
+
+        return _measure()
+
+    def record(self, sample):
+        with self._lock:
+            entry = self.commands.get(sample["command"])
+            if entry is None:
+                key = sample["command"] if len(self.commands) < STATS_MAX_COMMANDS else "(other)"
+                entry = self.commands.setdefault(key, _CommandStats())
+            entry.wall.add(sample["wall"])
+            entry.cpu.add(sample["cpu"])
+            entry.errors += sample["failed"]
+            entry.rss_max_kb = max(entry.rss_max_kb, sample["rss_kb"])
+
+    def reset(self):
+        with self._lock:
+            self.commands = {}
+
+    def records(self, top=None):
+        """One dict per command, slowest (by total wall time) first."""
+        with self._lock:
+            items = sorted(self.commands.items(), key=lambda kv: kv[1].wall.total, reverse=True)
+        for name, entry in items[:top]:
+            wall = entry.wall
+            yield {
+                "command": name,
+                "runs": wall.n,
+                "errors": entry.errors,
+                "total_s": round(wall.total, 6),
+                "p50_s": round(wall.percentile(50), 6),
+                "p95_s": round(wall.percentile(95), 6),
+                "p99_s": round(wall.percentile(99), 6),
+                "max_s": round(wall.max, 6),
+                "cpu_avg_s": round(entry.cpu.total / wall.n, 6),
+                "rss_peak_delta_kb": entry.rss_max_kb,
+            }
+
+
+command_stats = CommandStats()
+
+
+def _fmt_seconds(seconds):
+    return f"{seconds * 1000:.1f}ms" if seconds < 1 else f"{seconds:.2f}s"
+
+
+@register_command("stats")
+def stats_cmd(args):
+    """
+    Per-command timing statistics (wall p50/p95/p99, CPU, peak RSS growth, errors).
+    Usage:
+      stats on | off      → start / stop recording (PYNIX_STATS=1 starts it at launch)
+      stats reset         → forget everything recorded so far
+      stats [--top N]     → report, slowest total first
+      stats --json / --csv
+    """
+    fmt = pop_output_format(args)
+    if args and args[0] in ("on", "off"):
+        command_stats.enabled = args[0] == "on"
+        print(f"📊 Command statistics {'enabled' if command_stats.enabled else 'disabled'}.")
+        return
+    if args and args[0] == "reset":
+        command_stats.reset()
+        print("📊 Command statistics cleared.")
+        return
+
+    top = None
+    if "--top" in args:
+        i = args.index("--top")
+        if i + 1 >= len(args) or not args[i + 1].isdigit():
+            print("Usage: stats [--top N] [--json|--csv]")
+            return
+        top = int(args[i + 1])
+
+    if not command_stats.commands:
+        state = "on" if command_stats.enabled else "off — 'stats on' to start recording"
+        print(f"📊 No command statistics yet (instrumentation is {state}).")
+        return
+
+    yield from render_records(
+        command_stats.records(top), fmt,
+        header=(f"{'Command':<20} {'Runs':>6} {'Err':>4} {'p50':>9} {'p95':>9} {'p99':>9} "
+                f"{'Max':>9} {'CPU avg':>9} {'RSS+':>9}", "-" * 92),
+        row=lambda r: (f"{r['command'][:20]:<20} {r['runs']:>6} {r['errors']:>4} "
+                       f"{_fmt_seconds(r['p50_s']):>9} {_fmt_seconds(r['p95_s']):>9} "
+                       f"{_fmt_seconds(r['p99_s']):>9} {_fmt_seconds(r['max_s']):>9} "
+                       f"{_fmt_seconds(r['cpu_avg_s']):>9} {str(r['rss_peak_delta_kb']) + 'K':>9}"),
+    )
+
+
+@register_command("time")
+def time_cmd(args):
+    """
+    Run a command line and report how long it took.
+    Usage:
+      time <command> [args...]      (pipelines work: time cat big.log | grep x)
+    """
+    line = " ".join(args)
+    if not line:
+        print("Usage: time <command> [args...]")
+        return
+    stages = expand_stages(line)
+    with command_stats.measure(_stats_name(stages)) as sample:
+        dispatch_stages(stages)
+    rss = f"  rss +{sample['rss_kb']}K" if command_stats._resource else ""
+    print(f"\n⏱️ real {_fmt_seconds(sample['wall'])}  cpu {_fmt_seconds(sample['cpu'])}{rss}")
+
+
+PROFILE_TOP = 25
+
+
+def _plugin_source_files():
+    """Source paths of the plugin modules currently loaded through csync."""
+    return {os.path.abspath(m.__file__) for name, m in list(sys.modules.items())
+            if name.startswith("cmd_") and getattr(m, "__file__", None)}
+
+
+def _short_path(filename, plugin_files=()):
+    """Shorten a source path for reports; PyTerm and plugin files keep a recognisable path."""
+    if filename.startswith("<"):
+        return filename   # <frozen os>, <string>, ...
+    path = os.path.abspath(filename)
+    if path.startswith(BASE_DIR + os.sep):
+        return os.path.relpath(path, BASE_DIR)
+    if path in plugin_files:
+        return path
+    return os.path.join(os.path.basename(os.path.dirname(path)), os.path.basename(path))
+
+
+def _profile_label(func, plugin_files=()):
+    """pstats-style file:line(function) with a shortened path."""
+    filename, lineno, name = func
+    if filename == "~":
+        return name   # built-in, e.g. <built-in method posix.scandir>
+    return f"{_short_path(filename, plugin_files)}:{lineno}({name})".replace(";", ",")
+
+
+def _collapsed_stacks(stats, label, min_fraction=1e-4):
+    """
+    Rebuild collapsed stacks ("a;b;c <µs>") from cProfile's caller → callee graph.
+    cProfile keeps no full stacks, so time on an edge is split across the paths
+    leading to the caller in proportion to their share of it (like flameprof).
+    """
+    callees = {}
+    total = 0.0
+    for func, (_, _, tt, _, callers) in stats.items():
+        total += tt
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+    floor = total * min_fraction
+    out = {}
+
+    def walk(func, path, labels, share):
+        tt = stats[func][2]
+        labels = labels + (label(func),)
+        self_us = int(tt * share * 1e6)
+        if self_us:
+            key = ";".join(labels)
+            out[key] = out.get(key, 0) + self_us
+        if len(labels) >= 128:
+            return
+        for callee, edge_ct in callees.get(func, ()):
+            callee_ct = stats[callee][3]
+            if callee in path or callee_ct <= 0 or edge_ct * share < floor:
+                continue   # recursion, or too little time to matter
+            walk(callee, path | {callee}, labels, share * edge_ct / callee_ct)
+
+    for func, value in stats.items():
+        if not value[4]:   # no callers: a root
+            walk(func, {func}, (), 1.0)
+    return out
+
+
+@register_command("profile")
+def profile_cmd(args):
+    """
+    Run a command line under cProfile and show where the time went.
+    Usage:
+      profile [-n N] [-s cumulative|tottime|calls] [-o file.prof] [--collapsed file.txt] <command> [args...]
+        -n N         → rows to show (default 25)
+        -s key       → sort key (default cumulative)
+        -o file      → save raw pstats (python -m pstats file, snakeviz, ...)
+        --collapsed  → save collapsed stacks for flamegraph.pl / speedscope
+    Only the calling thread is profiled; plugin functions are listed under their source file.
+    """
+    import cProfile
+    import pstats
+
+    top, sort_key, pstats_path, collapsed_path = PROFILE_TOP, "cumulative", None, None
+    sort_keys = {"cumulative": 3, "cumtime": 3, "tottime": 2, "time": 2, "calls": 1, "ncalls": 1}
+    while args and args[0].startswith("-"):
+        flag = args.pop(0)
+        if not args:
+            args = [flag]   # let the usage message below fire
+            break
+        value = args.pop(0)
+        if flag == "-n" and value.isdigit():
+            top = int(value)
+        elif flag == "-s" and value in sort_keys:
+            sort_key = value
+        elif flag == "-o":
+            pstats_path = value
+        elif flag == "--collapsed":
+            collapsed_path = value
+        else:
+            print(f"⚠️ Unknown profile option: {flag} {value}")
+            return
+    line = " ".join(args)
+    if not line or line.startswith("-"):
+        print("Usage: profile [-n N] [-s cumulative|tottime|calls] [-o file.prof] [--collapsed file.txt] <command>")
+        return
+
+    stages = expand_stages(line)
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError as e:   # another profiler is already running
+        print(f"⚠️ Cannot profile: {e}")
+        return
+    t0 = time.perf_counter()
+    try:
+        dispatch_stages(stages)
+    finally:
+        profiler.disable()
+        elapsed = time.perf_counter() - t0
+
+    stats = {func: value for func, value in pstats.Stats(profiler).stats.items()
+             if "_lsprof.Profiler" not in func[2]}
+    if not stats:
+        print("⚠️ Nothing was recorded.")
+        return
+    plugin_files = _plugin_source_files()
+    label = lambda func: _profile_label(func, plugin_files)
+
+    print(f"\n🔬 Profile of '{line}' — {_fmt_seconds(elapsed)} wall, "
+          f"{sum(v[1] for v in stats.values())} function calls")
+    col = sort_keys[sort_key]
+    rows = sorted(stats.items(), key=lambda kv: kv[1][col], reverse=True)[:top]
+    print(f"{'ncalls':>10} {'tottime':>9} {'cumtime':>9}  function")
+    print("-" * 80)
+    for func, (cc, nc, tt, ct, _) in rows:
+        calls = f"{nc}/{cc}" if nc != cc else str(nc)
+        print(f"{calls:>10} {_fmt_seconds(tt):>9} {_fmt_seconds(ct):>9}  {label(func)}")
+
+    # Self time per source file: shows how much was spent inside plugin code
+    per_file = {}
+    for (filename, _, _), (_, _, tt, _, _) in stats.items():
+        key = filename if filename.startswith("<") else "(built-ins)" if filename == "~" else os.path.abspath(filename)
+        per_file[key] = per_file.get(key, 0.0) + tt
+    print("\nSelf time by file:")
+    for path, tt in sorted(per_file.items(), key=lambda kv: kv[1], reverse=True)[:8]:
+        mark = "🔌" if path in plugin_files else "  "
+        name = path if path == "(built-ins)" else _short_path(path, plugin_files)
+        print(f"  {mark} {_fmt_seconds(tt):>9}  {name}")
+
+    if pstats_path:
+        try:
+            profiler.dump_stats(pstats_path)
+            print(f"💾 pstats written to {pstats_path}")
+        except OSError as e:
+            print(f"⚠️ Could not write {pstats_path}: {e}")
+    if collapsed_path:
+        try:
+            stacks = _collapsed_stacks(stats, label)
+            with open(collapsed_path, "w", encoding="utf-8") as f:
+                for stack, us in sorted(stacks.items()):
+                    f.write(f"{stack} {us}\n")
+            print(f"🔥 {len(stacks)} collapsed stacks written to {collapsed_path} (µs; flamegraph.pl {collapsed_path} > flame.svg)")
+        except OSError as e:
+            print(f"⚠️ Could not write {collapsed_path}: {e}")
+
+
+MEMPROF_TOP = 15
+
+
+def _memprof_watch(stop, snapshots, filters, floor):
+    """Snapshot tracemalloc each time traced memory climbs 10% past the last snapshot (the peak report)."""
+    import tracemalloc
+    best = floor
+    while not stop.wait(0.02):
+        current = tracemalloc.get_traced_memory()[0]
+        if current > best * 1.1:
+            snapshots[:] = [tracemalloc.take_snapshot().filter_traces(filters), current]
+            best = max(current, tracemalloc.get_traced_memory()[0])
+
+
+@register_command("memprof")
+def memprof_cmd(args):
+    """
+    Run a command line under tracemalloc and report memory use.
+    Usage:
+      memprof [-n N] [--by-file] [--end] <command> [args...]
+        -n N        → allocation sites to show (default 15)
+        --by-file   → group sites by file instead of file:line
+        --end       → show what is still held afterwards instead of the sites live at the peak
+                      (no snapshots while the command runs: faster, but misses memory freed at the end)
+    By default memory is snapshotted while the command runs, each time it climbs 10% past
+    the last snapshot, and the sites are those live in the highest snapshot.
+    """
+    import tracemalloc
+
+    top, key_type, at_peak = MEMPROF_TOP, "lineno", True
+    while args and args[0].startswith("-"):
+        flag = args.pop(0)
+        if flag == "--by-file":
+            key_type = "filename"
+        elif flag == "--peak":
+            at_peak = True      # the default; kept for older scripts
+        elif flag == "--end":
+            at_peak = False
+        elif flag == "-n" and args and args[0].isdigit():
+            top = int(args.pop(0))
+        else:
+            args = ["-"]
+            break
+    line = " ".join(args)
+    if not line or line.startswith("-"):
+        print("Usage: memprof [-n N] [--by-file] [--end] <command> [args...]")
+        return
+
+    stages = expand_stages(line)
+    filters = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ]
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    before = tracemalloc.take_snapshot().filter_traces(filters)
+    baseline = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+
+    stop, peak_snapshots, watcher = threading.Event(), [], None
+    if at_peak:
+        watcher = threading.Thread(target=_memprof_watch, name="pynix-memprof",
+                                   args=(stop, peak_snapshots, filters, baseline), daemon=True)
+        watcher.start()
+    t0 = time.perf_counter()
+    try:
+        dispatch_stages(stages)
+    finally:
+        elapsed = time.perf_counter() - t0
+        stop.set()
+        if watcher:
+            watcher.join()
+        current, peak = tracemalloc.get_traced_memory()
+        if peak_snapshots and current >= peak_snapshots[1]:
+            peak_snapshots = []     # the command ended at its high point: the final state is the peak
+        after = peak_snapshots[0] if peak_snapshots else tracemalloc.take_snapshot().filter_traces(filters)
+        if not was_tracing:
+            tracemalloc.stop()
+
+    print(f"\n🧠 Memory profile of '{line}' — {_fmt_seconds(elapsed)} wall")
+    print(f"  peak:      +{human_readable(max(0, peak - baseline))} above the starting point")
+    retained = current - baseline
+    sign = "+" if retained >= 0 else "-"
+    print(f"  retained:  {sign}{human_readable(abs(retained))} still allocated afterwards")
+
+    diffs = [d for d in after.compare_to(before, key_type) if d.size_diff > 0][:top]
+    what = "live at the peak" if at_peak else "still held afterwards"
+    if at_peak and not peak_snapshots:
+        print("  (memory was highest at the end; the sites below are what is still held)")
+    if not diffs:
+        print(f"\nNo allocation sites {what}.")
+        return
+    plugin_files = _plugin_source_files()
+    print(f"\nTop allocation sites {what} (by {'file' if key_type == 'filename' else 'line'}):")
+    print(f"{'size':>12} {'blocks':>9}  site")
+    print("-" * 80)
+    for d in diffs:
+        frame = d.traceback[0]
+        site = _short_path(frame.filename, plugin_files)
+        if key_type == "lineno":
+            site += f":{frame.lineno}"
+        mark = "🔌 " if os.path.abspath(frame.filename) in plugin_files else ""
+        print(f"{human_readable(d.size_diff):>12} {d.count_diff:>9}  {mark}{site}")
+
+
+SAMPLER_DEFAULT_HZ = 50
+SAMPLER_MAX_STACKS = 50000   # distinct stacks kept; the rest are counted under "(other)"
+SAMPLER_MAX_DEPTH = 128
+
+
+class StackSampler:
+    """
+    Session-wide sampling profiler: a daemon thread reads sys._current_frames()
+    at a fixed rate and counts each thread's stack, keyed by thread name.
+    No tracing hooks are installed, so the cost is one stack walk per thread per tick.
+    """
+
+    def __init__(self):
+        self.stacks = {}
+        self.samples = 0
+        self.hz = SAMPLER_DEFAULT_HZ
+        self.started = None
+        self.elapsed = 0.0
+        self._labels = {}     # code object -> "func (file:line)"
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, hz=SAMPLER_DEFAULT_HZ):
+        if self.running:
+            return False
+        self.hz = hz
+        self._stop.clear()
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="pynix-sampler", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        if not self.running:
+            return False
+        self._stop.set()
+        self._thread.join()
+        self.elapsed += time.perf_counter() - self.started
+        return True
+
+    def reset(self):
+        with self._lock:
+            self.stacks = {}
+            self.samples = 0
+            self.elapsed = 0.0
+            if self.running:
+                self.started = time.perf_counter()
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})".replace(";", ",")
+            self._labels[code] = label
+        return label
+
+    def _run(self):
+        interval = 1.0 / self.hz
+        me = threading.get_ident()
+        while not self._stop.wait(interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            frames = sys._current_frames()
+            with self._lock:
+                self.samples += 1
+                for ident, frame in frames.items():
+                    if ident == me:
+                        continue
+                    labels = []
+                    while frame is not None and len(labels) < SAMPLER_MAX_DEPTH:
+                        labels.append(self._label(frame.f_code))
+                        frame = frame.f_back
+                    labels.append(names.get(ident, f"thread-{ident}"))
+                    key = ";".join(reversed(labels))
+                    if key not in self.stacks and len(self.stacks) >= SAMPLER_MAX_STACKS:
+                        key = labels[-1] + ";(other)"
+                    self.stacks[key] = self.stacks.get(key, 0) + 1
+            del frames
+
+    def collapsed(self):
+        """Collapsed-stack lines ("thread;outer;...;inner count"), most frequent first."""
+        with self._lock:
+            items = sorted(self.stacks.items(), key=lambda kv: kv[1], reverse=True)
+        return [f"{stack} {count}" for stack, count in items]
+
+    def seconds(self):
+        return self.elapsed + (time.perf_counter() - self.started if self.running else 0.0)
+
+
+stack_sampler = StackSampler()
+
+
+@register_command("sampler")
+def sampler_cmd(args):
+    """
+    Sample every thread's stack in the background (loops, watch, jobs, servers, ...).
+    Usage:
+      sampler start [-r HZ]        → start sampling (default 50 per second)
+      sampler stop                 → stop (samples are kept)
+      sampler report [-n N] [-o file]
+                                   → collapsed stacks, most frequent first (-o writes all of them,
+                                     ready for flamegraph.pl or speedscope)
+      sampler reset                → drop collected samples
+      sampler                      → status
+    """
+    action = args[0].lower() if args else "status"
+    rest = args[1:]
+
+    if action == "start":
+        hz = SAMPLER_DEFAULT_HZ
+        if rest[:1] == ["-r"]:
+            try:
+                hz = float(rest[1])
+                if not 0 < hz <= 1000:
+                    raise ValueError
+            except (IndexError, ValueError):
+                print("Usage: sampler start [-r HZ]   (0 < HZ <= 1000)")
+                return
+        if stack_sampler.start(hz):
+            print(f"🩺 Sampler started at {hz:g} Hz.")
+        else:
+            print("⚠️ Sampler is already running.")
+    elif action == "stop":
+        if stack_sampler.stop():
+            print(f"🩺 Sampler stopped ({stack_sampler.samples} samples over {stack_sampler.seconds():.1f}s).")
+        else:
+            print("⚠️ Sampler is not running.")
+    elif action == "reset":
+        stack_sampler.reset()
+        print("🩺 Samples cleared.")
+    elif action == "report":
+        top, out_path = 30, None
+        while rest:
+            flag = rest.pop(0)
+            if flag == "-n" and rest and rest[0].isdigit():
+                top = int(rest.pop(0))
+            elif flag == "-o" and rest:
+                out_path = rest.pop(0)
+            else:
+                print("Usage: sampler report [-n N] [-o file]")
+                return
+        lines = stack_sampler.collapsed()
+        if not lines:
+            print("🩺 No samples yet ('sampler start' first).")
+            return
+        if out_path:
+            try:
+                with open(out_path, "w", encoding="utf-8") as f:
+                    f.write("\n".join(lines) + "\n")
+                print(f"🔥 {len(lines)} collapsed stacks written to {out_path}")
+            except OSError as e:
+                print(f"⚠️ Could not write {out_path}: {e}")
+            return
+        print(f"🩺 {stack_sampler.samples} samples over {stack_sampler.seconds():.1f}s "
+              f"at {stack_sampler.hz:g} Hz — top {min(top, len(lines))} of {len(lines)} stacks:")
+        yield from lines[:top]
+    elif action == "status":
+        state = "running" if stack_sampler.running else "stopped"
+        print(f"🩺 Sampler {state}: {stack_sampler.samples} samples, "
+              f"{len(stack_sampler.stacks)} distinct stacks, {stack_sampler.seconds():.1f}s sampled.")
+    else:
+        print("Usage: sampler start [-r HZ] | stop | report [-n N] [-o file] | reset")
+
+
+# =======================================
+# Command Execution
+# =======================================
+
+def execute_command(cmd_line):
+    """Execute a command string and record it in command history."""
+    if not cmd_line.strip():
+        return
+
+    # --- Handle !number history recall ---
+    if cmd_line.strip().startswith("!"):
+        try:
+            number = int(cmd_line.strip()[1:])
+            recalled = command_history.get(number)
+            if recalled is not None:
+                print(f"🔁 Re-running command #{number}: {recalled}")
+                execute_command(recalled)
+            else:
+                print(f"⚠️ No command #{number} in history.")
+        except ValueError:
+            print("Usage: !<number>  (example: !5)")
+        return
+
+    # --- Record command in history (Ctrl+R's own "history -r" is not worth keeping) ---
+    if cmd_line.split() not in (["history", "-r"], ["history", "--reverse"]):
+        command_history.append(cmd_line.strip())
+
+    # --- Background jobs: cmd & ---
+    line = cmd_line.strip()
+    if line.endswith("&") and not line.endswith("&&"):
+        line = line[:-1].strip()
+        if not line:
+            print("Usage: <command> &")
+            return
+        job = job_manager.submit(line)
+        print(f"[%{job.id}] {line}")
+        return
+
+    run_command_line(line)
+
+
+_exec_state = threading.local()
+
+
+def set_exit_status(code):
+    """Record the exit status of the command line running on this thread (0 = success)."""
+    _exec_state.status = code
+
+
+def last_exit_status():
+    """Exit status of the last command line dispatched on this thread."""
+    return getattr(_exec_state, "status", 0)
+
+
+# =======================================
+# Cancellation
+# =======================================
+# Every top-level command line gets a CancelToken, reachable from the running
+# thread through current_cancel_token(). Ctrl+C (or 'kill %<id>' for a job)
+# cancels it: directory walkers and long I/O loops poll the token, so their
+# worker threads stop within one directory/chunk and the prompt comes back.
+
+class CommandCancelled(KeyboardInterrupt):
+    """Raised by CancelToken.check() once the running command line was cancelled."""
+
+
+class CancelToken:
+    """Cooperative cancellation flag shared by a command line and the threads it starts."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        self._event.set()
+
+    def check(self):
+        """Raise CommandCancelled if the command line was cancelled."""
+        if self._event.is_set():
+            raise CommandCancelled()
+
+    def wait(self, timeout):
+        """Sleep up to `timeout` seconds, waking early on cancel; True if cancelled."""
+        return self._event.wait(timeout)
+
+
+_NEVER_CANCELLED = CancelToken()
+
+
+def current_cancel_token():
+    """
+    The CancelToken of the command line running on this thread. Worker threads
+    must capture it before they are started: the token is thread-local.
+    """
+    return getattr(_exec_state, "cancel", None) or _NEVER_CANCELLED
+
+
+def cancellable(items, every=4096):
+    """Yield from `items`, checking the current CancelToken every `every` items (long I/O loops)."""
+    cancel = current_cancel_token()
+    for i, item in enumerate(items):
+        if not i % every:
+            cancel.check()
+        yield item
+
+
+def _on_sigint(signum, frame):
+    """Ctrl+C: cancel the foreground command line (and its threads), then interrupt it."""
+    token = getattr(_exec_state, "cancel", None)
+    if token is None:
+        raise KeyboardInterrupt()   # at the prompt: just start a fresh line
+    token.cancel()
+    raise CommandCancelled()
+
+
+def expand_stages(cmd_line):
+    """Split a command line into pipeline stages, expanding a leading alias in each."""
+    return [part for stage in split_pipeline(cmd_line.strip())
+            for part in split_pipeline(expand_alias(stage))]
+
+
+def _stats_name(stages):
+    return " | ".join(stage.split()[0] for stage in stages if stage.strip()) or "(empty)"
+
+
+def run_command_line(cmd_line, cancel=None):
+    """
+    Run a command line (pipeline, registered command or OS passthrough) without recording history.
+    The outermost call on a thread owns the line's CancelToken (`cancel`, or a new one);
+    nested calls (time, repeat, ...) share it and leave CommandCancelled to the owner.
+    """
+    if not cmd_line.strip():
+        return
+
+    token = getattr(_exec_state, "cancel", None)
+    if token is not None:
+        token.check()
+        _run_stages(expand_stages(cmd_line))
+        return
+
+    token = _exec_state.cancel = cancel or CancelToken()
+    try:
+        token.check()
+        _run_stages(expand_stages(cmd_line))
+    except CommandCancelled:
+        token.cancel()
+        set_exit_status(130)
+        print("\n⛔ Cancelled.")
+    finally:
+        _exec_state.cancel = None
+
+
+def _run_stages(stages):
+    if command_stats.enabled:
+        with command_stats.measure(_stats_name(stages)):
+            dispatch_stages(stages)
+    else:
+        dispatch_stages(stages)
+
+
+def dispatch_stages(stages):
+    """
+    Run already alias-expanded stages: an in-process pipeline, a registered command or a passthrough.
+    The outcome is left in last_exit_status(): 0, 1 for an error, 127 for an unknown
+    command, or the OS command's own exit code.
+    """
+    set_exit_status(0)
+    # --- In-process pipelines: cmd1 | cmd2 ---
+    if len(stages) > 1:
+        run_pipeline(stages)
+        return
+    cmd_line = stages[0]
+    if not cmd_line.strip():
+        return
+
+    parts = cmd_line.strip().split()
+    cmd, args = parts[0], parts[1:]
+
+    # Custom commands
+    if cmd in registered_commands:
+        try:
+            emit_output(registered_commands[cmd](args))
+        except Exception as e:
+            command_stats.note_error()
+            set_exit_status(1)
+            print(f"Error running {cmd}: {e}")
+        return
+
+    # ============================
+    # Platform-specific prefixes
+    # ============================
+
+    # --- Windows commands ---
+    if cmd == "win":
+        if os.name != "nt":
+            set_exit_status(1)
+            print("⚠️ Windows commands are not supported on this system.")
+            return
+        if not args:
+            print("Usage: win <command>")
+            return
+
+        # Handle 'win cd'
+        if args[0].lower() == "cd":
+            if len(args) > 1:
+                try:
+                    os.chdir(args[1])
+                except Exception as e:
+                    print(f"Error changing directory: {e}")
+            else:
+                print(os.getcwd())
+            return
+
+        win_cmd_line = " ".join(args)
+        try:
+            set_exit_status(run_passthrough(["cmd", "/c", win_cmd_line]))
+        except Exception as e:
+            set_exit_status(1)
+            print(f"Windows command failed: {e}")
+        return
+
+
+    # --- macOS commands ---
+    if cmd == "mac":
+        if sys.platform != "darwin":
+            set_exit_status(1)
+            print("⚠️ macOS commands are only available on macOS.")
+            return
+        if not args:
+            print("Usage: mac <command>")
+            return
 
         if args[0].lower() == "cd":
             if len(args) > 1:
@@ -6184,8 +10116,9 @@ def execute_command(cmd_line):
 
         mac_cmd_line = " ".join(args)
         try:
-            subprocess.call(["zsh", "-c", mac_cmd_line])
+            set_exit_status(run_passthrough(["zsh", "-c", mac_cmd_line]))
         except Exception as e:
+            set_exit_status(1)
             print(f"macOS command failed: {e}")
         return
 
@@ -6193,13 +10126,15 @@ def execute_command(cmd_line):
     # --- Unix/Linux commands ---
     if cmd == "unix":
         if sys.platform == "darwin" or os.name == "nt":
+            set_exit_status(1)
             print("⚠️ Unix/Linux commands are only available on Linux or similar systems.")
             return
         if not args:
             print("Usage: unix <command>")
             return
 
-        if args[0].lower() == "cd":
+        # (with coproc on, `cd x && cmd` goes to the shell, which reports its cwd back)
+        if args[0].lower() == "cd" and (shell_coprocess is None or len(args) <= 2):
             if len(args) > 1:
                 try:
                     os.chdir(args[1])
@@ -6211,8 +10146,13 @@ def execute_command(cmd_line):
 
         unix_cmd_line = " ".join(args)
         try:
-            subprocess.call(["bash", "-c", unix_cmd_line])
+            coproc = shell_coprocess
+            status = coproc.run(unix_cmd_line) if coproc is not None else None
+            if status is None:
+                status = run_passthrough(["bash", "-c", unix_cmd_line])
+            set_exit_status(status)
         except Exception as e:
+            set_exit_status(1)
             print(f"Unix command failed: {e}")
         return
 
@@ -6220,6 +10160,7 @@ def execute_command(cmd_line):
     # ============================
     # Unknown command fallback
     # ============================
+    set_exit_status(127)
     try:
         if os.name == "nt":
             print(f"Unknown command: {cmd}. Use 'win {cmd}' for Windows commands or 'help' for help.")
@@ -6235,45 +10176,489 @@ def execute_command(cmd_line):
 # Command Handler (internal execution)
 # =======================================
 
-def handle_command(command_line: str):
+def handle_command(command_line: str, record=True):
     """
     Run a command string internally, same as typing it into PyTerm.
+    Pass record=False to keep it out of the (persistent) history.
     Example:
         handle_command("explain")
         handle_command("cd Desktop")
         handle_command("win dir")
     """
     print(f"\n[Auto-Run] {command_line}")
-    execute_command(command_line)
+    if record:
+        execute_command(command_line)
+    else:
+        run_command_line(command_line)
     
 
 # =======================================
 # Main Loop
 # =======================================
 
+def print_startup_report():
+    """Print the per-phase startup breakdown and check it against the budget."""
+    total_ms = (time.perf_counter() - _STARTUP_T0) * 1000
+
+    print("\n⏱️ PyTerm startup report (time to first prompt)")
+    print("-" * 46)
+    for phase, secs in _startup_phases:
+        print(f"  {phase:<24} {secs * 1000:10.1f} ms")
+    print("-" * 46)
+    print(f"  {'total':<24} {total_ms:10.1f} ms")
+
+    if _lazy_import_times:
+        print("\n📦 Modules imported on demand during startup:")
+        for name, secs in sorted(_lazy_import_times.items(), key=lambda x: -x[1]):
+            print(f"  {name:<24} {secs * 1000:10.1f} ms")
+
+    deferred = sorted(
+        value._lazy_name for value in globals().values()
+        if isinstance(value, _LazyModule) and value._lazy_module is None
+    )
+    if deferred:
+        print(f"\n💤 Still deferred: {', '.join(deferred)}")
+
+    within = total_ms <= STARTUP_BUDGET_MS
+    status = "✅ within" if within else "⚠️ over"
+    print(f"\n{status} budget of {STARTUP_BUDGET_MS} ms")
+    return within
+
+
+# =======================================
+# Batch mode
+# =======================================
+# `pyterm -c "cmd"`, `pyterm script.pyn` and `pyterm -` (stdin) run command
+# lines without the banner, clear, history, readline or autoexec, and exit
+# with the status of the last line (first failing line with --jobs or -e).
+
+BATCH_USAGE = ("usage: pyterm [-c COMMANDS]... [SCRIPT | -] [-j N] [-e]\n"
+               "       pyterm --daemon [--socket PATH] [--workers N]")
+
+
+def parse_batch_args(argv):
+    """Return a batch request from the command line, or None for the interactive shell."""
+    request = {"commands": [], "script": None, "jobs": 1, "errexit": False,
+               "daemon": False, "socket": None, "workers": DAEMON_WORKERS}
+    args = list(argv)
+    while args:
+        arg = args.pop(0)
+        if arg == "-c":
+            if not args:
+                raise ValueError("-c needs a command")
+            request["commands"].append(args.pop(0))
+        elif arg in ("-j", "--jobs") or arg.startswith("--jobs="):
+            value = arg.split("=", 1)[1] if "=" in arg else (args.pop(0) if args else "")
+            if not value.isdigit() or int(value) < 1:
+                raise ValueError(f"{arg} needs a positive number")
+            request["jobs"] = int(value)
+        elif arg == "-e":
+            request["errexit"] = True
+        elif arg == "--daemon":
+            request["daemon"] = True
+        elif arg == "--socket":
+            if not args:
+                raise ValueError("--socket needs a path")
+            request["socket"] = args.pop(0)
+        elif arg == "--workers":
+            value = args.pop(0) if args else ""
+            if not value.isdigit() or int(value) < 1:
+                raise ValueError("--workers needs a positive number")
+            request["workers"] = int(value)
+        elif arg == "--startup-report":
+            continue   # interactive option, handled by main()
+        elif arg == "-" or not arg.startswith("-"):
+            if request["script"] is not None:
+                raise ValueError("only one script can be given")
+            request["script"] = arg
+        else:
+            raise ValueError(f"unknown option {arg}")
+    if request["daemon"]:
+        if request["commands"] or request["script"] is not None:
+            raise ValueError("--daemon does not take commands")
+        return request
+    if not request["commands"] and request["script"] is None:
+        if request["jobs"] != 1 or request["errexit"]:
+            raise ValueError("-j/-e need -c, a script or - (stdin)")
+        return None
+    return request
+
+
+def read_batch_lines(request):
+    """Command lines from -c, then the script or stdin; blank lines and # comments are skipped."""
+    texts = list(request["commands"])
+    if request["script"] == "-":
+        texts.append(sys.stdin.read())
+    elif request["script"]:
+        with open(request["script"], encoding="utf-8") as f:
+            texts.append(f.read())
+    lines = (line.strip() for text in texts for line in text.splitlines())
+    return [line for line in lines if line and not line.startswith("#")]
+
+
+def _run_batch_line(line):
+    """Run one line and return its exit status."""
+    try:
+        run_command_line(line)
+        return last_exit_status()
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else 1
+    except Exception as e:
+        print(f"Error running {line}: {e}")
+        return 1
+
+
+def run_batch(lines, jobs=1, errexit=False):
+    """
+    Run command lines and return a process exit code.
+    jobs=1: in order, like a shell script; `exit [n]` stops early.
+    jobs>1: lines are independent and run concurrently; each line's output is
+    captured and printed in input order, and the first failing status is returned.
+    """
+    status = 0
+    if jobs <= 1:
+        for line in lines:
+            parts = line.split()
+            if parts[0] in ("exit", "quit"):
+                return int(parts[1]) if len(parts) > 1 and parts[1].lstrip("-").isdigit() else status
+            status = _run_batch_line(line)
+            if status and errexit:
+                break
+        return status
+
+    import io
+    from concurrent.futures import ThreadPoolExecutor
+
+    router = _stdout_router()
+
+    def run_captured(line):
+        buf = io.StringIO()
+        router.redirect(buf)
+        try:
+            return _run_batch_line(line), buf.getvalue()
+        finally:
+            router.redirect(None)
+
+    with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="pynix-batch") as pool:
+        futures = [pool.submit(run_captured, line) for line in lines]
+        for i, future in enumerate(futures):
+            code, output = future.result()
+            sys.stdout.write(output)
+            sys.stdout.flush()
+            if code and not status:
+                status = code
+                if errexit:
+                    for pending in futures[i + 1:]:
+                        pending.cancel()
+                    break
+    return status
+
+
+# =======================================
+# Daemon mode
+# =======================================
+# `pyterm --daemon` keeps one warm process (registry, plugins, aliases loaded)
+# and serves command lines over a Unix socket; pynix_client.py is the client.
+# Protocol: one JSON request line {"op": "run", "cmd": ..., "cwd": ...}; the
+# reply is {"out": text} lines followed by {"status": n}.
+
+DAEMON_WORKERS = 8
+
+
+def default_socket_path():
+    """Per-user socket path ($PYNIX_SOCKET overrides); pynix_client.py uses the same rule."""
+    import tempfile
+    uid = os.getuid() if hasattr(os, "getuid") else 0
+    return os.environ.get("PYNIX_SOCKET") or os.path.join(tempfile.gettempdir(), f"pynix-{uid}.sock")
+
+
+# Commands that move the process to another directory (cd also covers unix/win/mac cd)
+_CHDIR_COMMANDS = {"cd", "back", "goto", "goback", "contextmenu"}
+
+
+def may_change_directory(cmd_line, seen=()):
+    """True if any word of cmd_line (or of an alias it uses) is a directory-changing command."""
+    for word in re.split(r"[\s;&|()]+", cmd_line):
+        if word in _CHDIR_COMMANDS:
+            return True
+        if word in _aliases and word not in seen and may_change_directory(_aliases[word], seen + (word,)):
+            return True
+    return False
+
+
+class _CwdGate:
+    """
+    The working directory is process-wide, so requests run together only when
+    they share one; a request for another directory waits until the others finish.
+    A request that may change directory runs alone, and the gate's directory is
+    restored before anyone else is let in.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._active = 0
+        self._exclusive = False
+        self._exclusive_waiting = 0     # holds back new shared requests so these are not starved
+        self._cwd = None
+
+    def enter(self, cwd, exclusive=False):
+        with self._cond:
+            if exclusive:
+                self._exclusive_waiting += 1
+            try:
+                while self._exclusive or (self._active and (exclusive or self._cwd != cwd)) \
+                        or (not exclusive and self._exclusive_waiting):
+                    self._cond.wait()
+            finally:
+                if exclusive:
+                    self._exclusive_waiting -= 1
+            if os.getcwd() != cwd:
+                try:
+                    os.chdir(cwd)   # raises for a missing directory; nothing was counted yet
+                except OSError:
+                    self._cond.notify_all()
+                    raise
+            self._cwd = cwd
+            self._active += 1
+            self._exclusive = exclusive
+
+    def exit(self):
+        with self._cond:
+            self._active -= 1
+            self._exclusive = False
+            if os.getcwd() != self._cwd:
+                try:
+                    os.chdir(self._cwd)     # a cd in the request must not leak into the next one
+                except OSError:
+                    pass
+            self._cond.notify_all()
+
+
+class _SocketWriter:
+    """stdout target for one request: batches writes into {"out": ...} messages."""
+
+    FLUSH_BYTES = 8192
+    FLUSH_SECONDS = 0.05
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._parts = []
+        self._size = 0
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def send(self, message):
+        self.conn.sendall((json.dumps(message) + "\n").encode("utf-8"))
+
+    def _flush(self):
+        if self._parts:
+            text, self._parts, self._size = "".join(self._parts), [], 0
+            self.send({"out": text})
+        self._last = time.monotonic()
+
+    def write(self, text):
+        if not text:
+            return 0
+        with self._lock:
+            self._parts.append(text)
+            self._size += len(text)
+            # big chunks for bulk output, but a slow command's lines still arrive promptly
+            if self._size >= self.FLUSH_BYTES or ("\n" in text and time.monotonic() - self._last >= self.FLUSH_SECONDS):
+                self._flush()
+        return len(text)
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+
+def _serve_request(conn, gate, stop):
+    with conn:
+        writer = _SocketWriter(conn)
+        try:
+            request = json.loads(conn.makefile("rb").readline() or b"{}")
+            op = request.get("op", "run")
+        except (ValueError, AttributeError, OSError):
+            try:
+                writer.send({"error": "bad request"})
+            except OSError:
+                pass
+            return
+
+        try:
+            if op == "ping":
+                writer.send({"status": 0, "pid": os.getpid()})
+                return
+            if op == "shutdown":
+                writer.send({"status": 0})
+                stop.set()
+                return
+            if op != "run":
+                writer.send({"error": f"unknown op {op!r}"})
+                return
+
+            try:
+                cmd_line = request.get("cmd", "")
+                gate.enter(request.get("cwd") or os.getcwd(), exclusive=may_change_directory(cmd_line))
+            except OSError as e:
+                writer.send({"out": f"⚠️ Cannot use directory: {e}\n"})
+                writer.send({"status": 1})
+                return
+            router = _stdout_router()
+            router.redirect(writer)
+            try:
+                status = _run_batch_line(cmd_line)
+            finally:
+                router.redirect(None)
+                gate.exit()
+            writer.flush()
+            writer.send({"status": status})
+        except OSError:
+            pass   # client went away; the command's output has nowhere to go
+
+
+def serve_daemon(path=None, workers=DAEMON_WORKERS):
+    """Serve command requests on a Unix socket until Ctrl+C, SIGTERM or `pynix_client.py --stop`."""
+    import signal
+    from concurrent.futures import ThreadPoolExecutor
+
+    if not hasattr(socket, "AF_UNIX"):
+        print("⚠️ Daemon mode needs Unix domain sockets, which this system lacks.", file=sys.stderr)
+        return 1
+    path = path or default_socket_path()
+    if os.path.exists(path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+            print(f"⚠️ A daemon is already listening on {path}.", file=sys.stderr)
+            return 1
+        except OSError:
+            os.unlink(path)   # stale socket from a daemon that died
+        finally:
+            probe.close()
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o177)   # socket usable by this user only
+    try:
+        server.bind(path)
+    finally:
+        os.umask(old_umask)
+    server.listen(64)
+    server.settimeout(0.5)   # wake up to notice a stop request
+
+    sys.stdin = open(os.devnull)   # a command waiting for input() must not hang a worker
+    _stdout_router()
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    gate = _CwdGate()
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pynix-daemon")
+    print(f"🛰️ PyTerm daemon listening on {path} (pid {os.getpid()}, {workers} workers)")
+    sys.stdout.flush()
+    try:
+        while not stop.is_set():
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                continue
+            conn.setblocking(True)
+            pool.submit(_serve_request, conn, gate, stop)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        pool.shutdown(wait=False, cancel_futures=True)
+    print("🛰️ PyTerm daemon stopped.")
+    return 0
+
+
 def main():
+    global _pending_input
     sys_name = platform.system()
     print(f"Custom Terminal ({sys_name}) — type 'exit' to quit")
+    first_prompt = True
+    setup_readline_history()
+    setup_completion()
+    manager = install_output_manager()
+    import signal
+    signal.signal(signal.SIGINT, _on_sigint)
     while True:
         try:
+            report_finished_jobs()
             cwd = os.getcwd()
             prompt = f"PynixShell {cwd}> "
-            line = input(prompt)
+            if first_prompt:
+                first_prompt = False
+                _mark_startup("first prompt")
+                if "--startup-report" in sys.argv[1:]:
+                    sys.exit(0 if print_startup_report() else 1)
+            manager.drain()   # the command's own output goes above the new prompt
+            manager.prompt = prompt
+            try:
+                if _pending_input and _readline is not None:
+                    text, _pending_input = _pending_input, None
+                    _readline.set_startup_hook(lambda: _readline.insert_text(text))
+                    try:
+                        line = input(prompt)
+                    finally:
+                        _readline.set_startup_hook(None)
+                else:
+                    line = input(prompt)
+            finally:
+                manager.prompt = None
             if line.lower() in ( "quit"):
                 break
             execute_command(line)
         except KeyboardInterrupt:
-            print()
-            break
+            print()   # Ctrl+C at the prompt: start a fresh line, keep the shell
         except EOFError:
             break
 
 
 
-handle_command("csync")
-handle_command("clear")
-load_aliases()
+_batch_request = None
+if __name__ == "__main__":
+    try:
+        _batch_request = parse_batch_args(sys.argv[1:])
+    except ValueError as e:
+        print(f"pyterm: {e}\n{BATCH_USAGE}", file=sys.stderr)
+        sys.exit(2)
+
+_builtin_commands.update(registered_commands)
+_mark_startup("command registry")
+if _batch_request is None:
+    command_history.load()
+    _mark_startup("history load")
+    handle_command("csync --lazy", record=False)
+    _mark_startup("plugin load")
+    handle_command("clear", record=False)
+    _mark_startup("clear screen")
+    load_aliases()
+    _mark_startup("alias load")
+    load_autoexec()
+    _mark_startup("autoexec jobs")
+else:
+    # Batch / daemon mode: same commands, none of the interactive setup
+    sync_plugins(lazy=True, verbose=False)
+    _mark_startup("plugin load")
+    load_aliases(verbose=False)
+    _mark_startup("alias load")
 
 if __name__ == "__main__":
+    if _batch_request is not None and _batch_request["daemon"]:
+        sys.exit(serve_daemon(_batch_request["socket"], _batch_request["workers"]))
+    if _batch_request is not None:
+        try:
+            lines = read_batch_lines(_batch_request)
+        except OSError as e:
+            print(f"pyterm: {e}", file=sys.stderr)
+            sys.exit(2)
+        try:
+            sys.exit(run_batch(lines, _batch_request["jobs"], _batch_request["errexit"]))
+        except KeyboardInterrupt:
+            sys.exit(130)
     # Automatically run something when PyTerm starts
     main()
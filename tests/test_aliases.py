@@ -0,0 +1,42 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+PYTERM = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pyterm.py")
+
+
+class NestedAliasTests(unittest.TestCase):
+    """Aliases live next to pyterm.py, so each run uses a private copy of it."""
+
+    def expand(self, aliases, command_line):
+        with tempfile.TemporaryDirectory() as tmp:
+            shutil.copy(PYTERM, tmp)
+            with open(os.path.join(tmp, "pynix_aliases.json"), "w") as f:
+                json.dump(aliases, f)
+            done = subprocess.run([sys.executable, os.path.join(tmp, "pyterm.py"), "-c", command_line],
+                                  cwd=tmp, capture_output=True, text=True, timeout=60)
+        return done.stdout.strip()
+
+    def test_outer_arguments_reach_inner_alias(self):
+        aliases = {"show": "echo $1 $2", "tagged": "show foo $1"}
+        self.assertEqual(self.expand(aliases, "tagged bar"), "foo bar")
+
+    def test_inner_alias_reorders_outer_arguments(self):
+        aliases = {"swap": "echo $2 $1", "first": "swap x $@"}
+        self.assertEqual(self.expand(aliases, "first y z"), "y x")
+
+    def test_three_levels(self):
+        aliases = {"swap": "echo $2 $1", "first": "swap x $@", "top": "first"}
+        self.assertEqual(self.expand(aliases, "top y z"), "y x")
+
+    def test_inner_alias_without_slots_gets_arguments_appended(self):
+        aliases = {"say": "echo hello", "greet": "say $1 again"}
+        self.assertEqual(self.expand(aliases, "greet world"), "hello world again")
+
+
+if __name__ == "__main__":
+    unittest.main()
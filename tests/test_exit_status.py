@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+PYTERM = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pyterm.py")
+
+
+def run(command_line, cwd=None):
+    """Run one command line in batch mode and return the process exit status."""
+    return subprocess.run([sys.executable, PYTERM, "-c", command_line], cwd=cwd,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=60).returncode
+
+
+class BatchExitStatusTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        with open(os.path.join(self.dir.name, "notes.txt"), "w", encoding="utf-8") as f:
+            f.write("alpha\nbeta\n")
+
+    def test_success_is_zero(self):
+        self.assertEqual(run("cat notes.txt", cwd=self.dir.name), 0)
+        self.assertEqual(run("grep beta notes.txt", cwd=self.dir.name), 0)
+        self.assertEqual(run("ls", cwd=self.dir.name), 0)
+
+    def test_missing_file(self):
+        self.assertEqual(run("cat /nonexistent"), 1)
+        self.assertEqual(run("grep foo /nonexistent"), 1)
+        self.assertEqual(run("cp nonexistent", cwd=self.dir.name), 1)
+        self.assertEqual(run("rm nonexistent", cwd=self.dir.name), 1)
+        self.assertEqual(run("cd /nonexistent"), 1)
+        self.assertEqual(run("ls /nonexistent"), 1)
+
+    def test_grep_without_match(self):
+        self.assertEqual(run("grep gamma notes.txt", cwd=self.dir.name), 1)
+        self.assertEqual(run("cat notes.txt | grep gamma", cwd=self.dir.name), 1)
+
+    def test_failure_inside_pipeline(self):
+        self.assertEqual(run("cat nonexistent | head", cwd=self.dir.name), 1)
+        self.assertEqual(run("cd /nonexistent | head"), 1)
+
+    def test_unknown_command(self):
+        self.assertEqual(run("no-such-command-here"), 127)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+
+PYTERM = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pyterm.py")
+
+# The helper every plugin defines (readme.txt, External Commands)
+SHIM = """
+def register_command(name):
+    from __main__ import registered_commands
+    def wrapper(func):
+        registered_commands[name] = func
+        return func
+    return wrapper
+"""
+
+
+class LazyPluginTests(unittest.TestCase):
+    """Plugins are found in ./commands, so each test runs from its own directory."""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        os.makedirs(os.path.join(self.dir.name, "commands"))
+
+    def add_plugin(self, name, source):
+        with open(os.path.join(self.dir.name, "commands", name), "w", encoding="utf-8") as f:
+            f.write(SHIM + textwrap.dedent(source))
+
+    def run_line(self, command_line):
+        done = subprocess.run([sys.executable, PYTERM, "-c", command_line], cwd=self.dir.name,
+                              capture_output=True, text=True, timeout=60)
+        return done.returncode, done.stdout.strip()
+
+    def test_decorated_commands(self):
+        self.add_plugin("hi.py", """
+            @register_command("hi")
+            def hi(args):
+                print("hi", *args)
+        """)
+        self.assertEqual(self.run_line("hi there"), (0, "hi there"))
+        self.assertEqual(self.run_line("hi again"), (0, "hi again"))   # from the manifest
+
+    def test_commands_registered_in_a_loop(self):
+        self.add_plugin("loop.py", """
+            def make(word):
+                def command(args):
+                    print(word, *args)
+                return command
+
+            for word in ("one", "two"):
+                registered_commands["say" + word] = make(word)
+        """)
+        self.assertEqual(self.run_line("sayone a"), (0, "one a"))
+        self.assertEqual(self.run_line("saytwo b"), (0, "two b"))   # from the manifest
+
+    def test_decorator_with_a_variable_name(self):
+        self.add_plugin("var.py", """
+            NAME = "greet"
+
+            @register_command(NAME)
+            def greet(args):
+                print("hello", *args)
+
+            @register_command("wave")
+            def wave(args):
+                print("wave")
+        """)
+        self.assertEqual(self.run_line("greet you"), (0, "hello you"))
+        self.assertEqual(self.run_line("wave"), (0, "wave"))
+
+    def test_helper_module_is_imported_once(self):
+        marker = os.path.join(self.dir.name, "imports.txt")
+        self.add_plugin("helper.py", f"""
+            with open({marker!r}, "a") as f:
+                f.write("imported\\n")
+        """)
+        self.add_plugin("hi.py", """
+            @register_command("hi")
+            def hi(args):
+                print("hi")
+        """)
+        for _ in range(3):
+            self.assertEqual(self.run_line("hi"), (0, "hi"))
+        with open(marker) as f:
+            self.assertEqual(f.read().split(), ["imported"])
+
+    def test_failed_plugin_is_reported_by_add(self):
+        broken = os.path.join(self.dir.name, "broken.py")
+        with open(broken, "w") as f:
+            f.write("raise RuntimeError('boom')\n")
+        status, out = self.run_line(f"add {broken}")
+        self.assertIn("Failed to load 'broken.py'", out)
+
+
+if __name__ == "__main__":
+    unittest.main()